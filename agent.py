@@ -1,6 +1,8 @@
 from langchain.agents import initialize_agent
 from langchain_openai import ChatOpenAI
 from tool_declarations import tools
+from embedding_cache import get_embeddings
+from routing import SemanticRouter, TOOL_ROUTES
 
 llm = ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo")
 
@@ -10,3 +12,17 @@ agent = initialize_agent(
     agent="zero-shot-react-description",  # LLM decides which tool to call
     verbose=True  # Shows tool usage and reasoning
 )
+
+# Embedding router picks the tool without an LLM call when it is confident
+router = SemanticRouter.from_tools(tools, get_embeddings())
+tools_by_route = {TOOL_ROUTES.get(tool.name, tool.name): tool for tool in tools}
+
+
+def run(user_input: str):
+    route, confidence = router.classify(user_input)
+    if confidence >= router.threshold and route in tools_by_route:
+        return tools_by_route[route].run(user_input)
+    if confidence >= router.threshold and route == "chat":
+        return llm.invoke(user_input).content
+    # Low confidence: let the ReAct agent reason about it
+    return agent.run(user_input)
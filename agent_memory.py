@@ -1,12 +1,243 @@
-from langchain.memory import SQLAlchemyChatMessageHistory
-from langchain.chat_models import ChatOpenAI
-from sqlalchemy import create_engine
-
-# Postgres connection
-engine = create_engine(POSTGRES_CONNECTION_STRING)
-
-# Chat history in Postgres
-chat_history = SQLAlchemyChatMessageHistory(
-    session=engine.connect(),
-    table_name="chat_memory"
-)
+"""
+Token-budgeted chat memory in Postgres.
+
+Messages go to ``chat_memory_messages`` with a ``(session_id, id)`` index, so a turn
+reads only the last ``window_turns`` exchanges instead of the whole history.
+Turns that slide out of the window are folded into a per-session running
+summary (``chat_memory_summary``) a few messages at a time, in the
+background, so neither read latency nor prompt size grows with the session.
+``context`` returns the summary plus as much of the window as fits the token
+budget. The window is read from the end of the summary, so messages waiting
+to be folded in stay in the prompt until they are.
+
+The legacy ``chat_memory`` table (LangChain's ``SQLAlchemyChatMessageHistory``
+layout: one JSON ``message`` per row) is left in place; its messages are
+copied into the new table once, when that table is created.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import threading
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from sqlalchemy import text
+
+from db import get_engine, resolve_connection_string
+from token_counting import default_token_counter
+
+
+MESSAGES_TABLE = "chat_memory_messages"
+LEGACY_TABLE = "chat_memory"
+SUMMARY_TABLE = "chat_memory_summary"
+
+# summarizer(previous_summary, [(role, content), ...]) -> new summary
+Summarizer = Callable[[str, Sequence[Tuple[str, str]]], str]
+
+
+def truncating_summarizer(max_chars: int = 2000) -> Summarizer:
+    """
+    LLM-free summarizer: appends the new turns and keeps the most recent
+    ``max_chars``. Used when no LLM is configured and by the benchmark.
+    """
+    def summarize(previous: str, messages: Sequence[Tuple[str, str]]) -> str:
+        lines = [previous] if previous else []
+        lines += [f"{role}: {' '.join(content.split())}" for role, content in messages]
+        return "\n".join(lines)[-max_chars:]
+    return summarize
+
+
+def llm_summarizer(llm, max_words: int = 150) -> Summarizer:
+    def summarize(previous: str, messages: Sequence[Tuple[str, str]]) -> str:
+        transcript = "\n".join(f"{role}: {content}" for role, content in messages)
+        prompt = (
+            "Progressively summarize the conversation, adding onto the previous summary. "
+            f"Keep facts, names, preferences and open tasks; at most {max_words} words.\n\n"
+            f"Previous summary:\n{previous or '(none)'}\n\nNew lines:\n{transcript}\n\nNew summary:"
+        )
+        return llm.invoke(prompt).content.strip()
+    return summarize
+
+
+class ChatMemory:
+    def __init__(
+        self,
+        connection_string: Optional[str] = None,
+        window_turns: int = 6,
+        token_budget: int = 1500,
+        summary_budget: int = 400,
+        summarize_every: int = 4,
+        summarizer: Optional[Summarizer] = None,
+        background: bool = True,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        self.engine = get_engine(resolve_connection_string(connection_string))
+        self.window = window_turns * 2
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.summarize_every = summarize_every
+        self.summarizer = summarizer or truncating_summarizer()
+        self.count_tokens = token_counter or default_token_counter()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary") if background else None
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self.ensure_schema()
+
+    def ensure_schema(self) -> None:
+        with self.engine.begin() as conn:
+            # Serialise first-time setup across processes so the import runs once
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:t))"), {"t": MESSAGES_TABLE})
+            created = conn.execute(text("SELECT to_regclass(:t) IS NULL"), {"t": MESSAGES_TABLE}).scalar()
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {MESSAGES_TABLE} (
+                    id BIGSERIAL PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {MESSAGES_TABLE}_session_id_idx ON {MESSAGES_TABLE} (session_id, id)"
+            ))
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+                    session_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    covered_through BIGINT NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """))
+            if created:
+                self._import_legacy(conn)
+
+    @staticmethod
+    def _import_legacy(conn) -> int:
+        legacy = conn.execute(text(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = :t AND column_name = 'message'"
+        ), {"t": LEGACY_TABLE}).scalar()
+        if not legacy:
+            return 0
+        # Token counts are estimated (chars / 4); they only steer the prompt budget
+        return conn.execute(text(f"""
+            INSERT INTO {MESSAGES_TABLE} (session_id, role, content, tokens)
+            SELECT session_id, CASE WHEN m->>'type' = 'human' THEN 'user' ELSE 'assistant' END,
+                   m->'data'->>'content', length(m->'data'->>'content') / 4 + 1
+            FROM (SELECT id, session_id, CAST(message AS jsonb) AS m FROM {LEGACY_TABLE}) legacy
+            WHERE m->>'type' IN ('human', 'ai') AND m->'data'->>'content' IS NOT NULL
+            ORDER BY id
+        """)).rowcount
+
+    def add_messages(self, session_id: str, messages: Sequence[Tuple[str, str]]) -> None:
+        """
+        Append ``(role, content)`` pairs (role is "user" or "assistant").
+        """
+        rows = [{"s": session_id, "r": role, "c": content, "t": self.count_tokens(content)}
+                for role, content in messages]
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"INSERT INTO {MESSAGES_TABLE} (session_id, role, content, tokens) VALUES (:s, :r, :c, :t)"
+            ), rows)
+        if self._executor is not None:
+            self._executor.submit(self.roll_up, session_id)
+        else:
+            self.roll_up(session_id)
+
+    def add_turn(self, session_id: str, user: str, assistant: str) -> None:
+        self.add_messages(session_id, [("user", user), ("assistant", assistant)])
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._session_locks.setdefault(session_id, threading.Lock())
+
+    def roll_up(self, session_id: str) -> bool:
+        """
+        Fold messages that left the window into the summary once at least
+        ``summarize_every`` of them are pending. Returns True if it did.
+        """
+        lock = self._session_lock(session_id)
+        if not lock.acquire(blocking=False):
+            return False  # already running for this session; it will pick these up next turn
+        try:
+            with self.engine.connect() as conn:
+                boundary = conn.execute(text(
+                    f"SELECT id FROM {MESSAGES_TABLE} WHERE session_id = :s ORDER BY id DESC OFFSET :w LIMIT 1"
+                ), {"s": session_id, "w": self.window}).scalar()
+                if boundary is None:
+                    return False
+                row = conn.execute(text(
+                    f"SELECT summary, covered_through FROM {SUMMARY_TABLE} WHERE session_id = :s"
+                ), {"s": session_id}).first()
+                previous, covered = (row.summary, row.covered_through) if row else ("", 0)
+                pending = conn.execute(text(
+                    f"SELECT role, content FROM {MESSAGES_TABLE} "
+                    "WHERE session_id = :s AND id > :covered AND id <= :boundary ORDER BY id"
+                ), {"s": session_id, "covered": covered, "boundary": boundary}).all()
+            if len(pending) < self.summarize_every:
+                return False
+            summary = self.summarizer(previous, [(r.role, r.content) for r in pending])
+            with self.engine.begin() as conn:
+                conn.execute(text(f"""
+                    INSERT INTO {SUMMARY_TABLE} (session_id, summary, tokens, covered_through)
+                    VALUES (:s, :summary, :tokens, :covered)
+                    ON CONFLICT (session_id) DO UPDATE SET summary = EXCLUDED.summary,
+                        tokens = EXCLUDED.tokens, covered_through = EXCLUDED.covered_through, updated_at = now()
+                """), {"s": session_id, "summary": summary, "tokens": self.count_tokens(summary),
+                       "covered": boundary})
+            return True
+        finally:
+            lock.release()
+
+    def context(self, session_id: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        ``(summary, [(role, content), ...])`` for the next prompt: the summary
+        (clipped to ``summary_budget``) and the newest messages after it that
+        fit the remaining budget, oldest first. That is the window plus up to
+        ``summarize_every`` messages that left it but are not summarized yet.
+        """
+        with self.engine.connect() as conn:
+            row = conn.execute(text(
+                f"SELECT summary, tokens, covered_through FROM {SUMMARY_TABLE} WHERE session_id = :s"
+            ), {"s": session_id}).first()
+            recent = conn.execute(text(
+                f"SELECT role, content, tokens FROM {MESSAGES_TABLE} WHERE session_id = :s AND id > :covered "
+                "ORDER BY id DESC LIMIT :w"
+            ), {"s": session_id, "covered": row.covered_through if row else 0,
+                "w": self.window + self.summarize_every}).all()
+
+        summary, used = "", 0
+        if row:
+            summary, used = row.summary, row.tokens
+            if used > self.summary_budget:
+                summary = summary[-self.summary_budget * 4:]
+                used = self.count_tokens(summary)
+        messages = []
+        for r in recent:
+            if messages and used + r.tokens > self.token_budget:
+                break
+            messages.append((r.role, r.content))
+            used += r.tokens
+        messages.reverse()
+        return summary, messages
+
+    def messages(self, session_id: str) -> List[BaseMessage]:
+        """
+        ``context`` as LangChain messages, ready to put before the new input.
+        """
+        summary, window = self.context(session_id)
+        out: List[BaseMessage] = []
+        if summary:
+            out.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        for role, content in window:
+            out.append(HumanMessage(content=content) if role == "user" else AIMessage(content=content))
+        return out
+
+    def clear(self, session_id: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {MESSAGES_TABLE} WHERE session_id = :s"), {"s": session_id})
+            conn.execute(text(f"DELETE FROM {SUMMARY_TABLE} WHERE session_id = :s"), {"s": session_id})
+
+    def health_check(self):
+        with self.engine.connect() as conn:
+            return {"sessions": conn.execute(text(f"SELECT count(*) FROM {SUMMARY_TABLE}")).scalar()}
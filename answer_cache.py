@@ -0,0 +1,144 @@
+"""
+Semantic answer cache for RAG queries.
+
+Stores (query embedding, answer) pairs and serves a cached answer when a new
+query's embedding has cosine similarity >= ``threshold`` with a fresh entry.
+Entries expire after ``ttl_seconds`` and the whole cache is dropped when the
+collection's ingestion epoch moves on (see index_manifest.bump_collection_epoch).
+Answers from filtered retrieval (e.g. one tenant's documents) are stored
+under a ``scope`` and only served to lookups with the same scope. The
+generation time saved by hits is exported as
+``answer_cache_saved_seconds_total``.
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+import threading
+import time
+
+import numpy as np
+
+import telemetry
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 2048,
+        epoch_fn: Optional[Callable[[], int]] = None,
+        epoch_refresh_seconds: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.epoch_fn = epoch_fn
+        self.epoch_refresh_seconds = epoch_refresh_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._vectors = None  # (n, d) unit-normalised float32
+        self._entries: List[Dict] = []
+        self._epoch = None
+        self._epoch_checked = 0.0
+
+    def _check_epoch(self):
+        # Called without the lock: the epoch query must not serialise lookups.
+        if self.epoch_fn is None:
+            return
+        now = self.clock()
+        with self._lock:
+            if self._epoch is not None and now - self._epoch_checked < self.epoch_refresh_seconds:
+                return
+            self._epoch_checked = now
+        epoch = self.epoch_fn()
+        with self._lock:
+            if self._epoch is not None and epoch != self._epoch and self._entries:
+                self._vectors, self._entries = None, []
+                self.invalidations += 1
+            self._epoch = epoch
+
+    def _expire(self):
+        cutoff = self.clock() - self.ttl_seconds
+        keep = [i for i, e in enumerate(self._entries) if e["created"] >= cutoff]
+        if len(keep) != len(self._entries):
+            self._entries = [self._entries[i] for i in keep]
+            self._vectors = self._vectors[keep] if keep else None
+
+    @staticmethod
+    def _normalise(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, query_vector: Sequence[float], scope: str = "") -> Optional[str]:
+        self._check_epoch()
+        with self._lock:
+            self._expire()
+            if self._vectors is not None:
+                scores = self._vectors @ self._normalise(query_vector)
+                in_scope = np.fromiter((e["scope"] == scope for e in self._entries), bool, len(self._entries))
+                scores = np.where(in_scope, scores, -np.inf)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = self._entries[best]
+                    self.hits += 1
+                    self.saved_seconds += entry["latency"]
+                    telemetry.count("answer_cache_saved_seconds_total", entry["latency"])
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, query: str, query_vector: Sequence[float], answer: str, latency: float, scope: str = ""):
+        self._check_epoch()
+        with self._lock:
+            row = self._normalise(query_vector)[None, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            self._entries.append({"query": query, "answer": answer, "latency": latency, "created": self.clock(),
+                                  "scope": scope})
+            if len(self._entries) > self.max_entries:
+                drop = len(self._entries) - self.max_entries
+                self._entries = self._entries[drop:]
+                self._vectors = self._vectors[drop:]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "entries": len(self._entries),
+                "invalidations": self.invalidations,
+            }
+
+
+@lru_cache(maxsize=None)
+def shared_answer_cache(
+    connection_string: str,
+    collection_name: str,
+    threshold: float = 0.95,
+    ttl_seconds: float = 3600.0,
+    model_name: str = "",
+    k: int = 0,
+) -> SemanticAnswerCache:
+    """
+    One cache per collection per process, shared by every session. Tools
+    answering with a different model or top-k get their own cache
+    (``model_name`` and ``k`` are part of the cache key only).
+    """
+    from db import get_engine
+    from index_manifest import get_collection_epoch
+
+    engine = get_engine(connection_string)
+    return SemanticAnswerCache(
+        threshold=threshold,
+        ttl_seconds=ttl_seconds,
+        epoch_fn=lambda: get_collection_epoch(engine, collection_name),
+    )
@@ -517,13 +517,18 @@
 
 import streamlit as st
 import os
-from langchain_openai import ChatOpenAI
+import time
+import uuid
 from langchain.tools import Tool
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
-# Import our custom tools from previous steps
-from tools import RAGSearchTool, ReminderTool, ToDoListTool, WeatherTool, SearchTool
-from rag_utils import process_uploaded_files  # function to process/upload files
+rerun_started = time.perf_counter()
+
+# Tools are built once per process by the registry and shared across sessions
+from tool_registry import get_registry
+from routing import keyword_route
+from vector_index import DEFAULT_TENANT, valid_tenant
+import telemetry
 
 # -------------------------
 # CONFIG
@@ -531,10 +536,25 @@ from rag_utils import process_uploaded_files  # function to process/upload files
 POSTGRES_CONNECTION_STRING = os.getenv("POSTGRES_CONNECTION_STRING")
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY") 
+# Start RAG retrieval while routing; discarded if the route is not RAG
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "1") == "1"
+# "semantic" (embedding centroids, LLM only when unsure) or "keyword"
+ROUTER_MODE = os.getenv("ROUTER_MODE", "semantic")
+# Uploads and document answers are scoped to a tenant (RAG_TENANT by default);
+# ?tenant=<id> picks one. This narrows retrieval, it is not access control:
+# anyone who knows a tenant id can query it. Put the app behind auth and
+# derive the tenant from the signed-in user where isolation matters.
 
 st.set_page_config(page_title="Smart Personal Assistant Bot", page_icon="🤖")
 st.title("🤖 Smart Personal Assistant Bot")
 
+if "tenant" not in st.session_state:
+    st.session_state.tenant = st.query_params.get("tenant") or DEFAULT_TENANT
+tenant = st.session_state.tenant
+if not valid_tenant(tenant):
+    st.error(f"Invalid tenant id: {tenant}")
+    st.stop()
+
 # -------------------------
 # UPLOAD FILES FOR RAG
 # -------------------------
@@ -543,87 +563,232 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True
 )
 
-vectorstore = None
-if uploaded_files:
-    with st.spinner("Processing documents..."):
-        vectorstore = process_uploaded_files(uploaded_files, POSTGRES_CONNECTION_STRING)
-        st.success(f"Indexed {len(uploaded_files)} document(s) into PGVector. Ready to query!")
+registry = get_registry()
+ingest_queue = registry.get("ingest_queue")
+registry.get("ingest_worker")
+# Prometheus text on METRICS_PORT and/or METRICS_FILE, once per process
+registry.get("metrics_exporter")
+
+# Uploads are queued for the background worker; identical content is a no-op
+if "upload_jobs" not in st.session_state:
+    st.session_state.upload_jobs = {}
+for file in uploaded_files or []:
+    key = (file.name, file.size, getattr(file, "file_id", None))
+    if key not in st.session_state.upload_jobs:
+        st.session_state.upload_jobs[key] = ingest_queue.enqueue(file.name, file.getvalue(), tenant=tenant)
+
+@st.fragment(run_every=2)
+def show_ingestion_progress():
+    jobs = ingest_queue.progress(list(st.session_state.upload_jobs.values()))
+    for job in jobs:
+        if job["status"] == "done":
+            st.caption(f"✅ {job['filename']} indexed")
+        elif job["status"] == "failed":
+            st.caption(f"❌ {job['filename']}: {job['error']}")
+        else:
+            eta = f", ~{job['eta_seconds']:.0f}s left" if job["eta_seconds"] is not None else ""
+            st.progress(
+                job["fraction"],
+                text=f"{job['filename']}: {job['status']} ({job['chunks_done']}/{job['chunks_total']} chunks{eta})",
+            )
+
+if st.session_state.upload_jobs:
+    show_ingestion_progress()
 
 # -------------------------
 # INITIALIZE TOOLS
 # -------------------------
-rag_tool = RAGSearchTool(connection_string=POSTGRES_CONNECTION_STRING)
-reminder_tool = ReminderTool()
-todo_tool = ToDoListTool()
-weather_tool = WeatherTool(api_key=OPENWEATHER_API_KEY)
-search_tool = SearchTool(api_key=SERPAPI_API_KEY)
+# Document search needs Postgres; if it is down only RAG answers fail
+try:
+    rag_tool, rag_error = registry.get("rag"), None
+except Exception as e:
+    rag_tool, rag_error = None, e
+    st.warning(f"Document search is unavailable: {e}")
+reminder_tool = registry.get("reminder")
+todo_tool = registry.get("todo")
+weather_tool = registry.get("weather")
+search_tool = registry.get("search")
 
 # -------------------------
 # INITIALIZE LLM
 # -------------------------
-@st.cache_resource
-def get_llm():
-    return ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo")
+llm = registry.get("llm")
+speculator = registry.get("speculator")
+# Chat memory lives in Postgres; without it chat sees this session's recent turns
+try:
+    chat_memory = registry.get("chat_memory")
+except Exception as e:
+    chat_memory = None
+    st.warning(f"Long-term chat memory is unavailable: {e}")
+router = None
+if ROUTER_MODE == "semantic":
+    # Building the router may embed its exemplars; without it, route by keyword
+    try:
+        router = registry.get("router")
+    except Exception as e:
+        st.warning(f"Semantic routing is unavailable, using keywords: {e}")
+tool_setup_seconds = time.perf_counter() - rerun_started
 
-llm = get_llm()
+# Fires due reminders from the shared heap; a poll is a heap peek, not a scan
+@st.fragment(run_every=5)
+def show_due_reminders():
+    for reminder in reminder_tool.due():
+        st.toast(f"⏰ {reminder['message']}")
+    for reminder in reminder_tool.scheduler.recent()[:5]:
+        st.caption(f"🔔 {reminder['message']}")
 
 # -------------------------
 # TOOL ROUTER FUNCTION
 # -------------------------
-def route_and_execute(user_input: str) -> str:
+def classify_route(user_input: str) -> str:
     """
-    Routes user input to appropriate tool and executes it.
+    Picks the tool for the input: rag, reminder, todo, weather, search or chat.
     """
-    user_lower = user_input.lower()
-    
-    try:
-        # Check for document/RAG queries
-        if any(keyword in user_lower for keyword in ["document", "file", "uploaded", "pdf", "what does", "according to"]):
-            return rag_tool.run(user_input)
-        
-        # Check for reminder requests
-        elif any(keyword in user_lower for keyword in ["remind", "reminder", "remember"]):
-            # Extract reminder text
-            reminder_text = user_input
-            return reminder_tool.add(reminder_text)
-        
-        # Check for todo/task requests
-        elif any(keyword in user_lower for keyword in ["todo", "task", "add to list", "to-do"]):
-            # Extract task text
-            task_text = user_input
-            return todo_tool.add(task_text)
-        
-        # Check for weather requests
-        elif "weather" in user_lower:
-            # Extract city name (simple extraction - last word or after "in")
-            if " in " in user_lower:
-                city = user_input.split(" in ")[-1].strip()
-            else:
-                words = user_input.split()
-                city = words[-1] if len(words) > 1 else "London"
-            return weather_tool.get_weather(city)
-        
-        # Check for web search requests
-        elif any(keyword in user_lower for keyword in ["search", "find", "look up", "google"]):
-            return search_tool.run(user_input)
-        
-        # Default to LLM for general conversation
+    with telemetry.span("route_classify", mode=ROUTER_MODE if router is not None else "keyword"):
+        if router is not None:
+            return router.route(user_input)
+        return keyword_route(user_input)
+
+
+def execute_tool(route: str, user_input: str) -> str:
+    """
+    Runs one of the non-streaming tools.
+    """
+    if route == "reminder":
+        # Extract reminder text
+        reminder_text = user_input
+        return reminder_tool.add(reminder_text)
+    elif route == "todo":
+        # Extract task text
+        task_text = user_input
+        return todo_tool.add(task_text)
+    elif route == "weather":
+        # Extract city name (simple extraction - last word or after "in")
+        if " in " in user_input.lower():
+            city = user_input.split(" in ")[-1].strip()
         else:
+            words = user_input.split()
+            city = words[-1] if len(words) > 1 else "London"
+        return weather_tool.get_weather(city)
+    elif route == "search":
+        return search_tool.run(user_input)
+    raise ValueError(f"Unknown route: {route}")
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def tenant_sources(tenant: str):
+    if rag_tool is None:
+        return []
+    try:
+        return rag_tool.index.list_sources({"tenant": tenant})
+    except ValueError:  # collection not created yet
+        return []
+
+
+def rag_filter() -> dict:
+    """
+    Metadata filter for this session's document questions: the tenant, and
+    the files picked in the sidebar if any.
+    """
+    scope = {"tenant": tenant}
+    if st.session_state.get("source_scope"):
+        scope["source"] = st.session_state.source_scope
+    return scope
+
+
+def memory_messages():
+    """
+    Earlier conversation for a chat prompt: the stored summary and window,
+    or the last few turns kept in the session when memory is unavailable.
+    """
+    if chat_memory is not None:
+        return chat_memory.messages(st.session_state.chat_session_id)
+    # The current input is already the last history entry
+    return [HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+            for m in st.session_state.history[:-1][-12:]]
+
+
+def _guard_stream(chunks):
+    try:
+        yield from chunks
+    except Exception as e:
+        yield f"I encountered an error: {str(e)}"
+
+
+def route_and_stream(user_input: str):
+    """
+    Routes user input and returns (sources, chunks). RAG sources are known
+    before generation starts; RAG and general-chat answers stream token by
+    token, other tools yield their result as a single chunk.
+    """
+    scope = rag_filter()
+    speculation = (speculator.start(rag_tool, user_input, filter=scope)
+                   if SPECULATIVE_RETRIEVAL and rag_tool is not None else None)
+    try:
+        route = classify_route(user_input)
+        if route == "rag":
+            if rag_tool is None:
+                return [], iter([f"I encountered an error: {rag_error}"])
+            prefetched, speculation = speculator.claim(speculation), None
+            sources, chunks = rag_tool.stream(user_input, prefetched=prefetched, filter=scope)
+            return sources, _guard_stream(chunks)
+        speculation = speculator.discard(speculation)
+        if route == "chat":
+            # Summary of older turns plus the recent window, within a token budget
             messages = [
                 SystemMessage(content="You are a helpful personal assistant. Be concise and friendly."),
+                *memory_messages(),
                 HumanMessage(content=user_input)
             ]
-            response = llm.invoke(messages)
-            return response.content
-            
+            stream = telemetry.timed_stream("llm_generate", llm.stream(messages), chain="chat")
+            return [], _guard_stream(chunk.content for chunk in stream)
+        with telemetry.span("tool", tool=route):
+            result = execute_tool(route, user_input)
+        return [], iter([str(result)])
     except Exception as e:
-        return f"I encountered an error: {str(e)}"
+        speculator.discard(speculation)
+        return [], iter([f"I encountered an error: {str(e)}"])
+
+
+def route_and_execute(user_input: str) -> str:
+    """
+    Routes user input to appropriate tool and executes it.
+    """
+    _, chunks = route_and_stream(user_input)
+    return "".join(chunks)
+
+
+def format_sources(sources):
+    labels = []
+    for doc in sources:
+        label = os.path.basename(str(doc.metadata.get("source", "unknown")))
+        if doc.metadata.get("page") is not None:
+            label += f" (p. {doc.metadata['page']})"
+        if label not in labels:
+            labels.append(label)
+    return labels
+
+
+def record_ttft(chunks, started: float):
+    """
+    Passes chunks through, recording time-to-first-token for this request.
+    """
+    first = True
+    for chunk in chunks:
+        if first:
+            st.session_state.ttft.append(time.perf_counter() - started)
+            first = False
+        yield chunk
 
 # -------------------------
 # CHAT INTERFACE
 # -------------------------
 if "history" not in st.session_state:
     st.session_state.history = []
+if "ttft" not in st.session_state:
+    st.session_state.ttft = []
+if "chat_session_id" not in st.session_state:
+    st.session_state.chat_session_id = str(uuid.uuid4())
 
 # Create columns for better layout
 col1, col2 = st.columns([4, 1])
@@ -638,12 +803,20 @@ if send_button and user_input:
     # Add user message to history
     st.session_state.history.append({"role": "user", "content": user_input})
     
-    # Show spinner while processing
-    with st.spinner("🤔 Thinking..."):
-        bot_response = route_and_execute(user_input)
+    # Stream the answer as it is generated; sources render first
+    started = time.perf_counter()
+    with st.chat_message("assistant"), telemetry.trace() as turn:
+        sources, chunks = route_and_stream(user_input)
+        source_labels = format_sources(sources)
+        if source_labels:
+            st.caption("Sources: " + ", ".join(source_labels))
+        bot_response = st.write_stream(record_ttft(chunks, started))
+    st.session_state.last_trace = {"seconds": turn.seconds, "stages": turn.breakdown()}
     
     # Add bot response to history
-    st.session_state.history.append({"role": "bot", "content": bot_response})
+    st.session_state.history.append({"role": "bot", "content": bot_response, "sources": source_labels})
+    if chat_memory is not None:
+        chat_memory.add_turn(st.session_state.chat_session_id, user_input, bot_response)
     
     # Rerun to clear input and update display
     st.rerun()
@@ -661,6 +834,8 @@ if st.session_state.history:
                 st.markdown(chat["content"])
         else:
             with st.chat_message("assistant"):
+                if chat.get("sources"):
+                    st.caption("Sources: " + ", ".join(chat["sources"]))
                 st.markdown(chat["content"])
 else:
     st.info("👋 Start a conversation by typing a message above!")
@@ -673,20 +848,71 @@ with st.sidebar:
     
     if st.button("🗑️ Clear Chat History", use_container_width=True):
         st.session_state.history = []
+        if chat_memory is not None:
+            chat_memory.clear(st.session_state.chat_session_id)
         st.rerun()
     
     st.markdown("---")
     
     st.header("📊 Session Info")
     st.metric("Messages", len(st.session_state.history))
+    if st.session_state.ttft:
+        st.metric("Time to first token", f"{st.session_state.ttft[-1]:.2f}s")
+    cache_stats = rag_tool.cache_stats() if rag_tool else {}
+    if cache_stats:
+        st.caption(
+            f"RAG answer cache: {cache_stats['hit_rate']:.0%} hit rate, "
+            f"{cache_stats['saved_seconds']:.1f}s saved"
+        )
+    context_stats = rag_tool.context_stats() if rag_tool else {}
+    if context_stats:
+        st.caption(
+            f"RAG prompt context: {context_stats['packed_tokens']:.0f} tokens/answer packed "
+            f"vs {context_stats['baseline_tokens']:.0f} for plain top-k"
+        )
+    if SPECULATIVE_RETRIEVAL:
+        spec = speculator.stats()
+        st.caption(
+            f"Speculative retrieval: {spec['used']} used, {spec['discarded'] + spec['cancelled']} wasted "
+            f"({spec['wasted_seconds']:.1f}s), {spec['saved_seconds']:.1f}s saved"
+        )
+    
+    st.markdown("---")
+
+    st.subheader("📁 Documents")
+    st.caption(f"Tenant: {tenant}")
+    sources = tenant_sources(tenant)
+    if sources:
+        st.multiselect("Answer from", sources, key="source_scope", format_func=os.path.basename,
+                       placeholder="All of this tenant's documents")
+    else:
+        st.caption("No documents indexed yet")
+
+    st.markdown("---")
+
+    # Where the last answer's time went, per instrumented stage
+    last_trace = st.session_state.get("last_trace")
+    if last_trace:
+        with st.expander(f"⏱️ Last turn ({last_trace['seconds']:.2f}s)"):
+            for stage in last_trace["stages"]:
+                calls = f" ×{stage['calls']}" if stage["calls"] > 1 else ""
+                st.text(f"{stage['stage']}: {stage['ms']:.1f} ms{calls}")
+
+    with st.expander("🩺 Tool Health"):
+        st.caption(f"Tool setup this rerun: {tool_setup_seconds * 1000:.1f} ms")
+        for name, info in registry.health().items():
+            status = "✅" if info.get("ok") else ("⏳" if not info["built"] else "❌")
+            st.text(f"{status} {name} (built in {info['build_seconds']:.2f}s)")
     
     st.markdown("---")
     
     # Display reminders if available
     st.subheader("⏰ Reminders")
+    if hasattr(reminder_tool, "scheduler"):
+        show_due_reminders()
     try:
         if hasattr(reminder_tool, 'get_all'):
-            reminders = reminder_tool.get_all()
+            reminders = reminder_tool.get_all(limit=20)
             if reminders:
                 for idx, reminder in enumerate(reminders, 1):
                     st.text(f"{idx}. {reminder}")
@@ -703,7 +929,7 @@ with st.sidebar:
     st.subheader("✅ To-Do List")
     try:
         if hasattr(todo_tool, 'get_all'):
-            todos = todo_tool.get_all()
+            todos = todo_tool.get_all(limit=20)
             if todos:
                 for idx, todo in enumerate(todos, 1):
                     st.text(f"{idx}. {todo}")
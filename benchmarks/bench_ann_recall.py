@@ -0,0 +1,106 @@
+"""
+Recall-vs-latency report for HNSW and IVFFlat against exact search.
+
+Loads a synthetic clustered corpus into a scratch collection with
+PgBulkWriter, measures exact top-k as ground truth, then sweeps ef_search /
+probes and prints recall@k and latency percentiles as JSON.
+
+    POSTGRES_CONNECTION_STRING=postgresql+psycopg://... python benchmarks/bench_ann_recall.py --rows 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_postgres import PGVector
+
+from db import get_engine, resolve_connection_string
+from pg_bulk_writer import PgBulkWriter
+from vector_index import VectorIndex
+
+
+def synthetic_corpus(rows, dimensions, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions))
+    data = centers[rng.integers(0, clusters, rows)] + 0.3 * rng.normal(size=(rows, dimensions))
+    return (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3)}
+
+
+def sweep(index, queries, truth, k, **knobs):
+    recalls, latencies = [], []
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = index.search(q, k=k, **knobs)
+        latencies.append(time.perf_counter() - start)
+        got = {doc.metadata["id"] for doc, _ in hits}
+        recalls.append(len(got & expected) / k)
+    return {"knobs": knobs, "recall": round(float(np.mean(recalls)), 4), **percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    connection_string = resolve_connection_string()
+    engine = get_engine(connection_string)
+    name = "bench_ann_recall"
+    store = PGVector(embeddings=DeterministicFakeEmbedding(size=args.dimensions), collection_name=name,
+                     connection=connection_string, pre_delete_collection=True)
+    data = synthetic_corpus(args.rows, args.dimensions, args.clusters)
+    with PgBulkWriter(engine, name, upsert=False) as writer:
+        for start in range(0, args.rows, 10_000):
+            part = data[start:start + 10_000]
+            writer.write([f"doc {start + i}" for i in range(len(part))], part.tolist(),
+                         ids=[f"{name}-{start + i}" for i in range(len(part))])
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE langchain_pg_embedding")
+
+    queries = synthetic_corpus(args.queries, args.dimensions, args.clusters, seed=1)
+    index = VectorIndex(engine, name)
+    exact_latencies, truth = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = index.search(q, k=args.k, exact=True)
+        exact_latencies.append(time.perf_counter() - start)
+        truth.append({doc.metadata["id"] for doc, _ in hits})
+    report = {"rows": args.rows, "dimensions": args.dimensions, "k": args.k,
+              "exact": percentiles(exact_latencies), "hnsw": [], "ivfflat": []}
+
+    start = time.perf_counter()
+    index.create_index("hnsw", m=16, ef_construction=64)
+    report["hnsw_build_s"] = round(time.perf_counter() - start, 2)
+    for ef in (10, 20, 40, 80, 160, 320):
+        report["hnsw"].append(sweep(index, queries, truth, args.k, ef_search=max(ef, args.k)))
+    index.drop_index("hnsw")
+
+    start = time.perf_counter()
+    index.create_index("ivfflat")
+    report["ivfflat_build_s"] = round(time.perf_counter() - start, 2)
+    for probes in (1, 2, 5, 10, 20, 50):
+        report["ivfflat"].append(sweep(index, queries, truth, args.k, probes=probes))
+    report["indexes"] = index.inspect()
+    index.drop_index("ivfflat")
+
+    store.delete_collection()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare PGVector.add_embeddings with PgBulkWriter COPY throughput.
+
+Needs a local Postgres with pgvector; writes random vectors into a scratch
+collection that is dropped afterwards.
+
+    POSTGRES_CONNECTION_STRING=postgresql+psycopg://... python benchmarks/bench_bulk_writer.py --rows 50000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_postgres import PGVector
+
+from db import get_engine, resolve_connection_string
+from pg_bulk_writer import PgBulkWriter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    args = parser.parse_args()
+
+    connection_string = resolve_connection_string()
+    engine = get_engine(connection_string)
+    rng = random.Random(0)
+    rows = [(f"bench-{i}", f"chunk {i} " + "lorem ipsum " * 60,
+             [rng.uniform(-1, 1) for _ in range(args.dimensions)], {"source": "bench", "chunk": i})
+            for i in range(args.rows)]
+
+    def batches():
+        for start in range(0, len(rows), args.batch_size):
+            part = rows[start:start + args.batch_size]
+            yield [r[0] for r in part], [r[1] for r in part], [r[2] for r in part], [r[3] for r in part]
+
+    results = {}
+    for mode in ("orm", "copy_upsert", "copy_append"):
+        store = PGVector(embeddings=DeterministicFakeEmbedding(size=args.dimensions),
+                         collection_name=f"bench_bulk_{mode}", connection=connection_string,
+                         pre_delete_collection=True)
+        start = time.perf_counter()
+        if mode == "orm":
+            for ids, texts, vectors, metas in batches():
+                store.add_embeddings(texts=texts, embeddings=vectors, metadatas=metas,
+                                     ids=[f"{mode}-{i}" for i in ids])
+        else:
+            with PgBulkWriter(engine, f"bench_bulk_{mode}", upsert=(mode == "copy_upsert")) as writer:
+                for ids, texts, vectors, metas in batches():
+                    writer.write(texts, vectors, metas, ids=[f"{mode}-{i}" for i in ids])
+        elapsed = time.perf_counter() - start
+        results[mode] = {"seconds": round(elapsed, 3), "rows_per_s": round(args.rows / elapsed, 1)}
+        store.delete_collection()
+
+    print(json.dumps({"rows": args.rows, "dimensions": args.dimensions, "results": results}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Per-turn chat-memory cost as a session grows.
+
+At each history size, times --samples turns of (append turn + load context)
+for the windowed ChatMemory and for the old pattern of reading the whole
+session history, and reports the prompt tokens each would send. Uses the
+LLM-free summarizer; needs POSTGRES_CONNECTION_STRING.
+
+    python benchmarks/bench_chat_memory.py --sizes 100,1000,5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agent_memory import MESSAGES_TABLE, ChatMemory, truncating_summarizer
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {"mean_ms": round(float(ms.mean()), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3)}
+
+
+def turn(i):
+    return (f"Question {i}: what about item {i} and its dependencies on item {i // 2}?",
+            f"Answer {i}: item {i} depends on item {i // 2}; " + "details " * 40)
+
+
+def full_history(memory, session_id):
+    with memory.engine.connect() as conn:
+        rows = conn.execute(text(
+            f"SELECT role, content, tokens FROM {MESSAGES_TABLE} WHERE session_id = :s ORDER BY id"
+        ), {"s": session_id}).all()
+    return sum(r.tokens for r in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,500,1000,2000,5000")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--token-budget", type=int, default=1500)
+    args = parser.parse_args()
+
+    memory = ChatMemory(token_budget=args.token_budget, summarizer=truncating_summarizer(), background=False)
+    session_id = f"bench-{uuid.uuid4()}"
+    report, written = [], 0
+    try:
+        for size in sorted(int(s) for s in args.sizes.split(",")):
+            while written < size:
+                memory.add_turn(session_id, *turn(written // 2))
+                written += 2
+            windowed, full, window_tokens, full_tokens = [], [], 0, 0
+            for _ in range(args.samples):
+                start = time.perf_counter()
+                memory.add_turn(session_id, *turn(written // 2))
+                summary, messages = memory.context(session_id)
+                windowed.append(time.perf_counter() - start)
+                window_tokens = memory.count_tokens(summary) + sum(memory.count_tokens(c) for _, c in messages)
+
+                start = time.perf_counter()
+                full_tokens = full_history(memory, session_id)
+                full.append(time.perf_counter() - start)
+                written += 2
+            report.append({
+                "messages": written,
+                "windowed": {**summarize(windowed), "prompt_tokens": window_tokens},
+                "full_history_read": {**summarize(full), "prompt_tokens": full_tokens},
+            })
+    finally:
+        memory.clear(session_id)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Prompt tokens and fact coverage: plain top-k stuffing vs ContextPacker.
+
+A synthetic corpus of topic documents is split with the app's splitter
+settings (chunk_overlap=200, so neighbouring chunks share text). Each topic
+has facts spread through its document; queries ask about one topic. The
+stand-in embedder hashes words. For every query the top --fetch-k chunks are
+taken by cosine similarity, then compared: the plain top-k versus MMR +
+merge + packing at a budget of --budget tokens (default: whatever top-k used).
+Runs offline.
+
+    python benchmarks/bench_context_packing.py --topics 40 --k 3
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from context_packing import ContextPacker
+
+FILLER = ("The report continues with general remarks about scheduling, staffing and budgets that apply "
+          "across all departments and do not concern any particular system. ")
+FACT = re.compile(r"FACT-\d+-\d+")
+
+
+def embed(text, dims=256):
+    vec = np.zeros(dims, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()):
+        vec[int(hashlib.md5(word.encode()).hexdigest(), 16) % dims] += 1.0
+    return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+
+def corpus(topics, facts_per_topic, rng):
+    docs = []
+    for t in range(topics):
+        name = f"system{t} gateway{t} module{t}"
+        parts = []
+        for f in range(facts_per_topic):
+            parts.append(FILLER * rng.randint(2, 5))
+            parts.append(f"FACT-{t}-{f}: the {name} setting {f} controls retries and timeouts. ")
+        docs.append(Document(page_content="".join(parts), metadata={"source": f"topic{t}.txt"}))
+    return docs, lambda t: f"How do the {t} system{t} gateway{t} module{t} settings control retries?"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", type=int, default=40)
+    parser.add_argument("--facts", type=int, default=6)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--context-k", type=int, default=6)
+    parser.add_argument("--budget", type=int, default=None)
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    docs, question = corpus(args.topics, args.facts, random.Random(args.seed))
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    chunks = splitter.split_documents(docs)
+    for i, chunk in enumerate(chunks):
+        chunk.metadata["id"] = str(i)
+    matrix = np.stack([embed(c.page_content) for c in chunks])
+
+    rows, pack_seconds = [], []
+    for t in range(args.topics):
+        q = embed(question(t))
+        top = np.argsort(-(matrix @ q))[:args.fetch_k]
+        candidates = [chunks[i] for i in top]
+        packer = ContextPacker(args.context_k, args.budget, args.lambda_mult)
+        baseline = candidates[:args.k]
+        baseline_tokens = sum(packer.count_tokens(d.page_content) for d in baseline)
+        start = time.perf_counter()
+        packed, stats = packer.pack(q, candidates, matrix[top], baseline_k=args.k)
+        pack_seconds.append(time.perf_counter() - start)
+
+        def facts(selection):
+            return {f for d in selection for f in FACT.findall(d.page_content) if f.startswith(f"FACT-{t}-")}
+
+        rows.append((baseline_tokens, stats["packed_tokens"], len(facts(baseline)), len(facts(packed))))
+
+    arr = np.asarray(rows, dtype=float)
+    print(json.dumps({
+        "queries": args.topics,
+        "chunks": len(chunks),
+        "baseline": {"prompt_tokens": round(arr[:, 0].mean(), 1), "facts_covered": round(arr[:, 2].mean(), 2)},
+        "packed": {"prompt_tokens": round(arr[:, 1].mean(), 1), "facts_covered": round(arr[:, 3].mean(), 2)},
+        "facts_per_topic": args.facts,
+        "pack_ms": round(float(np.mean(pack_seconds)) * 1000, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Offline end-to-end performance suite.
+
+Builds a synthetic PDF/TXT/CSV/XLSX corpus, then measures against a local
+Postgres + pgvector with deterministic fake embeddings and a fake chat model
+(see offline_fakes; no network is used). The fake embedder sits behind the
+same EmbeddingScheduler and embedding cache as production (a fresh cache per
+run) unless --raw-embeddings is given:
+
+- ingest: ``create_rag_index_pgvector`` docs/s, chunks/s and peak RSS, plus
+  an unchanged re-run (manifest skip path)
+- upload: ``rag_utils.process_uploaded_files`` on the PDF/TXT files
+- query: ``RAGSearchTool.run`` latency and streamed time to first token
+- routing: ``keyword_route``, ``SemanticRouter.classify`` and the app's
+  route-and-execute flow (router, then tool or chat model)
+
+Results are JSON (stdout, or --output); --compare prints the ratio of each
+numeric metric to an earlier run's file.
+
+    POSTGRES_CONNECTION_STRING=postgresql+psycopg://... \\
+        python benchmarks/bench_e2e.py --docs 8 --queries 200 --output run.json [--compare base.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from langchain_postgres import PGVector
+from sqlalchemy import text
+
+from db import get_engine, resolve_connection_string
+from embedding_cache import scheduled_embeddings
+from index_manifest import MANIFEST_TABLE
+from load_data import create_rag_index_pgvector
+from offline_fakes import FakeChatModel, HashEmbeddings
+from rag_utils import process_uploaded_files
+from routing import SemanticRouter, keyword_route, llm_route_fallback
+from synthetic_corpus import build_corpus, queries
+from tools.rag_search_tool import RAGSearchTool
+from tools.remainder_tool import ReminderTool
+from tools.to_do_list_tool import ToDoListTool
+
+ROUTING_DATA = os.path.join(os.path.dirname(__file__), "data", "routing_labeled.jsonl")
+
+
+def peak_rss_mb():
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(self_kb, children_kb) / 1024, 1)
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return {f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in (50, 95, 99)}
+
+
+class _Upload:
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self._path = path
+
+    def getvalue(self):
+        with open(self._path, "rb") as f:
+            return f.read()
+
+
+def bench_ingest(paths, collection, cs, embeddings, workers, bulk):
+    written = [0]
+
+    def progress(done, _total):
+        written[0] = done
+
+    start = time.perf_counter()
+    create_rag_index_pgvector(paths, collection_name=collection, connection_string=cs, embeddings=embeddings,
+                              workers=workers, bulk=bulk, progress=progress)
+    seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    create_rag_index_pgvector(paths, collection_name=collection, connection_string=cs, embeddings=embeddings)
+    unchanged = time.perf_counter() - start
+    return {
+        "files": len(paths),
+        "chunks": written[0],
+        "seconds": round(seconds, 3),
+        "docs_per_s": round(len(paths) / seconds, 3),
+        "chunks_per_s": round(written[0] / seconds, 1),
+        "unchanged_rerun_s": round(unchanged, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_upload(paths, collection, cs, embeddings):
+    start = time.perf_counter()
+    store = process_uploaded_files([_Upload(p) for p in paths], cs, collection, embeddings=embeddings)
+    seconds = time.perf_counter() - start
+    return {"files": len(paths), "ok": store is not None, "seconds": round(seconds, 3),
+            "docs_per_s": round(len(paths) / seconds, 3), "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_query(tool, qs):
+    latencies, ttft = [], []
+    for q in qs:
+        start = time.perf_counter()
+        tool.run(q)
+        latencies.append(time.perf_counter() - start)
+    for q in qs[: max(1, len(qs) // 4)]:
+        start = time.perf_counter()
+        _, tokens = tool.stream(q)
+        next(tokens, None)
+        ttft.append(time.perf_counter() - start)
+        for _ in tokens:
+            pass
+    return {"queries": len(qs), **percentiles(latencies),
+            "ttft": percentiles(ttft), "qps": round(len(qs) / sum(latencies), 2),
+            "context": tool.context_stats(), "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_routing(router, rag_tool, llm, reminders, todos, examples):
+    def route_and_execute(user_input):
+        # Mirrors app.py: classify, then run the tool or the chat model
+        route = router.route(user_input)
+        if route == "rag":
+            return rag_tool.run(user_input)
+        if route == "reminder":
+            return reminders.add(user_input)
+        if route == "todo":
+            return todos.add(user_input)
+        if route == "chat":
+            return llm.invoke(user_input).content
+        return route  # weather/search need the network; routing cost only
+
+    results = {}
+    for name, fn in (("keyword", keyword_route), ("semantic", router.classify),
+                     ("route_and_execute", route_and_execute)):
+        fallbacks_before = router.fallbacks
+        latencies = []
+        for ex in examples:
+            start = time.perf_counter()
+            fn(ex["text"])
+            latencies.append(time.perf_counter() - start)
+        results[name] = {**percentiles(latencies), "llm_fallbacks": router.fallbacks - fallbacks_before}
+    return results
+
+
+def flatten(report, prefix=""):
+    out = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = flatten(json.load(f))
+    return {k: round(v / baseline[k], 3) for k, v in flatten(current).items()
+            if k in baseline and baseline[k] and not k.startswith("meta.")}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=8, help="files of each type")
+    parser.add_argument("--pdf-pages", type=int, default=5)
+    parser.add_argument("--txt-paragraphs", type=int, default=60)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--llm-token-ms", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--bulk", action="store_true")
+    parser.add_argument("--raw-embeddings", action="store_true",
+                        help="use the fake embedder directly, without the scheduler and cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark collections")
+    args = parser.parse_args()
+
+    cs = resolve_connection_string()
+    fake_embeddings = HashEmbeddings(latency_ms=args.embed_latency_ms)
+    llm = FakeChatModel(first_token_ms=args.llm_first_token_ms, token_ms=args.llm_token_ms)
+    run_id = uuid.uuid4().hex[:8]
+    collection, upload_collection = f"bench_e2e_{run_id}", f"bench_e2e_upload_{run_id}"
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+
+    report = {"meta": {"commit": commit, "python": platform.python_version(), "args": vars(args),
+                       "started_at": time.strftime("%Y-%m-%dT%H:%M:%S")}}
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = fake_embeddings if args.raw_embeddings else scheduled_embeddings(
+            fake_embeddings, "bench-hash", path=os.path.join(tmp, "embeddings.sqlite3"))
+        files = build_corpus(os.path.join(tmp, "corpus"), args.docs, args.pdf_pages, args.txt_paragraphs,
+                             args.rows, args.seed)
+        report["meta"]["corpus"] = {ext: len(paths) for ext, paths in files.items()}
+        paths = [p for ext in ("pdf", "txt", "csv", "xlsx") for p in files[ext]]
+        try:
+            report["ingest"] = bench_ingest(paths, collection, cs, embeddings, args.workers, args.bulk)
+            report["upload"] = bench_upload(files["pdf"] + files["txt"], upload_collection, cs, embeddings)
+
+            rag_tool = RAGSearchTool(cs, collection_name=collection, embeddings=embeddings, llm=llm,
+                                     use_answer_cache=False)
+            report["query"] = bench_query(rag_tool, queries(args.docs, args.queries, args.seed))
+
+            with open(ROUTING_DATA) as f:
+                examples = [json.loads(line) for line in f if line.strip()]
+            router = SemanticRouter(embeddings, fallback=llm_route_fallback(llm), cache_dir=None)
+            store = os.path.join(tmp, "assistant.sqlite3")
+            # Temp legacy paths: the defaults would import and rename the user's own JSON files
+            reminders = ReminderTool(storage_file=os.path.join(tmp, "reminders.json"), db_path=store)
+            todos = ToDoListTool(storage_file=os.path.join(tmp, "todo.json"), db_path=store)
+            report["routing"] = bench_routing(router, rag_tool, llm, reminders, todos, examples)
+            if not args.raw_embeddings:
+                report["embeddings"] = {"cache": embeddings.stats(), "scheduler": embeddings.underlying.stats(),
+                                        "fake_calls": fake_embeddings.calls}
+        finally:
+            if not args.keep:
+                for name in (collection, upload_collection):
+                    PGVector(embeddings=embeddings, collection_name=name, connection=cs).delete_collection()
+                with get_engine(cs).begin() as conn:
+                    conn.execute(text(f"DELETE FROM {MANIFEST_TABLE} WHERE collection_name = :c"),
+                                 {"c": collection})
+
+    if args.compare:
+        report["ratio_vs_baseline"] = compare(report, args.compare)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark EmbeddingScheduler against the local stub embedding server.
+
+Compares one synchronous ``embed_documents`` call (the old path) with the
+scheduler at several concurrency levels and prints one JSON line per run.
+
+    python benchmarks/bench_embedding_scheduler.py --chunks 5000 --latency-ms 80 --rps 40
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_openai import OpenAIEmbeddings
+
+from embedding_scheduler import EmbeddingScheduler
+from stub_embedding_server import start_server
+
+
+def _stub_stats(base_url):
+    with urllib.request.urlopen(base_url + "/stats") as r:
+        return json.loads(r.read())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--rps", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    server, _, base_url = start_server(latency_ms=args.latency_ms, rps=args.rps,
+                                       error_rate=args.error_rate, dimensions=256)
+    texts = [f"chunk {i} " + "x" * args.chunk_chars for i in range(args.chunks)]
+
+    def client(max_retries):
+        return OpenAIEmbeddings(model="stub", base_url=base_url, api_key="stub", dimensions=256,
+                                check_embedding_ctx_length=False, max_retries=max_retries)
+
+    runs = [("baseline", None)] + [(f"scheduler_c{c}", c) for c in args.concurrency]
+    for name, concurrency in runs:
+        before = _stub_stats(base_url)
+        start = time.perf_counter()
+        error = None
+        try:
+            if concurrency is None:
+                client(max_retries=2).embed_documents(texts)
+                stats = {}
+            else:
+                scheduler = EmbeddingScheduler(client(max_retries=0), max_batch_tokens=50_000,
+                                               max_concurrency=concurrency,
+                                               requests_per_minute=args.rps * 60)
+                scheduler.embed_documents(texts)
+                stats = scheduler.stats()
+        except Exception as e:
+            error, stats = repr(e), {}
+        elapsed = time.perf_counter() - start
+        after = _stub_stats(base_url)
+        print(json.dumps({
+            "run": name,
+            "seconds": round(elapsed, 3),
+            "chunks_per_s": round(len(texts) / elapsed, 1),
+            "server_requests": after["requests"] - before["requests"],
+            "server_429s": after["rate_limited"] - before["rate_limited"],
+            "scheduler": stats,
+            "error": error,
+        }))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latency added vs recall gained by hybrid (full-text + vector, RRF) retrieval.
+
+The synthetic corpus is spreadsheet-like rows that differ mainly by part
+number. The stand-in embedder hashes words but ignores tokens containing
+digits, mimicking how embedding models blur exact identifiers; queries ask
+for one specific part number. Prints recall@k and latency for both modes.
+
+    POSTGRES_CONNECTION_STRING=postgresql+psycopg://... python benchmarks/bench_hybrid.py --rows 50000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_core.embeddings import Embeddings
+from langchain_postgres import PGVector
+
+from db import get_engine, resolve_connection_string
+from hybrid_search import HybridSearcher
+from pg_bulk_writer import PgBulkWriter
+from vector_index import VectorIndex
+
+
+class WordHashEmbeddings(Embeddings):
+    def __init__(self, size=256):
+        self.size = size
+
+    def embed_query(self, text):
+        v = np.zeros(self.size, dtype=np.float32)
+        for word in text.lower().split():
+            if any(c.isdigit() for c in word):
+                continue
+            h = int(hashlib.md5(word.encode()).hexdigest(), 16)
+            v[h % self.size] += 1.0 if (h >> 64) & 1 else -1.0
+        norm = np.linalg.norm(v)
+        return (v / norm if norm else v + 1e-3).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+WORDS = "bolt washer bracket hinge gasket valve sensor relay fuse spring clamp seal".split()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    connection_string = resolve_connection_string()
+    engine = get_engine(connection_string)
+    name = "bench_hybrid"
+    embedder = WordHashEmbeddings()
+    store = PGVector(embeddings=embedder, collection_name=name, connection=connection_string,
+                     pre_delete_collection=True)
+    parts = [f"PN-{rng.randint(10000, 99999)}-{i}" for i in range(args.rows)]
+    texts = [f"part {p} {rng.choice(WORDS)} {rng.choice(WORDS)} qty {rng.randint(1, 500)} stock" for p in parts]
+    with PgBulkWriter(engine, name, upsert=False) as writer:
+        for start in range(0, args.rows, 5000):
+            writer.write(texts[start:start + 5000], embedder.embed_documents(texts[start:start + 5000]),
+                         ids=[f"{name}-{i}" for i in range(start, min(start + 5000, args.rows))])
+
+    index = VectorIndex(engine, name)
+    index.create_index("hnsw")
+    hybrid = HybridSearcher(index)
+    hybrid.ensure_fulltext_index()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE langchain_pg_embedding")
+
+    targets = rng.sample(range(args.rows), args.queries)
+    report = {}
+    for mode in ("vector", "hybrid"):
+        hits, latencies = 0, []
+        for i in targets:
+            query = f"how many {texts[i].split()[2]} for part {parts[i]}"
+            qv = embedder.embed_query(query)
+            start = time.perf_counter()
+            if mode == "vector":
+                results = index.search(qv, k=args.k)
+            else:
+                results = hybrid.search(query, qv, k=args.k)
+            latencies.append(time.perf_counter() - start)
+            hits += any(doc.metadata["id"] == f"{name}-{i}" for doc, _ in results)
+        ms = np.asarray(latencies) * 1000
+        report[mode] = {"recall_at_k": hits / len(targets),
+                        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                        "p95_ms": round(float(np.percentile(ms, 95)), 3)}
+    report["added_p50_ms"] = round(report["hybrid"]["p50_ms"] - report["vector"]["p50_ms"], 3)
+    store.delete_collection()
+    print(json.dumps({"rows": args.rows, "k": args.k, **report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Reminder/to-do storage: whole-file JSON rewrite vs the SQLite record store.
+
+Measures per-add latency as the list grows (the JSON baseline is capped at
+--json-items since every add rewrites the file), indexed lookups by id,
+status and due time at --items, and concurrent writers (threads and
+processes) checking that no write is lost.
+
+    python benchmarks/bench_record_store.py --items 100000 --writers 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from record_store import RecordStore
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {"mean_ms": round(float(ms.mean()), 4), "p95_ms": round(float(np.percentile(ms, 95)), 4)}
+
+
+def bench_json(path, n):
+    items, samples = [], []
+    for i in range(n):
+        start = time.perf_counter()
+        items.append({"message": f"reminder {i}", "time": None})
+        with open(path, "w") as f:
+            json.dump(items, f, indent=2)
+        samples.append(time.perf_counter() - start)
+    return {"items": n, "add": summarize(samples), "last_add_ms": round(samples[-1] * 1000, 3)}
+
+
+def bench_store(db_path, n, lookups):
+    store = RecordStore(db_path, kind="reminder")
+    now = time.time()
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        store.add({"message": f"reminder {i}"}, status="done" if i % 10 else "open", due_at=now + i)
+        samples.append(time.perf_counter() - start)
+
+    ids = [random.randint(1, n) for _ in range(lookups)]
+    start = time.perf_counter()
+    for record_id in ids:
+        store.get(record_id)
+    by_id = (time.perf_counter() - start) / lookups
+
+    start = time.perf_counter()
+    open_items = store.list(status="open", limit=20)
+    by_status = time.perf_counter() - start
+
+    start = time.perf_counter()
+    due = store.due(now + n / 2, status="open", limit=20)
+    by_due = time.perf_counter() - start
+
+    return {
+        "items": n,
+        "add": summarize(samples),
+        "last_add_ms": round(samples[-1] * 1000, 3),
+        "get_by_id_ms": round(by_id * 1000, 4),
+        "list_open_20_ms": round(by_status * 1000, 3),
+        "due_20_ms": round(by_due * 1000, 3),
+        "sanity": len(open_items) == 20 and len(due) == 20,
+    }
+
+
+def _write(db_path, kind, count):
+    store = RecordStore(db_path, kind=kind)
+    for i in range(count):
+        store.add({"message": f"{kind} {i}"})
+
+
+def bench_concurrent(db_path, writers, per_writer, processes):
+    kind = "proc" if processes else "thread"
+    RecordStore(db_path, kind=kind)
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        (ctx.Process if processes else threading.Thread)(target=_write, args=(db_path, kind, per_writer))
+        for _ in range(writers)
+    ]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    total = RecordStore(db_path, kind=kind).count()
+    return {
+        "writers": writers,
+        "expected": writers * per_writer,
+        "stored": total,
+        "writes_per_s": round(total / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--json-items", type=int, default=5_000)
+    parser.add_argument("--lookups", type=int, default=1_000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--per-writer", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = {
+            "json_rewrite": bench_json(os.path.join(tmp, "reminders.json"), args.json_items),
+            "record_store": bench_store(os.path.join(tmp, "store.sqlite3"), args.items, args.lookups),
+            "threads": bench_concurrent(os.path.join(tmp, "store.sqlite3"), args.writers, args.per_writer, False),
+            "processes": bench_concurrent(os.path.join(tmp, "store.sqlite3"), args.writers, args.per_writer, True),
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Reminder firing cost with --pending open reminders.
+
+Uses a fake clock: reminders are spread over a day, then the clock is
+advanced in --steps increments and each step's ``fire_due`` call is timed.
+"scan" is the old approach of filtering the whole list on every poll.
+
+    python benchmarks/bench_reminder_scheduler.py --pending 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from record_store import RecordStore
+from reminder_scheduler import ReminderScheduler
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {"mean_ms": round(float(ms.mean()), 4), "p95_ms": round(float(np.percentile(ms, 95)), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pending", type=int, default=100_000)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    start_ts = 1_700_000_000.0
+    due = start_ts + rng.uniform(0, 86400, args.pending)
+    now = [start_ts]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RecordStore(os.path.join(tmp, "store.sqlite3"), kind="reminder")
+        store.add_many({"payload": {"message": f"r{i}", "time": None}, "due_at": float(d)} for i, d in enumerate(due))
+
+        t = time.perf_counter()
+        scheduler = ReminderScheduler(store, clock=lambda: now[0])
+        load_s = time.perf_counter() - t
+
+        idle = []
+        for _ in range(args.steps):
+            t = time.perf_counter()
+            scheduler.fire_due()
+            idle.append(time.perf_counter() - t)
+
+        fire, fired = [], 0
+        for step in range(1, args.steps + 1):
+            now[0] = start_ts + 86400 * step / args.steps
+            t = time.perf_counter()
+            fired += len(scheduler.fire_due())
+            fire.append(time.perf_counter() - t)
+
+        items = [{"message": f"r{i}", "due_at": float(d)} for i, d in enumerate(due)]
+        scan = []
+        for step in range(args.steps):
+            t = time.perf_counter()
+            [r for r in items if r["due_at"] <= start_ts]
+            scan.append(time.perf_counter() - t)
+
+    print(json.dumps({
+        "pending": args.pending,
+        "load_s": round(load_s, 3),
+        "idle_poll": summarize(idle),
+        "fire_step": summarize(fire),
+        "fire_per_reminder_ms": round(sum(fire) * 1000 / max(fired, 1), 4),
+        "scan_poll": summarize(scan),
+        "fired": fired,
+        "all_fired": fired == args.pending and scheduler.pending() == 0,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
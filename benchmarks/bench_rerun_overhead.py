@@ -0,0 +1,72 @@
+"""
+Per-rerun tool setup cost before and after the process-wide registry.
+
+"before" constructs every tool from scratch each iteration, as app.py used to
+on each Streamlit rerun; "after" fetches them from a warmed ToolRegistry.
+Needs the same environment as the app (Postgres, OpenAI key).
+
+    python benchmarks/bench_rerun_overhead.py --reruns 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tool_registry import ToolRegistry, default_factories
+
+
+TOOLS = ("rag", "reminder", "todo", "weather", "search")
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {"mean_ms": round(float(ms.mean()), 3), "p95_ms": round(float(np.percentile(ms, 95)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    factories = default_factories()
+    before, errors = [], {}
+    for _ in range(args.reruns):
+        start = time.perf_counter()
+        fresh = ToolRegistry(factories)
+        for name in TOOLS:
+            try:
+                fresh.get(name)
+            except Exception as e:
+                errors[name] = str(e)
+        before.append(time.perf_counter() - start)
+
+    registry = ToolRegistry(factories)
+    warm_start = time.perf_counter()
+    registry.warm_up(TOOLS)
+    warm_up_s = time.perf_counter() - warm_start
+    after = []
+    for _ in range(args.reruns):
+        start = time.perf_counter()
+        for name in TOOLS:
+            if name not in errors:
+                registry.get(name)
+        after.append(time.perf_counter() - start)
+
+    print(json.dumps({
+        "reruns": args.reruns,
+        "before": summarize(before),
+        "after": summarize(after),
+        "warm_up_s": round(warm_up_s, 3),
+        "health": registry.health(),
+        "errors": errors,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
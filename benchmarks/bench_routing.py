@@ -0,0 +1,106 @@
+"""
+Routing accuracy and latency: keyword chain vs semantic router vs ReAct.
+
+Runs the labeled set in benchmarks/data/routing_labeled.jsonl through
+``keyword_route``, ``SemanticRouter`` (with and without the LLM fallback) and,
+with ``--react``, one planning step of the zero-shot ReAct agent from
+agent.py (tools are never executed). Prints accuracy, p50/p95 latency and
+LLM calls per route decision as JSON.
+
+    python benchmarks/bench_routing.py [--react] [--threshold 0.4]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from embedding_cache import get_embeddings
+from routing import TOOL_DESCRIPTIONS, TOOL_ROUTES, SemanticRouter, keyword_route, llm_route_fallback
+
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "routing_labeled.jsonl")
+
+
+def evaluate(name, route_fn, examples, llm_calls=lambda: 0):
+    correct, latencies = 0, []
+    confusion = {}
+    calls_before = llm_calls()
+    for ex in examples:
+        start = time.perf_counter()
+        got = route_fn(ex["text"])
+        latencies.append(time.perf_counter() - start)
+        correct += got == ex["route"]
+        if got != ex["route"]:
+            key = f"{ex['route']}->{got}"
+            confusion[key] = confusion.get(key, 0) + 1
+    ms = np.asarray(latencies) * 1000
+    return {
+        "router": name,
+        "accuracy": round(correct / len(examples), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "llm_calls_per_query": round((llm_calls() - calls_before) / len(examples), 3),
+        "errors": confusion,
+    }
+
+
+def react_router():
+    from langchain.agents import Tool, initialize_agent
+    from langchain_core.agents import AgentFinish
+    from langchain_openai import ChatOpenAI
+
+    # Same names/descriptions as tool_declarations, but planning only.
+    tools = [Tool(name=name, func=lambda _: "", description=desc) for name, desc in TOOL_DESCRIPTIONS.items()]
+    agent = initialize_agent(tools, ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo"),
+                             agent="zero-shot-react-description")
+
+    def route(text):
+        step = agent.agent.plan(intermediate_steps=[], input=text)
+        if isinstance(step, AgentFinish):
+            return "chat"
+        return TOOL_ROUTES.get(step.tool, "chat")
+
+    return route
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=0.4)
+    parser.add_argument("--react", action="store_true", help="also benchmark the ReAct agent (calls the LLM)")
+    parser.add_argument("--fallback", action="store_true", help="enable the LLM fallback for the semantic router")
+    args = parser.parse_args()
+
+    with open(DATA) as f:
+        examples = [json.loads(line) for line in f]
+    embeddings = get_embeddings()
+
+    fallback = None
+    if args.fallback:
+        from langchain_openai import ChatOpenAI
+        fallback = llm_route_fallback(ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo"))
+
+    start = time.perf_counter()
+    router = SemanticRouter(embeddings, threshold=args.threshold, fallback=fallback)
+    build_s = time.perf_counter() - start
+    # Embed the evaluation queries once so latency reflects a warm query cache.
+    embeddings.embed_documents([ex["text"] for ex in examples])
+
+    results = [
+        evaluate("keyword", keyword_route, examples),
+        evaluate("semantic", router.route, examples, llm_calls=lambda: router.fallbacks),
+    ]
+    if args.react:
+        results.append(evaluate("react", react_router(), examples, llm_calls=lambda: 0))
+        results[-1]["llm_calls_per_query"] = 1.0
+    print(json.dumps({"examples": len(examples), "semantic_build_s": round(build_s, 3),
+                      "threshold": args.threshold, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Tabular ingestion: whole-sheet pandas load + character splitting vs
+streaming row-block chunking.
+
+Generates a CSV (and, with --xlsx, a workbook of the same rows written with
+openpyxl's write-only mode), then chunks it both ways and reports time, peak
+traced memory, chunk count, chunks that start or end mid-row, and chunks
+that carry the header. Runs offline; nothing is embedded.
+
+    python benchmarks/bench_tabular_ingest.py --rows 500000 --xlsx
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from tabular_chunking import iter_tabular_documents
+
+HEADER = ["order_id", "customer", "region", "sku", "quantity", "unit_price", "notes"]
+
+
+def make_rows(n, seed):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield [f"ORD-{i:08d}", f"customer {rng.randint(1, 5000)}", rng.choice(["north", "south", "east", "west"]),
+               f"SKU-{rng.randint(1, 99999):05d}", str(rng.randint(1, 50)), f"{rng.uniform(1, 500):.2f}",
+               rng.choice(["", "expedite", "gift wrap, fragile", "call before delivery"])]
+
+
+def write_inputs(tmp, n, seed, xlsx):
+    csv_path = os.path.join(tmp, "orders.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(make_rows(n, seed))
+    paths = {"csv": csv_path}
+    if xlsx:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("orders")
+        sheet.append(HEADER)
+        for row in make_rows(n, seed):
+            sheet.append(row)
+        paths["xlsx"] = os.path.join(tmp, "orders.xlsx")
+        workbook.save(paths["xlsx"])
+    return paths
+
+
+def old_chunks(path):
+    if path.endswith(".csv"):
+        text = pd.read_csv(path, dtype=str, keep_default_na=False).to_csv(index=False)
+    else:
+        text = "".join(f"\n--- Sheet: {name} ---\n" + df.to_csv(index=False)
+                       for name, df in pd.read_excel(path, sheet_name=None, dtype=str).items())
+    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_text(text)
+
+
+def new_chunks(path, token_budget):
+    return (doc.page_content for doc in iter_tabular_documents(path, token_budget))
+
+
+def measure(chunks_fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = broken = with_header = 0
+    for chunk in chunks_fn():
+        count += 1
+        lines = [line for line in chunk.splitlines() if line and not line.startswith(("Sheet:", "--- Sheet"))]
+        if lines and lines[0].startswith(HEADER[0]):
+            with_header += 1
+        edges = {lines[0], lines[-1]} - {",".join(HEADER)} if lines else set()
+        broken += sum(1 for line in edges if len(next(csv.reader([line]))) != len(HEADER))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 2), "peak_mb": round(peak / 2 ** 20, 1), "chunks": count,
+            "chunks_cut_mid_row": broken, "chunks_with_header": with_header}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--token-budget", type=int, default=250)
+    parser.add_argument("--xlsx", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_inputs(tmp, args.rows, args.seed, args.xlsx)
+        report = {"rows": args.rows}
+        for kind, path in paths.items():
+            report[kind] = {
+                "file_mb": round(os.path.getsize(path) / 2 ** 20, 1),
+                "whole_sheet_split": measure(lambda: old_chunks(path)),
+                "row_blocks": measure(lambda: new_chunks(path, args.token_budget)),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
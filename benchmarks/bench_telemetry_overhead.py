@@ -0,0 +1,84 @@
+"""
+Cost of the telemetry instrumentation on a hot path.
+
+Times an empty block, a ``span``, a ``@timed`` call, ``count`` and
+``timed_stream`` per item with telemetry enabled (with and without an active
+per-turn trace) and disabled, and the size/render time of the Prometheus
+text after the run.
+
+    python benchmarks/bench_telemetry_overhead.py --iterations 200000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import telemetry
+
+
+def per_call_ns(fn, iterations):
+    start = time.perf_counter()
+    fn(iterations)
+    return round((time.perf_counter() - start) / iterations * 1e9, 1)
+
+
+def measure(iterations):
+    @telemetry.timed("bench_timed")
+    def work():
+        pass
+
+    def empty(n):
+        for _ in range(n):
+            pass
+
+    def spans(n):
+        for _ in range(n):
+            with telemetry.span("bench_span"):
+                pass
+
+    def decorated(n):
+        for _ in range(n):
+            work()
+
+    def counts(n):
+        for _ in range(n):
+            telemetry.count("bench_total", kind="bench")
+
+    def streamed(n):
+        for _ in telemetry.timed_stream("bench_stream", range(n)):
+            pass
+
+    results = {"loop": per_call_ns(empty, iterations)}
+    for name, fn in (("span", spans), ("timed", decorated), ("count", counts), ("timed_stream", streamed)):
+        results[name] = round(per_call_ns(fn, iterations) - results["loop"], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    report = {"iterations": args.iterations}
+    telemetry.set_enabled(True)
+    report["enabled_ns"] = measure(args.iterations)
+    with telemetry.trace() as turn:
+        report["enabled_in_trace_ns"] = measure(args.iterations)
+    report["trace_stages"] = len(turn.breakdown())
+    telemetry.set_enabled(False)
+    report["disabled_ns"] = measure(args.iterations)
+    telemetry.set_enabled(True)
+
+    start = time.perf_counter()
+    text = telemetry.render_prometheus()
+    report["render_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    report["render_bytes"] = len(text)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Tenant-scoped retrieval: metadata-filter pushdown vs searching everything.
+
+Loads a synthetic clustered corpus split over tenants of Zipf-distributed
+size into a scratch collection that already has a collection-wide HNSW
+index. For the smallest and the largest tenant it reports latency and
+recall@k against exact filtered ground truth for:
+
+- post_filter: the old behaviour, top-k over the whole collection with other
+  tenants' chunks dropped afterwards
+- pushdown: ``VectorIndex.search(filter={"tenant": ...})`` (exact over the
+  GIN-matched rows while the tenant has no index of its own)
+- tenant_index_ef*: the same after ``ensure_tenant_index`` built the
+  tenant's partial HNSW index, at two ef_search values (large tenant only)
+
+plus unfiltered search as a reference.
+
+    POSTGRES_CONNECTION_STRING=postgresql+psycopg://... \\
+        python benchmarks/bench_tenant_filter.py --rows 200000 --tenants 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_postgres import PGVector
+
+from bench_ann_recall import percentiles, synthetic_corpus
+from db import get_engine, resolve_connection_string
+from pg_bulk_writer import PgBulkWriter
+from vector_index import VectorIndex
+
+
+def tenant_sizes(rows, tenants, skew):
+    weights = 1.0 / np.arange(1, tenants + 1) ** skew
+    sizes = np.maximum(1, np.floor(rows * weights / weights.sum())).astype(int)
+    sizes[0] += rows - sizes.sum()
+    return sizes
+
+
+def measure(search, queries, truth, k):
+    recalls, latencies = [], []
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        got = search(q)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len(got & expected) / max(1, min(k, len(expected))))
+    return {"recall": round(float(np.mean(recalls)), 4), **percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--tenants", type=int, default=50)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of tenant sizes")
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    connection_string = resolve_connection_string()
+    engine = get_engine(connection_string)
+    name = "bench_tenant_filter"
+    store = PGVector(embeddings=DeterministicFakeEmbedding(size=args.dimensions), collection_name=name,
+                     connection=connection_string, pre_delete_collection=True)
+    data = synthetic_corpus(args.rows, args.dimensions, args.clusters)
+    sizes = tenant_sizes(args.rows, args.tenants, args.skew)
+    owner = np.repeat(np.arange(args.tenants), sizes)
+    np.random.default_rng(2).shuffle(owner)
+    with PgBulkWriter(engine, name, upsert=False) as writer:
+        for start in range(0, args.rows, 10_000):
+            part = data[start:start + 10_000]
+            writer.write([f"doc {start + i}" for i in range(len(part))], part.tolist(),
+                         metadatas=[{"tenant": f"t{owner[start + i]}", "source": f"file{(start + i) % 97}.pdf"}
+                                    for i in range(len(part))],
+                         ids=[f"{name}-{start + i}" for i in range(len(part))])
+
+    index = VectorIndex(engine, name)
+    index.create_index("hnsw")
+    index.ensure_metadata_index()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE langchain_pg_embedding")
+
+    queries = synthetic_corpus(args.queries, args.dimensions, args.clusters, seed=1)
+    k = args.k
+    report = {"rows": args.rows, "tenants": args.tenants, "k": k,
+              "unfiltered": measure(lambda q: {d.metadata["id"] for d, _ in index.search(q, k=k)},
+                                    queries, [set()] * len(queries), k)}
+    report["unfiltered"].pop("recall")
+
+    for label, tenant_no in (("small_tenant", args.tenants - 1), ("large_tenant", 0)):
+        tenant = f"t{tenant_no}"
+        scope = {"tenant": tenant}
+        truth = [{d.metadata["id"] for d, _ in index.search(q, k=k, filter=scope, exact=True)} for q in queries]
+        result = {"rows": int(sizes[tenant_no])}
+        result["post_filter"] = measure(
+            lambda q: {d.metadata["id"] for d, _ in index.search(q, k=k) if d.metadata.get("tenant") == tenant},
+            queries, truth, k)
+        result["pushdown"] = measure(
+            lambda q: {d.metadata["id"] for d, _ in index.search(q, k=k, filter=scope)}, queries, truth, k)
+        if label == "large_tenant":
+            start = time.perf_counter()
+            index.ensure_tenant_index(tenant, min_rows=0, concurrently=False)
+            result["tenant_index_build_s"] = round(time.perf_counter() - start, 2)
+            for ef in (40, 100):
+                result[f"tenant_index_ef{ef}"] = measure(
+                    lambda q: {d.metadata["id"] for d, _ in index.search(q, k=k, filter=scope, ef_search=ef)},
+                    queries, truth, k)
+        report[label] = result
+
+    report["indexes"] = [{key: i[key] for key in ("name", "kind", "tenant", "size_bytes")} for i in index.inspect()]
+    index.drop_index("hnsw")
+    index.drop_index("hnsw", tenant="t0")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.metadata_index_name()}")
+    store.delete_collection()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
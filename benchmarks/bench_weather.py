@@ -0,0 +1,98 @@
+"""
+WeatherTool against the stub server: naive per-call ``requests.get`` vs the
+pooled, cached, single-flight tool.
+
+Runs --queries lookups over --cities cities (skewed towards popular ones)
+from --concurrency threads, a stampede of --concurrency callers asking for one
+uncached city, and a --cities batch vs sequential fetch. Reports wall time and
+the stub's request and connection counts.
+
+    python benchmarks/bench_weather.py --queries 500 --cities 20 --latency-ms 100
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stub_weather_server import start_server
+from tools.weather_tool import WeatherTool
+
+
+def naive_get_weather(url, city):
+    response = requests.get(url, params={"q": city, "appid": "x", "units": "metric"})
+    return response.status_code == 200
+
+
+def stub_stats(url):
+    return requests.get(url.rsplit("/", 1)[0] + "/stats").json()
+
+
+def timed(fn, queries, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(fn, queries))
+    return round(time.perf_counter() - start, 3)
+
+
+def run(latency_ms, fn_factory, queries, concurrency):
+    server, _, url = start_server(latency_ms=latency_ms)
+    try:
+        fn = fn_factory(url)
+        wall = timed(fn, queries, concurrency)
+        stats = stub_stats(url)
+        return {"wall_s": wall, "requests": stats["requests"], "connections": stats["connections"] - 1}
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    cities = [f"City{i}" for i in range(args.cities)]
+    weights = 1 / np.arange(1, args.cities + 1)
+    queries = [f"  {c.lower()}?" if rng.random() < 0.3 else c
+               for c in rng.choice(cities, args.queries, p=weights / weights.sum())]
+
+    result = {
+        "queries": args.queries,
+        "naive": run(args.latency_ms, lambda url: lambda c: naive_get_weather(url, c),
+                     queries, args.concurrency),
+        "tool": run(args.latency_ms, lambda url: WeatherTool("x", base_url=url).get_weather,
+                    queries, args.concurrency),
+        "stampede": run(args.latency_ms, lambda url: WeatherTool("x", base_url=url).get_weather,
+                        ["Oslo"] * args.concurrency, args.concurrency),
+    }
+
+    server, _, url = start_server(latency_ms=args.latency_ms)
+    try:
+        start = time.perf_counter()
+        for c in cities:
+            WeatherTool("x", base_url=url, ttl=0).get_weather(c)
+        sequential = time.perf_counter() - start
+        start = time.perf_counter()
+        WeatherTool("x", base_url=url).get_weather_batch(cities)
+        batch = time.perf_counter() - start
+        result["batch"] = {"cities": len(cities), "sequential_s": round(sequential, 3), "batch_s": round(batch, 3)}
+    finally:
+        server.shutdown()
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
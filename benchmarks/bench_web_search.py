@@ -0,0 +1,85 @@
+"""
+SearchTool against the local search fixture.
+
+"serial" is the old flow plus the page round trip an answer needed: search,
+then fetch each result page one after another with a fresh connection.
+"cold" is one ``SearchTool.passages`` call with empty caches, "warm" repeats
+the same queries with different spacing/case. Reports latency and how many
+searches and page fetches reached the server.
+
+    python benchmarks/bench_web_search.py --queries 10 --results 5 --page-latency-ms 300
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stub_search_server import start_server
+from tools.search_tool import HttpSearchBackend, SearchTool
+
+
+def summarize(samples):
+    ms = np.asarray(samples) * 1000
+    return {"mean_ms": round(float(ms.mean()), 1), "p95_ms": round(float(np.percentile(ms, 95)), 1)}
+
+
+def serial(search_url, query, n):
+    urls = requests.get(search_url, params={"q": query, "n": n}).json()
+    return [requests.get(url).text for url in urls]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--search-latency-ms", type=float, default=150.0)
+    parser.add_argument("--page-latency-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    queries = [f"how does feature {i} handle retries" for i in range(args.queries)]
+    server, state, url = start_server(search_latency_ms=args.search_latency_ms,
+                                      page_latency_ms=args.page_latency_ms)
+    try:
+        baseline = []
+        for q in queries:
+            start = time.perf_counter()
+            serial(url, q, args.results)
+            baseline.append(time.perf_counter() - start)
+        baseline_counts = dict(state.counts)
+
+        tool = SearchTool(backend=HttpSearchBackend(url))
+        cold, warm, found = [], [], 0
+        for q in queries:
+            start = time.perf_counter()
+            hits = tool.passages(q, args.results)
+            cold.append(time.perf_counter() - start)
+            found += any(q in hit["text"] for hit in hits)
+        for q in queries:
+            start = time.perf_counter()
+            tool.passages(f"  {q.upper()} ", args.results)
+            warm.append(time.perf_counter() - start)
+        tool_counts = {k: state.counts[k] - baseline_counts[k] for k in state.counts}
+    finally:
+        server.shutdown()
+
+    print(json.dumps({
+        "queries": args.queries,
+        "results": args.results,
+        "serial": {**summarize(baseline), **baseline_counts},
+        "cold": summarize(cold),
+        "warm": summarize(warm),
+        "tool_server_hits": tool_counts,
+        "relevant_passage_rate": round(found / len(queries), 3),
+        "tool_stats": tool.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
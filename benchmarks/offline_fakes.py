@@ -0,0 +1,87 @@
+"""
+Deterministic stand-ins for OpenAI used by the offline benchmarks.
+
+``HashEmbeddings`` maps text to a normalized hashed bag of words (so texts
+sharing words are close), sleeping ``latency_ms`` per call to mimic the API.
+``FakeChatModel`` is a LangChain chat model that answers with deterministic
+words after ``first_token_ms`` and ``token_ms`` per token, streaming or not.
+"""
+
+from typing import Any, Iterator, List, Optional
+import hashlib
+import re
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_WORD = re.compile(r"\w+")
+
+
+class HashEmbeddings(Embeddings):
+    def __init__(self, dimensions: int = 256, latency_ms: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency_ms / 1000.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.texts = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dimensions, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            vec[int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "little") % self.dimensions] += 1
+        norm = float(np.linalg.norm(vec))
+        if norm == 0:
+            vec[0], norm = 1.0, 1.0
+        return (vec / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            self.texts += len(texts)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self):
+        return {"calls": self.calls, "texts": self.texts}
+
+
+class FakeChatModel(BaseChatModel):
+    first_token_ms: float = 300.0
+    token_ms: float = 10.0
+    reply_tokens: int = 60
+    route_reply: str = "chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _words(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = str(messages[-1].content) if messages else ""
+        if prompt.rstrip().endswith("Route:"):
+            return [self.route_reply]
+        seed = hashlib.sha256(prompt.encode()).digest()
+        vocab = _WORD.findall(prompt)[-200:] or ["ok"]
+        return [vocab[(seed[i % len(seed)] + i) % len(vocab)] for i in range(self.reply_tokens)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        words = self._words(messages)
+        time.sleep((self.first_token_ms + self.token_ms * (len(words) - 1)) / 1000.0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(words)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_ms / 1000.0)
+        for i, word in enumerate(self._words(messages)):
+            if i:
+                time.sleep(self.token_ms / 1000.0)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=("" if i == 0 else " ") + word))
@@ -0,0 +1,126 @@
+"""
+Local OpenAI-compatible embedding server for benchmarks.
+
+Serves ``POST /v1/embeddings`` with deterministic vectors, sleeps
+``latency_ms`` per request, enforces a requests-per-second quota (429 with
+``Retry-After`` when exceeded) and can inject random 429s. ``GET /stats``
+returns request counters.
+
+    python benchmarks/stub_embedding_server.py --port 8765 --latency-ms 80 --rps 20
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+
+
+def fake_vector(text: str, dimensions: int):
+    out, counter = [], 0
+    while len(out) < dimensions:
+        digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        out.extend(v / 2 ** 31 for v in struct.unpack("<8i", digest))
+        counter += 1
+    return out[:dimensions]
+
+
+class StubState:
+    def __init__(self, latency_ms=50.0, rps=None, error_rate=0.0, dimensions=1536):
+        self.latency = latency_ms / 1000.0
+        self.rps = rps
+        self.error_rate = error_rate
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+        self.allowance = rps or 0.0
+        self.updated = time.monotonic()
+        self.counts = {"requests": 0, "ok": 0, "rate_limited": 0, "inputs": 0}
+
+    def admit(self) -> bool:
+        with self.lock:
+            self.counts["requests"] += 1
+            if self.error_rate and random.random() < self.error_rate:
+                self.counts["rate_limited"] += 1
+                return False
+            if self.rps:
+                now = time.monotonic()
+                self.allowance = min(self.rps, self.allowance + (now - self.updated) * self.rps)
+                self.updated = now
+                if self.allowance < 1:
+                    self.counts["rate_limited"] += 1
+                    return False
+                self.allowance -= 1
+            return True
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                with state.lock:
+                    return self._send(200, dict(state.counts))
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not state.admit():
+                return self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                  {"Retry-After": "1"})
+            time.sleep(state.latency)
+            inputs = request.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            dims = request.get("dimensions") or state.dimensions
+            data = [{"object": "embedding", "index": i, "embedding": fake_vector(str(t), dims)}
+                    for i, t in enumerate(inputs)]
+            with state.lock:
+                state.counts["ok"] += 1
+                state.counts["inputs"] += len(inputs)
+            self._send(200, {"object": "list", "data": data, "model": request.get("model", "stub"),
+                             "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+    return Handler
+
+
+def start_server(port=0, **kwargs):
+    """
+    Start the stub in a daemon thread; returns ``(server, state, base_url)``.
+    """
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--rps", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+    server, _, url = start_server(args.port, latency_ms=args.latency_ms, rps=args.rps,
+                                  error_rate=args.error_rate, dimensions=args.dimensions)
+    print(f"stub embedding server on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,115 @@
+"""
+Local search fixture for benchmarks: a search endpoint plus the pages it
+links to.
+
+``GET /search?q=<query>&n=<k>`` returns a JSON list of ``k`` URLs on this
+server (deterministic per query); ``GET /page/<i>`` serves an HTML page
+whose paragraphs mix filler text with the words of the query that produced
+it, after sleeping ``page_latency_ms``. ``GET /stats`` returns counters.
+Point ``SEARCH_BACKEND_URL`` at ``/search`` to use it from the app.
+
+    python benchmarks/stub_search_server.py --port 8767 --page-latency-ms 300
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import html
+import json
+import threading
+import time
+import zlib
+
+
+FILLER = ("The committee reviewed the quarterly figures and deferred the remaining items to the next "
+          "session while the infrastructure team continued routine maintenance across regions. ")
+
+
+class StubState:
+    def __init__(self, search_latency_ms=150.0, page_latency_ms=300.0, paragraphs=40):
+        self.search_latency = search_latency_ms / 1000.0
+        self.page_latency = page_latency_ms / 1000.0
+        self.paragraphs = paragraphs
+        self.lock = threading.Lock()
+        self.counts = {"searches": 0, "pages": 0}
+        self.queries = {}
+
+
+def render_page(page_id: int, query: str, paragraphs: int) -> str:
+    body = []
+    for i in range(paragraphs):
+        text = FILLER * 3
+        if (page_id + i) % 7 == 0:
+            text = f"{text} Answer {page_id}.{i}: {query} is covered in detail here. {FILLER}"
+        body.append(f"<p>{html.escape(text)}</p>")
+    return (f"<html><head><title>Page {page_id}</title><script>var x = 1;</script></head>"
+            f"<body><h1>Page {page_id}</h1>{''.join(body)}</body></html>")
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json"):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            base = f"http://{self.headers['Host']}"
+            if url.path == "/stats":
+                with state.lock:
+                    return self._send(200, json.dumps(state.counts))
+            if url.path == "/search":
+                params = parse_qs(url.query)
+                query = params.get("q", [""])[0]
+                n = int(params.get("n", ["3"])[0])
+                time.sleep(state.search_latency)
+                first = zlib.crc32(query.casefold().encode("utf-8")) % 10_000
+                with state.lock:
+                    state.counts["searches"] += 1
+                    for i in range(n):
+                        state.queries[first + i] = query
+                return self._send(200, json.dumps([f"{base}/page/{first + i}" for i in range(n)]))
+            if url.path.startswith("/page/"):
+                page_id = int(url.path.rsplit("/", 1)[-1])
+                time.sleep(state.page_latency)
+                with state.lock:
+                    state.counts["pages"] += 1
+                    query = state.queries.get(page_id, "")
+                return self._send(200, render_page(page_id, query, state.paragraphs), "text/html; charset=utf-8")
+            self._send(404, json.dumps({"error": "not found"}))
+
+    return Handler
+
+
+def start_server(port=0, **kwargs):
+    """
+    Start the stub in a daemon thread; returns ``(server, state, search_url)``.
+    """
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/search"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--search-latency-ms", type=float, default=150.0)
+    parser.add_argument("--page-latency-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    server, _, url = start_server(args.port, search_latency_ms=args.search_latency_ms,
+                                  page_latency_ms=args.page_latency_ms)
+    print(f"stub search server on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
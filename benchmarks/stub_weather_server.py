@@ -0,0 +1,98 @@
+"""
+Local OpenWeather-compatible server for benchmarks.
+
+Serves ``GET /data/2.5/weather?q=<city>`` with a deterministic payload after
+sleeping ``latency_ms``, speaking HTTP/1.1 so clients can keep connections
+alive. ``GET /stats`` returns request, per-city and connection counters.
+
+    python benchmarks/stub_weather_server.py --port 8766 --latency-ms 120
+"""
+
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import threading
+import time
+import zlib
+
+
+class StubState:
+    def __init__(self, latency_ms=100.0):
+        self.latency = latency_ms / 1000.0
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "connections": 0}
+        self.cities = Counter()
+        self.latencies = []
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            with state.lock:
+                state.counts["connections"] += 1
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.rstrip("/").endswith("/stats"):
+                with state.lock:
+                    latencies = sorted(state.latencies)
+                    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+                    return self._send(200, {**state.counts, "p50_ms": round(p50, 2),
+                                            "cities": dict(state.cities)})
+            if not url.path.rstrip("/").endswith("/weather"):
+                return self._send(404, {"message": "not found"})
+            started = time.perf_counter()
+            city = parse_qs(url.query).get("q", [""])[0]
+            time.sleep(state.latency)
+            seed = zlib.crc32(city.lower().encode("utf-8"))
+            payload = {
+                "name": city,
+                "weather": [{"description": ("clear sky", "light rain", "broken clouds")[seed % 3]}],
+                "main": {"temp": round(-5 + seed % 350 / 10, 1)},
+            }
+            with state.lock:
+                state.counts["requests"] += 1
+                state.cities[city.lower()] += 1
+                state.latencies.append(time.perf_counter() - started)
+            self._send(200, payload)
+
+    return Handler
+
+
+def start_server(port=0, **kwargs):
+    """
+    Start the stub in a daemon thread; returns ``(server, state, weather_url)``.
+    """
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/data/2.5/weather"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+    server, _, url = start_server(args.port, latency_ms=args.latency_ms)
+    print(f"stub weather server on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
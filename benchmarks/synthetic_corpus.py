@@ -0,0 +1,139 @@
+"""
+Synthetic PDF/TXT/CSV/XLSX corpora for the offline benchmarks.
+
+Every document is about one "system" and states facts about it, so queries
+of the form returned by ``queries()`` have a known answer. PDFs are written
+directly (one Helvetica text page per page, no dependencies); XLSX needs
+openpyxl and is skipped without it.
+
+    python benchmarks/synthetic_corpus.py out_dir --docs 20 --pdf-pages 10
+"""
+
+from typing import Dict, List
+import argparse
+import csv
+import os
+import random
+
+TOPICS = ("retry policy", "timeout", "owner team", "deployment region", "backup schedule", "alert threshold")
+FILLER = ("Operational notes describe routine checks, change windows and escalation paths that apply to "
+          "every service in the platform and are repeated here for completeness.")
+
+
+def fact(system: int, topic: str, rng: random.Random) -> str:
+    value = rng.choice(("three attempts", "45 seconds", "team falcon", "eu-west", "nightly at 02:00",
+                        "90 percent", "five attempts", "12 seconds", "team heron", "us-east"))
+    return f"The {topic} of system {system} is {value}."
+
+
+def paragraphs(system: int, count: int, rng: random.Random) -> List[str]:
+    out = []
+    for i in range(count):
+        out.append(fact(system, TOPICS[i % len(TOPICS)], rng) + " " + FILLER)
+    return out
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """
+    Minimal PDF with one text page per entry of ``pages`` (lines of text).
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def _wrap(text: str, width: int = 95) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    return lines + ([line] if line else [])
+
+
+def build_corpus(out_dir: str, docs: int = 8, pdf_pages: int = 5, txt_paragraphs: int = 60,
+                 rows: int = 2000, seed: int = 0) -> Dict[str, List[str]]:
+    """
+    Writes ``docs`` files of each type; returns ``{ext: [paths]}``.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    files: Dict[str, List[str]] = {"pdf": [], "txt": [], "csv": [], "xlsx": []}
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        Workbook = None
+
+    for d in range(docs):
+        system = d * 4
+        pdf = os.path.join(out_dir, f"system_{system}.pdf")
+        write_pdf(pdf, [[l for p in paragraphs(system, 5, rng) for l in _wrap(p)][:60] for _ in range(pdf_pages)])
+        files["pdf"].append(pdf)
+
+        txt = os.path.join(out_dir, f"system_{system + 1}.txt")
+        with open(txt, "w") as f:
+            f.write("\n\n".join(paragraphs(system + 1, txt_paragraphs, rng)))
+        files["txt"].append(txt)
+
+        header = ["system", "setting", "value", "changed_by", "notes"]
+        table = [[f"system {system + 2}", TOPICS[i % len(TOPICS)], str(rng.randint(1, 999)),
+                  f"user{rng.randint(1, 50)}", rng.choice(("", "reviewed", "pending approval"))] for i in range(rows)]
+        path = os.path.join(out_dir, f"system_{system + 2}.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(table)
+        files["csv"].append(path)
+
+        if Workbook is not None:
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("settings")
+            sheet.append(header)
+            for row in table:
+                sheet.append([row[0].replace(str(system + 2), str(system + 3)), *row[1:]])
+            path = os.path.join(out_dir, f"system_{system + 3}.xlsx")
+            workbook.save(path)
+            files["xlsx"].append(path)
+    return files
+
+
+def queries(docs: int, count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [f"What is the {rng.choice(TOPICS)} of system {rng.randrange(docs * 4)}?" for _ in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("out_dir")
+    parser.add_argument("--docs", type=int, default=8)
+    parser.add_argument("--pdf-pages", type=int, default=5)
+    parser.add_argument("--txt-paragraphs", type=int, default=60)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    built = build_corpus(args.out_dir, args.docs, args.pdf_pages, args.txt_paragraphs, args.rows, args.seed)
+    print({ext: len(paths) for ext, paths in built.items()})
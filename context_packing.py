@@ -0,0 +1,148 @@
+"""
+Context assembly for RAG prompts.
+
+Retrieval over-fetches candidates with their embeddings; ``ContextPacker``
+then picks a diverse subset with maximal marginal relevance (vectorized:
+one candidate-similarity matrix, then a running max per pick), merges
+chunks that are adjacent in the same source while stripping the splitter's
+overlap, and packs the result into a token budget in relevance order. With
+``chunk_overlap=200`` the plain top-k is often near-duplicate text; packing
+spends the same or fewer prompt tokens on more distinct passages.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.docstore.document import Document
+
+import telemetry
+from token_counting import default_token_counter
+
+
+def mmr_select(query_vector: Sequence[float], candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Indices of ``k`` candidates by maximal marginal relevance:
+    ``lambda * sim(query) - (1 - lambda) * max sim(already selected)``.
+    """
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+    c = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    q = np.asarray(query_vector, dtype=np.float32)
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+    relevance = c @ q
+    pairwise = c @ c.T
+    selected = [int(np.argmax(relevance))]
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < min(k, n):
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(redundancy, pairwise[pick], out=redundancy)
+    return selected
+
+
+def _text_overlap(left: str, right: str, max_overlap: int) -> int:
+    """
+    Length of the longest suffix of ``left`` that is a prefix of ``right``.
+    """
+    for size in range(min(max_overlap, len(left), len(right)), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_adjacent(docs: Sequence[Document], max_overlap: int = 400) -> List[Document]:
+    """
+    Merge chunks from the same source/page that touch or overlap, keeping
+    the position of the first one. Uses ``start_index`` metadata when
+    present, otherwise detects the shared text directly. An overlap implied
+    by ``start_index`` is only trimmed if the text really is shared: chunks
+    the incremental indexer kept across an edit can carry stale offsets.
+    """
+    merged: List[Document] = []
+    open_by_key: Dict[Tuple, int] = {}
+    ordered = sorted(enumerate(docs), key=lambda p: (
+        str(p[1].metadata.get("source")), str(p[1].metadata.get("page")),
+        p[1].metadata.get("start_index", -1), p[0],
+    ))
+    position: Dict[int, int] = {}
+    for original, doc in ordered:
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        start = doc.metadata.get("start_index")
+        last = open_by_key.get(key)
+        if last is not None:
+            prev = merged[last]
+            prev_start = prev.metadata.get("start_index")
+            if start is not None and prev_start is not None:
+                prev_end = prev_start + len(prev.page_content)
+                shared = prev_end - start if start <= prev_end else -1
+                if shared > 0 and not prev.page_content.endswith(doc.page_content[:shared]):
+                    shared = _text_overlap(prev.page_content, doc.page_content, max_overlap)
+            else:
+                shared = _text_overlap(prev.page_content, doc.page_content, max_overlap) or -1
+            if shared >= 0:
+                prev.page_content += doc.page_content[shared:]
+                prev.metadata.setdefault("merged_ids", [prev.metadata.get("id")]).append(doc.metadata.get("id"))
+                position[last] = min(position[last], original)
+                continue
+        merged.append(Document(page_content=doc.page_content, metadata=dict(doc.metadata)))
+        open_by_key[key] = len(merged) - 1
+        position[len(merged) - 1] = original
+    return [merged[i] for i in sorted(range(len(merged)), key=position.get)]
+
+
+class ContextPacker:
+    """
+    ``token_budget=None`` (the default) packs into what the plain
+    top-``baseline_k`` candidates would have cost, so packing never spends
+    more prompt tokens than the baseline.
+    """
+
+    def __init__(
+        self,
+        k: int = 6,
+        token_budget: Optional[int] = None,
+        lambda_mult: float = 0.5,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        self.k = k
+        self.token_budget = token_budget
+        self.lambda_mult = lambda_mult
+        self.count_tokens = count_tokens or default_token_counter()
+
+    @telemetry.timed("context_pack")
+    def pack(self, query_vector: Sequence[float], docs: Sequence[Document], vectors: np.ndarray,
+             baseline_k: int = 3) -> Tuple[List[Document], Dict]:
+        """
+        Returns ``(docs, stats)``; ``docs`` are in relevance order and fit the
+        budget. ``stats`` compares prompt tokens with stuffing the plain
+        top-``baseline_k`` candidates.
+        """
+        baseline_tokens = sum(self.count_tokens(d.page_content) for d in docs[:baseline_k])
+        budget = self.token_budget or baseline_tokens
+        order = mmr_select(query_vector, vectors, self.k, self.lambda_mult)
+        picked = merge_adjacent([docs[i] for i in order])
+        packed, used = [], 0
+        for doc in picked:
+            tokens = self.count_tokens(doc.page_content)
+            if used + tokens > budget:
+                continue
+            packed.append(doc)
+            used += tokens
+        if not packed and picked:
+            # Nothing fits whole: keep the best passage, clipped to the budget
+            best = picked[0]
+            packed = [Document(page_content=best.page_content[:budget * 3], metadata=best.metadata)]
+            used = self.count_tokens(packed[0].page_content)
+        stats = {
+            "candidates": len(docs),
+            "selected": len(order),
+            "packed": len(packed),
+            "baseline_tokens": baseline_tokens,
+            "packed_tokens": used,
+        }
+        return packed, stats
@@ -0,0 +1,27 @@
+"""
+Shared SQLAlchemy engines for the Postgres + pgvector store.
+
+langchain_postgres opens its own engine per PGVector instance; the helpers in
+this repo that talk to the collection tables directly go through here so a
+process keeps one pooled engine per connection string.
+"""
+
+from functools import lru_cache
+from typing import Optional
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+
+def resolve_connection_string(connection_string: Optional[str] = None) -> str:
+    if connection_string is None:
+        connection_string = os.getenv("POSTGRES_CONNECTION_STRING")
+    if not connection_string:
+        raise ValueError("Postgres connection string not provided or found in environment.")
+    return connection_string
+
+
+@lru_cache(maxsize=None)
+def get_engine(connection_string: str) -> Engine:
+    return create_engine(connection_string, pool_pre_ping=True)
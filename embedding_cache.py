@@ -0,0 +1,206 @@
+"""
+Disk-backed embedding cache.
+
+Wraps any LangChain ``Embeddings`` object and stores vectors in a local SQLite
+file keyed by (model, dimensions, sha256(text)), so the same text is embedded
+once no matter which ingestion path or query sees it. The cache is capped at
+``max_entries`` and evicts least-recently-used rows. The cap is checked on a
+process's first store and then every ``_EVICT_EVERY`` inserted rows, so it
+can be overshot by that much; hits update ``last_used`` in batches.
+
+Offline use: pass a fake embedder, e.g.
+``CachedEmbeddings(DeterministicFakeEmbedding(size=8), model_name="fake")``.
+"""
+
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+
+DEFAULT_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".embedding_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+# SQLite caps the number of bound parameters per statement.
+_SQL_BATCH = 500
+# Rows inserted between checks of the entry cap
+_EVICT_EVERY = 1000
+# Hits buffered before their last_used is written (sooner after this many seconds)
+_TOUCH_BATCH = 1000
+_TOUCH_FLUSH_SECONDS = 60.0
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    vec = array("f")
+    vec.frombytes(blob)
+    return vec.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        dimensions: Optional[int] = None,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.dimensions = dimensions
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._touched_flushed = time.monotonic()
+        self._inserts = _EVICT_EVERY
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{self.dimensions or ''}:{digest}"
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique), _SQL_BATCH):
+                batch = unique[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                found.update((k, _unpack(v)) for k, v in rows)
+            if found:
+                now = time.time()
+                self._touched.update((k, now) for k in found)
+                if (len(self._touched) >= _TOUCH_BATCH
+                        or time.monotonic() - self._touched_flushed > _TOUCH_FLUSH_SECONDS):
+                    self._conn.execute("BEGIN")
+                    self._write_touched()
+                    self._conn.execute("COMMIT")
+        return found
+
+    def _write_touched(self):
+        # Caller holds the lock and an open transaction
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?", [(t, k) for k, t in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touched_flushed = time.monotonic()
+
+    def _store(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            # Pending hits first, so eviction sees recent use
+            self._write_touched()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(k, _pack(v), now) for k, v in items.items()],
+            )
+            self._inserts += len(items)
+            if self._inserts >= _EVICT_EVERY:
+                self._inserts = 0
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                if count > self.max_entries:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+            self._conn.execute("COMMIT")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        found = self._lookup(keys)
+        missing = list({k: t for k, t in zip(keys, texts) if k not in found}.items())
+        if missing:
+            vectors = self.underlying.embed_documents([t for _, t in missing])
+            computed = {k: v for (k, _), v in zip(missing, vectors)}
+            self._store(computed)
+            found.update(computed)
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        found = self._lookup([key])
+        if key in found:
+            with self._lock:
+                self.hits += 1
+            return found[key]
+        vector = self.underlying.embed_query(text)
+        self._store({key: vector})
+        with self._lock:
+            self.misses += 1
+        return vector
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(model: str = "text-embedding-3-small", dimensions: Optional[int] = None) -> CachedEmbeddings:
+    """
+    Process-wide cached OpenAI embedder shared by ingestion and query paths.
+
+    Cache misses, queries included, go through the EmbeddingScheduler, which
+    owns batching, concurrency and retries (429s, 5xx and timeouts), so the
+    OpenAI client's own retries are off.
+    """
+    from langchain_openai import OpenAIEmbeddings
+
+    kwargs = {"model": model, "max_retries": 0}
+    if dimensions:
+        kwargs["dimensions"] = dimensions
+    return scheduled_embeddings(OpenAIEmbeddings(**kwargs), model, dimensions)
+
+
+def scheduled_embeddings(underlying: Embeddings, model: str, dimensions: Optional[int] = None,
+                         path: str = DEFAULT_CACHE_PATH) -> CachedEmbeddings:
+    """
+    ``underlying`` behind the same EmbeddingScheduler and cache as
+    ``get_embeddings`` (benchmarks wrap their fake embedder with it).
+    """
+    from embedding_scheduler import EmbeddingScheduler
+
+    scheduler = EmbeddingScheduler(
+        underlying,
+        max_concurrency=int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8")),
+        requests_per_minute=float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "3000")),
+        tokens_per_minute=float(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000")),
+    )
+    return CachedEmbeddings(scheduler, model_name=model, dimensions=dimensions, path=path)
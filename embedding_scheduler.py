@@ -0,0 +1,274 @@
+"""
+Concurrent, rate-limit-aware embedding scheduler.
+
+Packs texts into token-bounded batches, keeps up to ``max_concurrency``
+requests in flight and paces them with request/token buckets sized to the
+API quota. A 429 response halves the bucket rates, waits for ``Retry-After``
+(or an exponential backoff) and retries the batch; successful calls let the
+rates creep back up to the configured quota. Server errors (5xx), timeouts
+and dropped connections are retried with the same exponential backoff, but
+leave the rates alone.
+
+``embed_query`` goes through the same buckets on a high-priority lane: it
+never queues behind ingestion batches for a slot or for bucket capacity (its
+cost is charged to the buckets afterwards, so ingestion slows down instead),
+but it does back off and retry on 429s and transient errors.
+
+All requests run on one event loop thread owned by the scheduler, so the
+semaphore, the buckets and any 429 back-off are shared by every caller and
+every call, sync or async, from any thread.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import random
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+import telemetry
+from token_counting import default_token_counter
+
+
+def _is_rate_limit(exc: BaseException) -> bool:
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return type(exc).__name__ == "RateLimitError"
+
+
+_TRANSIENT_ERRORS = {"APITimeoutError", "APIConnectionError", "InternalServerError", "ServiceUnavailableError",
+                     "TimeoutError", "ConnectTimeout", "ReadTimeout", "ConnectError", "RemoteProtocolError"}
+
+
+def _is_transient(exc: BaseException) -> bool:
+    for status in (getattr(exc, "status_code", None),
+                   getattr(getattr(exc, "response", None), "status_code", None)):
+        if isinstance(status, int) and status >= 500:
+            return True
+    return isinstance(exc, (TimeoutError, ConnectionError)) or type(exc).__name__ in _TRANSIENT_ERRORS
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Async token bucket. ``rate`` is the refill per second; ``penalize`` and
+    ``recover`` adjust it between ``min_rate`` and the configured maximum.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, min_fraction: float = 0.05):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = rate * min_fraction
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # Oversized requests are allowed through once the bucket is full.
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def charge(self, amount: float = 1.0):
+        """
+        Take ``amount`` without waiting; the bucket may go negative, which
+        delays the next ``acquire`` callers instead.
+        """
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def penalize(self, factor: float = 0.5):
+        self.rate = max(self.min_rate, self.rate * factor)
+
+    def recover(self, factor: float = 1.05):
+        self.rate = min(self.max_rate, self.rate * factor)
+
+
+class EmbeddingScheduler(Embeddings):
+    def __init__(
+        self,
+        underlying: Embeddings,
+        max_batch_tokens: int = 100_000,
+        max_batch_size: int = 512,
+        max_concurrency: int = 8,
+        requests_per_minute: float = 3_000,
+        tokens_per_minute: float = 1_000_000,
+        max_retries: int = 8,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        self.underlying = underlying
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.count_tokens = count_tokens or default_token_counter()
+        self.requests = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.tokens_sent = 0
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._sem = self._rpm = self._tpm = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="embedding-scheduler", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _limits(self):
+        # Created on first use inside the scheduler loop and kept for its lifetime
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._rpm = TokenBucket(self.requests_per_minute / 60.0, capacity=max(1.0, self.max_concurrency))
+            self._tpm = TokenBucket(self.tokens_per_minute / 60.0, capacity=self.max_batch_tokens)
+        return self._sem, self._rpm, self._tpm
+
+    def pack_batches(self, texts: List[str]) -> List[Tuple[List[int], int]]:
+        """
+        Group text indices into ``(indices, token_count)`` batches bounded by
+        token and item counts.
+        """
+        batches, current, current_tokens = [], [], 0
+        for i, text in enumerate(texts):
+            n = self.count_tokens(text)
+            if current and (current_tokens + n > self.max_batch_tokens or len(current) >= self.max_batch_size):
+                batches.append((current, current_tokens))
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += n
+        if current:
+            batches.append((current, current_tokens))
+        return batches
+
+    async def _request(self, call: Callable, tokens: int, priority: bool = False):
+        rpm, tpm = self._rpm, self._tpm
+        for attempt in range(self.max_retries + 1):
+            if priority:
+                rpm.charge(1)
+                tpm.charge(tokens)
+            else:
+                await rpm.acquire(1)
+                await tpm.acquire(tokens)
+            self.requests += 1
+            started = time.perf_counter()
+            try:
+                result = await call()
+            except Exception as e:
+                rate_limited = _is_rate_limit(e)
+                if not (rate_limited or _is_transient(e)) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = None
+                if rate_limited:
+                    self.rate_limited += 1
+                    rpm.penalize()
+                    tpm.penalize()
+                    delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                await asyncio.sleep(delay * (1 + random.random() * 0.25))
+                continue
+            self.tokens_sent += tokens
+            telemetry.record("embed_request", time.perf_counter() - started)
+            telemetry.count("tokens_total", tokens, kind="embedding")
+            rpm.recover()
+            tpm.recover()
+            return result
+
+    async def _embed_batch(self, batch: List[str], tokens: int, sem):
+        async with sem:
+            return await self._request(lambda: self.underlying.aembed_documents(batch), tokens)
+
+    async def _embed_one(self, text: str) -> List[float]:
+        self._limits()
+        # High-priority lane: no semaphore, buckets charged rather than awaited
+        return await self._request(lambda: self.underlying.aembed_query(text), self.count_tokens(text),
+                                   priority=True)
+
+    def _submit(self, coro_fn, *args):
+        loop = self._ensure_loop()
+        if _running_loop() is loop:
+            raise RuntimeError("a blocking embed call would block the scheduler's own loop; use the async API")
+        return asyncio.run_coroutine_threadsafe(coro_fn(*args), loop).result()
+
+    async def _asubmit(self, coro_fn, *args):
+        loop = self._ensure_loop()
+        if _running_loop() is loop:
+            return await coro_fn(*args)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro_fn(*args), loop))
+
+    async def _embed_all(self, texts: List[str]) -> List[List[float]]:
+        sem, _, _ = self._limits()
+        batches = self.pack_batches(texts)
+        results = await asyncio.gather(*(
+            self._embed_batch([texts[i] for i in batch], tokens, sem)
+            for batch, tokens in batches
+        ))
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        for (batch, _), vectors in zip(batches, results):
+            for i, vector in zip(batch, vectors):
+                out[i] = vector
+        return out
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return await self._asubmit(self._embed_all, texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._submit(self._embed_all, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._submit(self._embed_one, text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._asubmit(self._embed_one, text)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "tokens_sent": self.tokens_sent,
+        }
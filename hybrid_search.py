@@ -0,0 +1,144 @@
+"""
+Hybrid lexical + vector retrieval with reciprocal rank fusion.
+
+The lexical leg is Postgres full-text search over chunk text, served by a GIN
+index on ``to_tsvector(language, document)``; the vector leg is
+``VectorIndex.search``. Both legs run concurrently and their rankings are
+merged with weighted RRF: ``score = sum(weight / (rrf_k + rank))``.
+
+The default ``simple`` text-search configuration does no stemming or
+stop-word removal, which keeps part numbers, error codes and names intact.
+The lexical leg matches all query terms; only when that finds fewer than
+``k`` chunks does it add chunks matching any term. Both queries rank their
+matches with ``ts_rank_cd`` and keep the ``lexical_candidates`` best (a
+top-N sort, so only those rows and their embeddings are carried forward).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain.docstore.document import Document
+from sqlalchemy import text
+
+import telemetry
+from pg_bulk_writer import EMBEDDING_TABLE
+from vector_index import VectorIndex, _parse_vector_text, metadata_filter_sql
+
+
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[List[Tuple]],
+    weights: Sequence[float],
+    k: int,
+    rrf_k: int = 60,
+) -> List[Tuple]:
+    """
+    Fuse ranked ``(Document, score, *extra)`` lists by ``metadata["id"]``;
+    returns the top-``k`` documents with their fused scores (and the first
+    ranking's extras, e.g. vectors).
+    """
+    scores: Dict[str, float] = {}
+    hits: Dict[str, Tuple] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, hit in enumerate(ranking, 1):
+            key = hit[0].metadata.get("id") or hit[0].page_content
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+            hits.setdefault(key, hit)
+    best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+    return [(hits[key][0], score, *hits[key][2:]) for key, score in best]
+
+
+class HybridSearcher:
+    def __init__(
+        self,
+        index: VectorIndex,
+        language: str = "simple",
+        vector_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+        vector_k: int = 20,
+        lexical_k: int = 20,
+        rrf_k: int = 60,
+        lexical_candidates: int = 1000,
+    ):
+        self.index = index
+        self.language = language
+        self.vector_weight = vector_weight
+        self.lexical_weight = lexical_weight
+        self.vector_k = vector_k
+        self.lexical_k = lexical_k
+        self.rrf_k = rrf_k
+        self.lexical_candidates = lexical_candidates
+
+    def _tsvector(self) -> str:
+        return f"to_tsvector('{self.language}'::regconfig, document)"
+
+    def fulltext_index_name(self) -> str:
+        return f"ix_{EMBEDDING_TABLE}_fts_{self.language}"
+
+    def ensure_fulltext_index(self, concurrently: bool = False) -> str:
+        name = self.fulltext_index_name()
+        sql = (f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+               f"ON {EMBEDDING_TABLE} USING gin ({self._tsvector()})")
+        with self.index.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(sql))
+        return name
+
+    def _lexical_sql(self, tsquery: str, where: str, with_vectors: bool):
+        # The cap keeps the :cap best-ranked matches, not an arbitrary first
+        # :cap, and bounds the rows (and embeddings) carried past the CTE.
+        return text(
+            f"WITH query AS (SELECT {tsquery} AS q), "
+            f"matches AS (SELECT id, document, cmetadata, embedding, "
+            f"ts_rank_cd({self._tsvector()}, query.q) AS rank FROM {EMBEDDING_TABLE}, query "
+            f"WHERE {where} AND {self._tsvector()} @@ query.q ORDER BY rank DESC LIMIT :cap) "
+            f"SELECT id, document, cmetadata, rank"
+            f"{', CAST(embedding AS text) AS embedding' if with_vectors else ''} "
+            "FROM matches ORDER BY rank DESC LIMIT :k"
+        )
+
+    @telemetry.timed("lexical_search")
+    def lexical_search(self, query: str, k: int, filter: Optional[Dict[str, Any]] = None,
+                       with_vectors: bool = False) -> List[Tuple]:
+        try:
+            predicate = self.index.collection_predicate()
+        except ValueError:  # collection not created yet
+            return []
+        clause, params = metadata_filter_sql(filter)
+        params.update(q=query, k=int(k), cap=max(int(k), self.lexical_candidates))
+        all_terms = f"plainto_tsquery('{self.language}'::regconfig, :q)"
+        with self.index.engine.connect() as conn:
+            rows = conn.execute(self._lexical_sql(all_terms, predicate + clause, with_vectors), params).fetchall()
+            if len(rows) < k:
+                # Too few chunks contain every term: top up with chunks matching any of them
+                any_term = f"replace({all_terms}::text, '&', '|')::tsquery"
+                seen = {r.id for r in rows}
+                more = conn.execute(self._lexical_sql(any_term, predicate + clause, with_vectors),
+                                    dict(params, k=len(rows) + int(k)))
+                rows += [r for r in more if r.id not in seen][:k - len(rows)]
+        return [(Document(page_content=r.document, metadata=dict(r.cmetadata or {}, id=r.id)), r.rank,
+                 *((_parse_vector_text(r.embedding),) if with_vectors else ()))
+                for r in rows]
+
+    def search(self, query: str, query_vector: Sequence[float], k: int = 3,
+               filter: Optional[Dict[str, Any]] = None, with_vectors: bool = False,
+               **vector_knobs) -> List[Tuple]:
+        """
+        Run both legs concurrently and return the fused top-``k``. ``filter``
+        and ``with_vectors`` apply to both legs; extra keyword arguments
+        (``ef_search``, ``probes``) go to the vector leg.
+        """
+        # Copied contexts keep both legs in the caller's per-turn trace
+        vector_future = _POOL.submit(copy_context().run, self.index.search, query_vector,
+                                     max(k, self.vector_k), filter=filter, with_vectors=with_vectors,
+                                     **vector_knobs)
+        lexical_future = _POOL.submit(copy_context().run, self.lexical_search, query, max(k, self.lexical_k),
+                                      filter, with_vectors)
+        return reciprocal_rank_fusion(
+            [vector_future.result(), lexical_future.result()],
+            [self.vector_weight, self.lexical_weight],
+            k=k,
+            rrf_k=self.rrf_k,
+        )
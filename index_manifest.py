@@ -0,0 +1,212 @@
+"""
+Content-hash manifest for incremental re-indexing.
+
+One row per (collection, tenant, source file) records the file's size,
+mtime and sha256 plus the ids of the chunks it produced. Chunk ids are derived
+from the tenant, the source path and the chunk text, so an unchanged chunk
+keeps its id across runs and only new or edited chunks need embedding, and the
+same path indexed for two tenants yields two independent sets of chunks.
+
+The empty tenant key ``""`` is the default tenant's: manifests and chunk ids
+written before tenants were part of the key keep their meaning.
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import hashlib
+import json
+import os
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+MANIFEST_TABLE = "rag_index_manifest"
+
+# Fixed namespace so chunk ids are stable across processes and machines.
+_CHUNK_NAMESPACE = uuid.UUID("6f1c3a52-4d0e-4b8e-9a57-2f0d7c1e9b11")
+
+
+class ManifestEntry(NamedTuple):
+    source: str
+    file_hash: str
+    size: int
+    mtime: float
+    chunk_ids: List[str]
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_id(source: str, content: str, tenant: str = "") -> str:
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    key = f"{tenant}\0{source}\0{digest}" if tenant else f"{source}\0{digest}"
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, key))
+
+
+class IndexManifest:
+    def __init__(self, engine: Engine, collection_name: str, tenant: str = ""):
+        self.engine = engine
+        self.collection_name = collection_name
+        self.tenant = tenant
+        self._ensure_table()
+
+    def _ensure_table(self):
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:t))"), {"t": MANIFEST_TABLE})
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+                    collection_name TEXT NOT NULL,
+                    tenant TEXT NOT NULL DEFAULT '',
+                    source TEXT NOT NULL,
+                    file_hash TEXT NOT NULL,
+                    size BIGINT NOT NULL,
+                    mtime DOUBLE PRECISION NOT NULL,
+                    chunk_ids JSONB NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    PRIMARY KEY (collection_name, tenant, source)
+                )
+            """))
+            # Manifests from before tenants were keyed: existing rows become
+            # the default tenant's and the primary key gains the tenant.
+            conn.execute(text(f"ALTER TABLE {MANIFEST_TABLE} ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT ''"))
+            keyed = conn.execute(text(f"""
+                SELECT 1 FROM pg_index i
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                WHERE i.indrelid = '{MANIFEST_TABLE}'::regclass AND i.indisprimary AND a.attname = 'tenant'
+            """)).fetchone()
+            if keyed is None:
+                conn.execute(text(f"ALTER TABLE {MANIFEST_TABLE} DROP CONSTRAINT {MANIFEST_TABLE}_pkey, "
+                                  "ADD PRIMARY KEY (collection_name, tenant, source)"))
+
+    def load(self) -> Dict[str, ManifestEntry]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(f"SELECT source, file_hash, size, mtime, chunk_ids FROM {MANIFEST_TABLE} "
+                     "WHERE collection_name = :c AND tenant = :t"),
+                {"c": self.collection_name, "t": self.tenant},
+            )
+            return {r.source: ManifestEntry(r.source, r.file_hash, r.size, r.mtime, list(r.chunk_ids))
+                    for r in rows}
+
+    def upsert(self, entry: ManifestEntry):
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"""
+                    INSERT INTO {MANIFEST_TABLE} (collection_name, tenant, source, file_hash, size, mtime, chunk_ids)
+                    VALUES (:c, :t, :s, :h, :size, :mtime, CAST(:ids AS JSONB))
+                    ON CONFLICT (collection_name, tenant, source) DO UPDATE SET
+                        file_hash = EXCLUDED.file_hash,
+                        size = EXCLUDED.size,
+                        mtime = EXCLUDED.mtime,
+                        chunk_ids = EXCLUDED.chunk_ids,
+                        updated_at = now()
+                """),
+                {"c": self.collection_name, "t": self.tenant, "s": entry.source, "h": entry.file_hash,
+                 "size": entry.size, "mtime": entry.mtime, "ids": json.dumps(entry.chunk_ids)},
+            )
+
+    def delete(self, source: str):
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"DELETE FROM {MANIFEST_TABLE} WHERE collection_name = :c AND tenant = :t AND source = :s"),
+                {"c": self.collection_name, "t": self.tenant, "s": source},
+            )
+
+
+def stat_unchanged(entry: Optional[ManifestEntry], path: str) -> bool:
+    """
+    Cheap pre-check: same size and mtime as last run means the file is skipped
+    without hashing it.
+    """
+    if entry is None:
+        return False
+    st = os.stat(path)
+    return st.st_size == entry.size and st.st_mtime == entry.mtime
+
+
+EPOCH_TABLE = "rag_collection_epoch"
+# Databases whose epoch table this process already created (readers poll
+# get_collection_epoch often; the DDL only needs to run once)
+_epoch_table_ready = set()
+
+
+def _ensure_epoch_table(conn):
+    key = str(conn.engine.url)
+    if key in _epoch_table_ready:
+        return
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {EPOCH_TABLE} (
+            collection_name TEXT PRIMARY KEY,
+            epoch BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+    _epoch_table_ready.add(key)
+
+
+def bump_collection_epoch(engine: Engine, collection_name: str) -> int:
+    """
+    Record that the collection's contents changed; readers holding derived
+    state (e.g. cached answers) compare epochs to invalidate it.
+    """
+    with engine.begin() as conn:
+        _ensure_epoch_table(conn)
+        return conn.execute(
+            text(f"""
+                INSERT INTO {EPOCH_TABLE} (collection_name, epoch) VALUES (:c, 1)
+                ON CONFLICT (collection_name) DO UPDATE SET epoch = {EPOCH_TABLE}.epoch + 1, updated_at = now()
+                RETURNING epoch
+            """),
+            {"c": collection_name},
+        ).scalar()
+
+
+def get_collection_epoch(engine: Engine, collection_name: str) -> int:
+    with engine.begin() as conn:
+        _ensure_epoch_table(conn)
+        epoch = conn.execute(
+            text(f"SELECT epoch FROM {EPOCH_TABLE} WHERE collection_name = :c"), {"c": collection_name}
+        ).scalar()
+    return epoch or 0
+
+
+MIGRATION_TABLE = "rag_collection_migration"
+
+
+def run_collection_migration(engine: Engine, collection_name: str, name: str,
+                             migrate: Callable[[], Any]) -> Optional[Any]:
+    """
+    Run the one-off data migration ``name`` for a collection the first time
+    it is asked for and return ``migrate()``'s result; later calls (from any
+    process) return None without running it.
+    """
+    with engine.begin() as conn:
+        # Serializes concurrent ingestions; the marker is only written once
+        # ``migrate`` has committed.
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:t))"), {"t": MIGRATION_TABLE})
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {MIGRATION_TABLE} (
+                collection_name TEXT NOT NULL,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (collection_name, name)
+            )
+        """))
+        done = conn.execute(
+            text(f"SELECT 1 FROM {MIGRATION_TABLE} WHERE collection_name = :c AND name = :n"),
+            {"c": collection_name, "n": name},
+        ).fetchone()
+        if done is not None:
+            return None
+        result = migrate()
+        conn.execute(
+            text(f"INSERT INTO {MIGRATION_TABLE} (collection_name, name) VALUES (:c, :n)"),
+            {"c": collection_name, "n": name},
+        )
+    return result
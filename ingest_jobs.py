@@ -0,0 +1,288 @@
+"""
+Persistent background ingestion queue for uploaded files.
+
+Uploads are spooled to disk and recorded in a SQLite job table (WAL mode)
+keyed by the sha256 of their content, so re-submitting the same bytes, e.g.
+on every Streamlit rerun while a file sits in the uploader, returns the
+existing job instead of re-embedding it. A single daemon worker per process
+claims queued jobs and runs them through ``create_rag_index_pgvector`` in a
+child process, so PDF parsing does not hold the app's GIL. The child records
+chunk progress in the job table; the worker keeps the job's heartbeat fresh
+while it runs and deletes the spool file once it is indexed. The UI polls
+``get``/``progress`` instead of blocking.
+
+Jobs carry a ``tenant``: the same content uploaded by two tenants is two
+jobs with separate spool paths, and every chunk is tagged with the tenant so
+retrieval can be scoped to it.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_DB_PATH = os.getenv("INGEST_JOBS_DB", ".ingest_jobs.sqlite3")
+DEFAULT_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", ".ingest_spool")
+# A running job with no heartbeat for this long is assumed to be orphaned
+STALE_JOB_SECONDS = float(os.getenv("INGEST_STALE_SECONDS", "600"))
+HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", "30"))
+
+
+class IngestJobQueue:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, spool_dir: str = DEFAULT_SPOOL_DIR):
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self._local = threading.local()
+        with self._conn() as conn:
+            columns = [r["name"] for r in conn.execute("PRAGMA table_info(ingest_jobs)")]
+            if columns and "tenant" not in columns:
+                # The unique key gains the tenant; SQLite can only do that by rebuilding
+                conn.execute("ALTER TABLE ingest_jobs RENAME TO ingest_jobs_untenanted")
+                conn.execute("DROP INDEX IF EXISTS ingest_jobs_status")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    collection_name TEXT NOT NULL,
+                    tenant TEXT NOT NULL DEFAULT '',
+                    content_hash TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    spool_path TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    chunks_done INTEGER NOT NULL DEFAULT 0,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    UNIQUE (collection_name, tenant, content_hash)
+                )
+            """)
+            if columns and "tenant" not in columns:
+                conn.execute(f"INSERT INTO ingest_jobs ({', '.join(columns)}) "
+                             f"SELECT {', '.join(columns)} FROM ingest_jobs_untenanted")
+                conn.execute("DROP TABLE ingest_jobs_untenanted")
+            if "heartbeat_at" not in [r["name"] for r in conn.execute("PRAGMA table_info(ingest_jobs)")]:
+                conn.execute("ALTER TABLE ingest_jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS ingest_jobs_status ON ingest_jobs (status, id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, filename: str, data: bytes, collection_name: str = "rag_docs", tenant: str = "") -> int:
+        """
+        Spool ``data`` and queue it; identical content from the same tenant
+        returns the existing job id. A previously failed job for the same
+        content is re-queued.
+        """
+        if tenant and (tenant.startswith(".") or os.path.basename(tenant) != tenant):
+            raise ValueError(f"Invalid tenant: {tenant!r}")
+        content_hash = hashlib.sha256(data).hexdigest()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT id, status FROM ingest_jobs WHERE collection_name = ? AND tenant = ? AND content_hash = ?",
+            (collection_name, tenant, content_hash),
+        ).fetchone()
+        if row is not None:
+            if row["status"] == "failed":
+                with conn:
+                    conn.execute("UPDATE ingest_jobs SET status = 'queued', error = NULL WHERE id = ?", (row["id"],))
+            return row["id"]
+
+        # Keep the original file name so sources read naturally in citations.
+        spool_path = os.path.join(self.spool_dir, *([tenant] if tenant else []), content_hash,
+                                  os.path.basename(filename))
+        os.makedirs(os.path.dirname(spool_path), exist_ok=True)
+        with open(spool_path, "wb") as f:
+            f.write(data)
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO ingest_jobs "
+                "(collection_name, tenant, content_hash, filename, spool_path, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (collection_name, tenant, content_hash, filename, spool_path, time.time()),
+            )
+        return conn.execute(
+            "SELECT id FROM ingest_jobs WHERE collection_name = ? AND tenant = ? AND content_hash = ?",
+            (collection_name, tenant, content_hash),
+        ).fetchone()["id"]
+
+    def claim_next(self) -> Optional[Dict]:
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM ingest_jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE ingest_jobs SET status = 'running', started_at = ?, heartbeat_at = ?, chunks_done = 0 "
+                "WHERE id = ?",
+                (time.time(), time.time(), row["id"]),
+            )
+        return dict(row)
+
+    def update_progress(self, job_id: int, done: int, total: int):
+        with self._conn() as conn:
+            conn.execute("UPDATE ingest_jobs SET chunks_done = ?, chunks_total = ?, heartbeat_at = ? WHERE id = ?",
+                         (done, total, time.time(), job_id))
+
+    def heartbeat(self, job_id: int):
+        with self._conn() as conn:
+            conn.execute("UPDATE ingest_jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def discard_spool(self, job: Dict):
+        """
+        Delete an indexed job's spool file (and its now empty directory).
+        """
+        try:
+            os.remove(job["spool_path"])
+            os.rmdir(os.path.dirname(job["spool_path"]))
+        except OSError:
+            pass
+
+    def finish(self, job_id: int, error: Optional[str] = None):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("failed" if error else "done", error, time.time(), job_id),
+            )
+
+    def requeue_interrupted(self, stale_seconds: float = STALE_JOB_SECONDS):
+        """
+        Jobs left 'running' by a dead process go back to the queue. A job
+        counts as dead once its heartbeat is ``stale_seconds`` old; jobs that
+        another live process is still working on are left alone.
+        """
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = 'queued' WHERE status = 'running' "
+                "AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (time.time() - stale_seconds,),
+            )
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def progress(self, job_ids: List[int]) -> List[Dict]:
+        """
+        Status rows for ``job_ids`` with ``fraction`` and ``eta_seconds``.
+        """
+        out = []
+        for job_id in job_ids:
+            job = self.get(job_id)
+            if job is None:
+                continue
+            done, total = job["chunks_done"], job["chunks_total"]
+            job["fraction"] = 1.0 if job["status"] == "done" else (done / total if total else 0.0)
+            job["eta_seconds"] = None
+            if job["status"] == "running" and done and job["started_at"]:
+                rate = done / max(time.time() - job["started_at"], 1e-6)
+                job["eta_seconds"] = max(0.0, (total - done) / rate)
+            out.append(job)
+        return out
+
+
+def _run_job(db_path: str, spool_dir: str, connection_string: Optional[str],
+             ingest_fn: Optional[Callable], job: Dict):
+    # Runs in the worker's child process, reporting progress over its own connection
+    queue = IngestJobQueue(db_path, spool_dir)
+    ingest = ingest_fn
+    if ingest is None:
+        from load_data import create_rag_index_pgvector as ingest
+    ingest(
+        [job["spool_path"]],
+        collection_name=job["collection_name"],
+        connection_string=connection_string,
+        progress=lambda done, total: queue.update_progress(job["id"], done, total),
+        # The spool file is deleted once indexed, so keep no manifest entry
+        # pointing at it; the job table already dedupes identical uploads.
+        incremental=False,
+        # Jobs queued before tenants existed have '' and get the default tenant
+        metadata={"tenant": job["tenant"]} if job["tenant"] else None,
+    )
+
+
+class IngestWorker:
+    """
+    Daemon thread that drains the queue one job at a time, running each job
+    in a child process. ``ingest_fn`` must be picklable (a module-level
+    function).
+    """
+
+    def __init__(
+        self,
+        queue: IngestJobQueue,
+        connection_string: Optional[str] = None,
+        poll_seconds: float = 1.0,
+        ingest_fn: Optional[Callable] = None,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+    ):
+        self.queue = queue
+        self.connection_string = connection_string
+        self.poll_seconds = poll_seconds
+        self.ingest_fn = ingest_fn
+        self.heartbeat_seconds = heartbeat_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self.queue.requeue_interrupted()
+            self._thread = threading.Thread(target=self._loop, name="ingest-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def health_check(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _ingest(self, job: Dict):
+        if self._pool is None:
+            # One warm child reused across jobs; spawned, since forking the
+            # threaded app process is unsafe
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        future = self._pool.submit(_run_job, self.queue.db_path, self.queue.spool_dir,
+                                   self.connection_string, self.ingest_fn, job)
+        # Beat while the child works, so a long parse or a 429 backoff that
+        # reports no progress does not look orphaned and get requeued
+        while not wait([future], timeout=self.heartbeat_seconds).done:
+            self.queue.heartbeat(job["id"])
+        try:
+            future.result()
+        except BrokenProcessPool:
+            self._pool = None  # the child died; start a fresh one for the next job
+            raise
+
+    def _loop(self):
+        while not self._stop.is_set():
+            job = self.queue.claim_next()
+            if job is None:
+                # Also picks up jobs orphaned by a worker that died after we started
+                self.queue.requeue_interrupted()
+                self._stop.wait(self.poll_seconds)
+                continue
+            try:
+                self._ingest(job)
+            except Exception as e:
+                self.queue.finish(job["id"], error=str(e))
+            else:
+                self.queue.finish(job["id"])
+                self.queue.discard_spool(job)
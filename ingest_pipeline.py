@@ -0,0 +1,109 @@
+"""
+Bounded, threaded stages for streaming ingestion.
+
+``threaded_stage`` runs one step of a generator pipeline in its own thread and
+hands results downstream through a bounded queue. A slow consumer therefore
+blocks the producer (backpressure) and at most ``maxsize`` items per stage are
+held in memory, while neighbouring stages still overlap in time, e.g. batch N
+is embedded while batch N+1 is being parsed.
+
+``ordered_map`` runs one step on up to ``concurrency`` items at once (e.g.
+several embedding batches in flight) and still yields results in input order.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+import queue
+import threading
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def threaded_stage(
+    source: Iterable[T],
+    fn: Optional[Callable[[T], Iterable[U]]] = None,
+    maxsize: int = 4,
+    name: str = "ingest-stage",
+) -> Iterator[U]:
+    """
+    Consume ``source`` in a background thread and yield its items, or the
+    items of ``fn(item)`` when a flat-mapping function is given.
+
+    Exceptions raised upstream are re-raised in the consumer. Closing the
+    returned generator stops the worker at its next hand-off.
+    """
+    q = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def work():
+        try:
+            for item in source:
+                for out in (fn(item) if fn else (item,)):
+                    if not put(out):
+                        return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=work, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+
+
+def ordered_map(
+    source: Iterable[T],
+    fn: Callable[[T], U],
+    concurrency: int = 4,
+    name: str = "ingest-map",
+) -> Iterator[U]:
+    """
+    Yield ``fn(item)`` for every item of ``source`` in order, with up to
+    ``concurrency`` calls running at once on a thread pool.
+    """
+    if concurrency <= 1:
+        for item in source:
+            yield fn(item)
+        return
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=name) as pool:
+        pending = deque()
+        try:
+            for item in source:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -2,28 +2,51 @@
 RAG index builder using PostgreSQL + pgvector
 
 Supports: .pdf, .txt, .csv, .xlsx
-Embeds with OpenAIEmbeddings and stores in pgvector DB.
+Embeds with OpenAIEmbeddings (through the on-disk embedding cache) and stores in pgvector DB.
 """
 
-from typing import List, Optional
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 import os
-import pandas as pd
 from PyPDF2 import PdfReader
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import OpenAIEmbeddings
 from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
 from langchain_postgres import PGVector
 
+import telemetry
+from db import get_engine, resolve_connection_string
+from embedding_cache import get_embeddings
+from index_manifest import (
+    IndexManifest, ManifestEntry, bump_collection_epoch, chunk_id, file_sha256, run_collection_migration,
+    stat_unchanged,
+)
+from ingest_pipeline import ordered_map, threaded_stage
+from pg_bulk_writer import PgBulkWriter, deferred_vector_indexes
+from tabular_chunking import TABULAR_EXTENSIONS, iter_tabular_documents
+from vector_index import DEFAULT_TENANT, TENANT_KEY, VectorIndex
 
-def _load_text_from_pdf(path: str) -> str:
+
+# PDFs with more pages than this are split into page ranges so one large file
+# can keep several worker processes busy.
+PDF_PAGES_PER_TASK = 50
+# Row blocks of CSV/Excel files are sized to this many tokens by default.
+TABLE_CHUNK_TOKENS = 250
+
+
+def _extract_pdf_page_range(path: str, start: int = 0, end: Optional[int] = None) -> List[str]:
     reader = PdfReader(path)
-    text = ""
-    for page in reader.pages:
-        content = page.extract_text()
-        if content:
-            text += content + "\n"
-    return text
+    pages = reader.pages
+    end = len(pages) if end is None else end
+    return [pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _load_text_from_pdf(path: str) -> str:
+    return "".join(content + "\n" for content in _extract_pdf_page_range(path) if content)
 
 
 def _load_text_from_txt(path: str, encoding: str = "utf-8") -> str:
@@ -31,35 +54,111 @@ def _load_text_from_txt(path: str, encoding: str = "utf-8") -> str:
         return f.read()
 
 
-def _load_text_from_csv(path: str) -> str:
-    df = pd.read_csv(path, dtype=str, keep_default_na=False)
-    return df.to_csv(index=False)
-
-
-def _load_text_from_xlsx(path: str) -> str:
-    xls = pd.read_excel(path, sheet_name=None, dtype=str)
-    text = ""
-    for name, df in xls.items():
-        text += f"\n--- Sheet: {name} ---\n"
-        text += df.to_csv(index=False)
-    return text
+def _is_tabular(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in TABULAR_EXTENSIONS
 
 
+@telemetry.timed("load_file")
 def _load_file_to_document(path: str) -> Document:
     ext = os.path.splitext(path)[1].lower()
     if ext == ".pdf":
         txt = _load_text_from_pdf(path)
     elif ext == ".txt":
         txt = _load_text_from_txt(path)
-    elif ext == ".csv":
-        txt = _load_text_from_csv(path)
-    elif ext in (".xls", ".xlsx"):
-        txt = _load_text_from_xlsx(path)
+    elif ext in TABULAR_EXTENSIONS:
+        txt = "\n\n".join(doc.page_content for doc in iter_tabular_documents(path))
     else:
         raise ValueError(f"Unsupported file type: {ext}")
     return Document(page_content=txt, metadata={"source": path})
 
 
+def _documents_from_pdf_pages(path: str, pages: List[str]) -> List[Document]:
+    return [
+        Document(page_content=content, metadata={"source": path, "page": number})
+        for number, content in enumerate(pages, 1)
+        if content.strip()
+    ]
+
+
+def _load_file_to_documents(path: str, table_chunk_tokens: int = TABLE_CHUNK_TOKENS) -> Iterable[Document]:
+    """
+    Like _load_file_to_document, but PDFs come back as one Document per page
+    with a 1-based ``page`` in the metadata, and CSV/Excel files as a lazy
+    stream of row-block chunks (see tabular_chunking) that are not split
+    further.
+    """
+    if _is_tabular(path):
+        return iter_tabular_documents(path, table_chunk_tokens)
+    if os.path.splitext(path)[1].lower() == ".pdf":
+        with telemetry.span("load_file"):
+            return _documents_from_pdf_pages(path, _extract_pdf_page_range(path))
+    doc = _load_file_to_document(path)
+    return [doc] if doc.page_content.strip() else []
+
+
+def iter_file_documents(
+    file_paths: List[str],
+    workers: int = 1,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+    table_chunk_tokens: int = TABLE_CHUNK_TOKENS,
+) -> Iterator[Tuple[str, Iterable[Document]]]:
+    """
+    Yield ``(path, documents)`` in input order.
+
+    With ``workers > 1`` files, and page ranges of large PDFs, are extracted
+    in a ProcessPoolExecutor. Only a small window of files is in flight at a
+    time so results do not pile up ahead of the consumer. CSV/Excel files
+    are always streamed lazily by the consumer rather than materialized in a
+    worker.
+    """
+    if workers <= 1:
+        for path in file_paths:
+            yield path, _load_file_to_documents(path, table_chunk_tokens)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def submit(path):
+            if _is_tabular(path):
+                pending.append((path, False, None))
+            elif os.path.splitext(path)[1].lower() == ".pdf":
+                n_pages = len(PdfReader(path).pages)
+                futures = [
+                    pool.submit(_extract_pdf_page_range, path, start, min(start + pages_per_task, n_pages))
+                    for start in range(0, n_pages, pages_per_task)
+                ]
+                pending.append((path, True, futures))
+            else:
+                pending.append((path, False, [pool.submit(_load_file_to_documents, path)]))
+
+        paths = iter(file_paths)
+        for path in islice(paths, workers * 2):
+            submit(path)
+        while pending:
+            path, is_pdf, futures = pending.popleft()
+            for nxt in islice(paths, 1):
+                submit(nxt)
+            if futures is None:
+                yield path, iter_tabular_documents(path, table_chunk_tokens)
+            elif is_pdf:
+                pages = [content for f in futures for content in f.result()]
+                yield path, _documents_from_pdf_pages(path, pages)
+            else:
+                yield path, futures[0].result()
+
+
+class _ChunkBatch(NamedTuple):
+    ids: List[str]
+    docs: List[Document]
+    vectors: Optional[List[List[float]]] = None
+
+
+class _FileDone(NamedTuple):
+    entry: ManifestEntry
+    stale_ids: List[str]
+
+
 def create_rag_index_pgvector(
     file_paths: List[str],
     collection_name: str = "rag_docs",
@@ -68,51 +167,214 @@ def create_rag_index_pgvector(
     chunk_size: int = 1000,
     chunk_overlap: int = 200,
     openai_api_key: Optional[str] = None,
+    incremental: bool = True,
+    workers: int = 1,
+    batch_size: int = 256,
+    queue_size: int = 4,
+    bulk: bool = False,
+    defer_index: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+    table_chunk_tokens: Optional[int] = None,
+    embeddings: Optional[Embeddings] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    prune_missing: bool = True,
+    embed_concurrency: int = 4,
 ):
     """
     Create a RAG index using Postgres + pgvector.
+
+    With ``incremental`` (the default) a manifest of file and chunk hashes is
+    kept next to the collection: unchanged files are skipped, only new or
+    edited chunks are embedded and upserted, chunks that disappeared from a
+    file are deleted, and, with ``prune_missing``, previously indexed files
+    that no longer exist on disk are dropped from the collection. Callers
+    indexing one file into a shared collection pass ``prune_missing=False``:
+    other sources' paths may only exist on another host. The upload worker
+    indexes with ``incremental=False`` since its spool files are deleted once
+    indexed.
+
+    ``workers > 1`` extracts files and PDF page ranges in parallel processes.
+    PDF chunks carry the ``page`` they came from.
+
+    Ingestion streams load -> split -> embed -> write through bounded queues
+    of ``queue_size`` items, embedding ``batch_size`` chunks at a time, so
+    memory stays flat regardless of how many files are passed. Up to
+    ``embed_concurrency`` batches are embedded at once.
+
+    ``bulk`` writes batches with COPY (see pg_bulk_writer) instead of ORM
+    inserts; ``defer_index`` additionally drops the collection table's ANN
+    indexes during the load and rebuilds them once at the end.
+
+    ``progress(chunks_written, chunks_expected)`` is called after every
+    write; the expected count is estimated from text length until each file
+    has been fully split.
+
+    CSV/Excel files are streamed and chunked into blocks of whole rows of
+    about ``table_chunk_tokens`` (default ``chunk_size // 4``), each with the
+    header repeated and ``sheet``/``row_start``/``row_end`` metadata.
+
+    ``embeddings`` replaces the shared cached OpenAI embedder (used by the
+    offline benchmarks).
+
+    ``metadata`` is added to every chunk, e.g. ``{"tenant": "acme"}`` to
+    scope retrieval (see vector_index); the tenant defaults to
+    ``DEFAULT_TENANT``. The collection's metadata GIN index
+    is kept in place, and a tenant gets its own partial ANN index once it
+    reaches ``TENANT_INDEX_MIN_ROWS`` chunks. The manifest and chunk ids are
+    keyed by tenant and path, so the same path can be indexed for several
+    tenants. The first ingestion into a collection also tags chunks indexed
+    before tenants existed with ``DEFAULT_TENANT`` (a one-off migration).
     """
     if openai_api_key:
         os.environ["OPENAI_API_KEY"] = openai_api_key
 
-    if connection_string is None:
-        connection_string = os.getenv("POSTGRES_CONNECTION_STRING")
+    connection_string = resolve_connection_string(connection_string)
 
-    if not connection_string:
-        raise ValueError("Postgres connection string not provided or found in environment.")
-
-    # Load files
-    docs = []
     for path in file_paths:
         if not os.path.exists(path):
             raise FileNotFoundError(path)
-        doc = _load_file_to_document(path)
-        if doc.page_content.strip():
-            docs.append(doc)
-
-    if not docs:
-        raise ValueError("No valid documents loaded!")
 
-    # Chunking
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    split_docs = []
-    for d in docs:
-        for i, chunk in enumerate(splitter.split_text(d.page_content)):
-            split_docs.append(Document(page_content=chunk, metadata={**d.metadata, "chunk": i}))
-
-    # Create embeddings
-    embeddings = OpenAIEmbeddings(model=embedding_model)
-
-    # Create or connect to PGVector store
-    vectorstore = PGVector.from_documents(
-        documents=split_docs,
-        embedding=embeddings,
+    embeddings = embeddings or get_embeddings(embedding_model)
+    vectorstore = PGVector(
+        embeddings=embeddings,
         collection_name=collection_name,
-        connection_string=connection_string,
+        connection=connection_string,
         use_jsonb=True,  # allows metadata storage
     )
+    engine = get_engine(connection_string)
+    extra_metadata = {TENANT_KEY: DEFAULT_TENANT, **(metadata or {})}
+    tenant = extra_metadata[TENANT_KEY]
+    # The default tenant keeps the key space of pre-tenant manifests and ids
+    tenant_key = "" if tenant == DEFAULT_TENANT else tenant
+    backfilled = run_collection_migration(engine, collection_name, "backfill_tenant",
+                                          VectorIndex(engine, collection_name).backfill_tenant)
+    manifest = IndexManifest(engine, collection_name, tenant_key) if incremental else None
+    previous = manifest.load() if manifest else {}
+
+    # Decide which files need loading before fanning any work out.
+    to_load = {}
+    skipped = 0
+    for path in file_paths:
+        entry = previous.get(path)
+        if incremental and stat_unchanged(entry, path):
+            skipped += 1
+            continue
+        file_hash = file_sha256(path) if incremental else ""
+        st = os.stat(path)
+        if entry is not None and entry.file_hash == file_hash:
+            # Touched but identical; just refresh size/mtime.
+            manifest.upsert(entry._replace(size=st.st_size, mtime=st.st_mtime))
+            skipped += 1
+            continue
+        to_load[path] = (entry, file_hash, st)
+
+    # start_index lets retrieval merge adjacent chunks and strip their overlap
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+    table_chunk_tokens = table_chunk_tokens or chunk_size // 4
+    loaded = written = removed = 0
+    expected = [0]
+
+    def split_file(item):
+        path, docs = item
+        entry, file_hash, st = to_load[path]
+        old_ids = set(entry.chunk_ids) if entry else set()
+        ids, seen, batch = [], set(), _ChunkBatch([], [])
+        tabular = _is_tabular(path)
+        if tabular:
+            # Row blocks arrive lazily; estimate from the file size instead
+            estimate = st.st_size // (table_chunk_tokens * 4) + 1
+        else:
+            estimate = sum(len(doc.page_content) for doc in docs) // max(1, chunk_size - chunk_overlap) + 1
+        expected[0] += estimate
+        i = new = 0
+        for doc in docs:
+            if tabular:
+                chunks = [doc]
+            else:
+                with telemetry.span("split"):
+                    chunks = splitter.create_documents([doc.page_content], [doc.metadata])
+            for chunk in chunks:
+                cid = chunk_id(path, chunk.page_content, tenant_key)
+                if cid not in seen:
+                    seen.add(cid)
+                    ids.append(cid)
+                    if cid not in old_ids:
+                        new += 1
+                        batch.ids.append(cid)
+                        batch.docs.append(Document(page_content=chunk.page_content,
+                                                   metadata={**chunk.metadata, **extra_metadata, "chunk": i}))
+                        if len(batch.ids) >= batch_size:
+                            yield batch
+                            batch = _ChunkBatch([], [])
+                i += 1
+        expected[0] += new - estimate
+        if batch.ids:
+            yield batch
+        yield _FileDone(ManifestEntry(path, file_hash, st.st_size, st.st_mtime, ids), list(old_ids - seen))
+
+    def embed_batch(item):
+        if isinstance(item, _ChunkBatch):
+            with telemetry.span("embed"):
+                item = item._replace(vectors=embeddings.embed_documents([d.page_content for d in item.docs]))
+        return item
+
+    # load -> split -> embed run in their own threads; writes happen here.
+    stream = threaded_stage(iter_file_documents(list(to_load), workers=workers,
+                                                table_chunk_tokens=table_chunk_tokens),
+                            maxsize=queue_size, name="ingest-load")
+    stream = threaded_stage(stream, split_file, maxsize=queue_size, name="ingest-split")
+    # Several batches are embedded at once; the scheduler paces them against the quota
+    stream = threaded_stage(ordered_map(stream, embed_batch, embed_concurrency, name="ingest-embed"),
+                            maxsize=queue_size, name="ingest-embed-feed")
+    with ExitStack() as stack:
+        writer = stack.enter_context(PgBulkWriter(engine, collection_name)) if bulk else None
+        if defer_index and to_load:
+            stack.enter_context(deferred_vector_indexes(engine, VectorIndex(engine, collection_name).collection_id))
+        for item in stream:
+            if isinstance(item, _ChunkBatch):
+                with telemetry.span("vector_write", method="copy" if writer else "orm"):
+                    (writer.write if writer else vectorstore.add_embeddings)(
+                        texts=[d.page_content for d in item.docs],
+                        embeddings=item.vectors,
+                        metadatas=[d.metadata for d in item.docs],
+                        ids=item.ids,
+                    )
+                written += len(item.ids)
+                if progress:
+                    progress(written, max(written, expected[0]))
+                continue
+            loaded += 1
+            if item.stale_ids:
+                with telemetry.span("vector_delete"):
+                    vectorstore.delete(ids=item.stale_ids)
+                removed += len(item.stale_ids)
+            if manifest:
+                manifest.upsert(item.entry)
+            if progress:
+                progress(written, max(written, expected[0]))
+
+    if manifest and prune_missing:
+        for source, entry in previous.items():
+            if not os.path.exists(source):
+                if entry.chunk_ids:
+                    vectorstore.delete(ids=entry.chunk_ids)
+                    removed += len(entry.chunk_ids)
+                manifest.delete(source)
+
+    if manifest is None or written or removed or backfilled:
+        bump_collection_epoch(engine, collection_name)
+    if written:
+        index = VectorIndex(engine, collection_name)
+        index.ensure_metadata_index(concurrently=True)
+        index.ensure_tenant_index(tenant)
+
+    if not loaded and not skipped:
+        raise ValueError("No valid documents loaded!")
 
-    print(f"✅ Successfully stored {len(split_docs)} chunks into pgvector collection '{collection_name}'")
+    print(f"✅ pgvector collection '{collection_name}': {loaded} file(s) indexed, {skipped} unchanged, "
+          f"{written} chunk(s) written, {removed} removed")
+    if hasattr(embeddings, "stats"):
+        print(f"   embedding cache: {embeddings.stats()}")
     return vectorstore
 
 
@@ -0,0 +1,390 @@
+"""
+In-process, memory-mapped vector index exported from a pgvector collection.
+
+Rows live in immutable segments, ``<path>/s<id>/``:
+
+- ``int8.npy``    (n, d) int8 rows of the unit-normalised embeddings
+- ``scales.npy``  (n,) float32 per-row dequantisation scale
+- ``float.npy``   (n, d) float32 rows used to rescore the top candidates
+- ``offsets.npy`` (n + 1,) int64 byte offsets into ``docs.jsonl``
+- ``docs.jsonl``  one ``{"id", "document", "metadata"}`` line per row
+- ``ids.json``    the row ids, in order
+
+A version ``<path>/v<N>/`` lists its segments in ``manifest.json`` (with the
+dimensions, live row count, source collection and epoch) and holds one
+``live-<segment>.npy`` row mask per segment; ``<path>/CURRENT`` names the
+live version. A refresh writes the chunks added since the last epoch as a new
+segment and masks out deleted rows, so its cost follows the change, not the
+collection; once segments or dead rows pile up it compacts everything into
+one segment.
+
+Everything is opened with ``mmap_mode="r"``, so opening is O(1), only the
+pages a query touches are read, and worker processes share one copy through
+the OS page cache. Writers hold an ``fcntl`` lock on ``<path>/.lock`` and
+build each version and segment in a private directory that is renamed into
+place, then swap ``CURRENT`` atomically; readers pick it up on their next
+query.
+
+Metadata filters are evaluated once per segment and filter against
+``docs.jsonl`` into a row mask; the scan skips rows outside it.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import fcntl
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import numpy as np
+from langchain.docstore.document import Document
+from sqlalchemy import text
+
+import telemetry
+from index_manifest import get_collection_epoch
+from pg_bulk_writer import EMBEDDING_TABLE
+from vector_index import VectorIndex, metadata_matches
+
+
+_BLOCK_ROWS = 65_536
+_MAX_MASKS = 32
+# Compact into one segment beyond this many segments or this share of dead rows
+_MAX_SEGMENTS = 8
+_MAX_DEAD_FRACTION = 0.2
+
+
+def _parse_vector(value) -> np.ndarray:
+    if isinstance(value, str):
+        return np.asarray(json.loads(value), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _quantise(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    unit = rows / np.where(norms == 0, 1, norms)
+    scales = np.abs(unit).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    q = np.clip(np.rint(unit / scales[:, None]), -127, 127).astype(np.int8)
+    return unit.astype(np.float32), q, scales.astype(np.float32)
+
+
+class MmapVectorIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded = None
+
+    # -- reading -----------------------------------------------------------
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.path, "CURRENT")) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def _load_segment(self, vdir: str, name: str) -> Dict:
+        sdir = os.path.join(self.path, name)
+        return {
+            "name": name,
+            "dir": sdir,
+            "int8": np.load(os.path.join(sdir, "int8.npy"), mmap_mode="r"),
+            "scales": np.load(os.path.join(sdir, "scales.npy"), mmap_mode="r"),
+            "float": np.load(os.path.join(sdir, "float.npy"), mmap_mode="r"),
+            "offsets": np.load(os.path.join(sdir, "offsets.npy"), mmap_mode="r"),
+            "live": np.load(os.path.join(vdir, f"live-{name}.npy")),
+            "masks": {},
+        }
+
+    def _load(self) -> Optional[Dict]:
+        version = self._current_version()
+        if version is None:
+            return None
+        with self._lock:
+            if version != self._version:
+                vdir = os.path.join(self.path, version)
+                with open(os.path.join(vdir, "manifest.json")) as f:
+                    manifest = json.load(f)
+                if "segments" not in manifest:
+                    return None  # pre-segment layout; the next refresh re-exports
+                self._loaded = {
+                    "dir": vdir,
+                    "manifest": manifest,
+                    "segments": [self._load_segment(vdir, name) for name in manifest["segments"]],
+                }
+                self._version = version
+            return self._loaded
+
+    def exists(self) -> bool:
+        return self._load() is not None
+
+    @property
+    def manifest(self) -> Dict:
+        loaded = self._load()
+        return loaded["manifest"] if loaded else {}
+
+    def _read_docs(self, segment: Dict, rows: Sequence[int]) -> List[Dict]:
+        offsets = segment["offsets"]
+        out = []
+        with open(os.path.join(segment["dir"], "docs.jsonl"), "rb") as f:
+            for row in rows:
+                f.seek(int(offsets[row]))
+                out.append(json.loads(f.read(int(offsets[row + 1] - offsets[row]))))
+        return out
+
+    @staticmethod
+    def _read_ids(segment: Dict) -> List[str]:
+        with open(os.path.join(segment["dir"], "ids.json")) as f:
+            return json.load(f)
+
+    def _filter_mask(self, segment: Dict, filter: Dict) -> np.ndarray:
+        key = json.dumps(filter, sort_keys=True, default=list)
+        mask = segment["masks"].get(key)
+        if mask is None:
+            with open(os.path.join(segment["dir"], "docs.jsonl"), "rb") as f:
+                mask = np.fromiter((metadata_matches(json.loads(line)["metadata"] or {}, filter) for line in f),
+                                   dtype=bool, count=segment["int8"].shape[0])
+            with self._lock:
+                if len(segment["masks"]) >= _MAX_MASKS:
+                    segment["masks"].pop(next(iter(segment["masks"])))
+                segment["masks"][key] = mask
+        return mask
+
+    @telemetry.timed("mmap_search")
+    def search_batch(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int = 3,
+        candidates: Optional[int] = None,
+        with_vectors: bool = False,
+        filter: Optional[Dict] = None,
+    ) -> List[List[Tuple]]:
+        """
+        Top-``k`` ``(Document, cosine distance)`` for each query. The int8
+        matrices are scanned block by block to pick ``candidates`` rows per
+        query (default ``10 * k``), which are then rescored with float32 rows.
+        ``with_vectors`` appends each hit's (unit-normalised) float32 row.
+        ``filter`` has the semantics of ``VectorIndex.search``'s.
+        """
+        loaded = self._load()
+        if loaded is None:
+            raise ValueError(f"No mmap index at {self.path}; export one first.")
+        segments = loaded["segments"]
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        masks = [s["live"] & self._filter_mask(s, filter) if filter else s["live"] for s in segments]
+        eligible = sum(int(m.sum()) for m in masks)
+        if eligible == 0:
+            return [[] for _ in queries]
+        c = min(eligible, candidates or 10 * k)
+
+        # Candidate rows are numbered across segments: segment i starts at bases[i]
+        bases = np.cumsum([0] + [s["int8"].shape[0] for s in segments])
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for base, segment, mask in zip(bases, segments, masks):
+            q8, scales = segment["int8"], segment["scales"]
+            for start in range(0, q8.shape[0], _BLOCK_ROWS):
+                block = q8[start:start + _BLOCK_ROWS].astype(np.float32)
+                scores = (block @ queries.T).T * scales[start:start + _BLOCK_ROWS]
+                scores[:, ~mask[start:start + len(block)]] = -np.inf
+                rows = np.broadcast_to(np.arange(base + start, base + start + len(block)), scores.shape)
+                best_scores = np.concatenate([best_scores, scores], axis=1)
+                best_rows = np.concatenate([best_rows, rows], axis=1)
+                if best_scores.shape[1] > c:
+                    keep = np.argpartition(-best_scores, c - 1, axis=1)[:, :c]
+                    best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                    best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        results = []
+        for qi, query in enumerate(queries):
+            rows = np.sort(best_rows[qi])
+            where = np.searchsorted(bases, rows, side="right") - 1
+            vectors = np.stack([segments[s]["float"][row - bases[s]] for s, row in zip(where, rows)])
+            exact = vectors @ query
+            hits = []
+            for o in np.argsort(-exact)[:k]:
+                segment = segments[where[o]]
+                d = self._read_docs(segment, [rows[o] - bases[where[o]]])[0]
+                hits.append((Document(page_content=d["document"], metadata=dict(d["metadata"] or {}, id=d["id"])),
+                             float(1.0 - exact[o]), *((np.asarray(vectors[o]),) if with_vectors else ())))
+            results.append(hits)
+        return results
+
+    def search(self, query_vector: Sequence[float], k: int = 3, **kwargs) -> List[Tuple]:
+        return self.search_batch([query_vector], k=k, **kwargs)[0]
+
+    # -- writing -----------------------------------------------------------
+
+    @contextmanager
+    def _writer_lock(self):
+        # Serialises refreshes across every process sharing this directory
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _private_dir(self) -> str:
+        tmp = os.path.join(self.path, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp)
+        return tmp
+
+    def _write_segment(self, chunks: Iterator[Tuple[List[str], np.ndarray, List[str], List[dict]]],
+                       dimensions: int) -> Tuple[str, int]:
+        tmp = self._private_dir()
+        ids, f32_parts, q8_parts, scale_parts, offsets = [], [], [], [], [0]
+        with open(os.path.join(tmp, "docs.jsonl"), "wb") as docs_file:
+            for chunk_ids, vectors, documents, metadatas in chunks:
+                unit, q8, scales = _quantise(vectors.reshape(-1, dimensions))
+                f32_parts.append(unit)
+                q8_parts.append(q8)
+                scale_parts.append(scales)
+                for id_, doc, meta in zip(chunk_ids, documents, metadatas):
+                    line = json.dumps({"id": id_, "document": doc, "metadata": meta}).encode("utf-8") + b"\n"
+                    docs_file.write(line)
+                    offsets.append(offsets[-1] + len(line))
+                ids.extend(chunk_ids)
+
+        def stack(parts, dtype, width=None):
+            if parts:
+                return np.concatenate(parts).astype(dtype, copy=False)
+            return np.zeros((0, width) if width else (0,), dtype=dtype)
+
+        np.save(os.path.join(tmp, "float.npy"), stack(f32_parts, np.float32, dimensions))
+        np.save(os.path.join(tmp, "int8.npy"), stack(q8_parts, np.int8, dimensions))
+        np.save(os.path.join(tmp, "scales.npy"), stack(scale_parts, np.float32))
+        np.save(os.path.join(tmp, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        with open(os.path.join(tmp, "ids.json"), "w") as f:
+            json.dump(ids, f)
+        name = f"s{uuid.uuid4().hex[:12]}"
+        os.rename(tmp, os.path.join(self.path, name))
+        return name, len(ids)
+
+    def _publish(self, live: Dict[str, np.ndarray], dimensions: int, manifest: Dict):
+        """
+        Write a version over the segments in ``live`` (name -> row mask) and
+        make it current. Must hold the writer lock.
+        """
+        current = self._current_version()
+        number = int(current[1:]) + 1 if current else 1
+        version = f"v{number}"
+        tmp = self._private_dir()
+        for name, mask in live.items():
+            np.save(os.path.join(tmp, f"live-{name}.npy"), mask)
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump({**manifest, "segments": list(live), "rows": int(sum(m.sum() for m in live.values())),
+                       "dimensions": dimensions, "version": version}, f)
+        vdir = os.path.join(self.path, version)
+        shutil.rmtree(vdir, ignore_errors=True)  # left over from a crashed writer
+        os.rename(tmp, vdir)
+
+        pointer = os.path.join(self.path, "CURRENT.tmp")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.path, "CURRENT"))
+        self._collect(number)
+
+    def _collect(self, number: int):
+        # Keep the previous version (and its segments) for readers that have
+        # not noticed the swap yet.
+        referenced = set()
+        for name in os.listdir(self.path):
+            if name.startswith("v") and name[1:].isdigit():
+                if int(name[1:]) < number - 1:
+                    shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+                else:
+                    with open(os.path.join(self.path, name, "manifest.json")) as f:
+                        referenced.update(json.load(f).get("segments", []))
+        for name in os.listdir(self.path):
+            if (name.startswith("s") and name not in referenced) or name.startswith(".tmp-"):
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    @staticmethod
+    def _fetch_rows(source: VectorIndex, ids: Optional[List[str]] = None, batch: int = 5000):
+        sql = (f"SELECT id, embedding::text AS embedding, document, cmetadata FROM {EMBEDDING_TABLE} "
+               f"WHERE {source.collection_predicate()}")
+        params = {}
+        if ids is not None:
+            sql += " AND id = ANY(:ids)"
+            params["ids"] = ids
+        with source.engine.connect().execution_options(stream_results=True, yield_per=batch) as conn:
+            result = conn.execute(text(sql + " ORDER BY id"), params)
+            for part in result.partitions(batch):
+                yield ([r.id for r in part], np.stack([_parse_vector(r.embedding) for r in part]),
+                       [r.document for r in part], [dict(r.cmetadata or {}) for r in part])
+
+    def _export(self, source: VectorIndex, epoch: int):
+        name, rows = self._write_segment(self._fetch_rows(source), source.dimensions)
+        self._publish({name: np.ones(rows, dtype=bool)}, source.dimensions,
+                      {"collection": source.collection_name, "epoch": epoch})
+
+    def export_from_pgvector(self, source: VectorIndex):
+        """
+        Full export of the collection into a single-segment version.
+        """
+        with self._writer_lock():
+            self._export(source, get_collection_epoch(source.engine, source.collection_name))
+
+    def refresh_from_pgvector(self, source: VectorIndex, force: bool = False) -> Dict[str, int]:
+        """
+        Incremental refresh, skipped entirely when the collection's ingestion
+        epoch has not moved: rows whose ids left the collection are masked
+        out and only new ids are fetched from Postgres, into a new segment.
+        Chunk ids are content addressed, so a changed chunk shows up as a new
+        id. ``force`` (or too many segments or dead rows) rewrites everything
+        into one segment from the local rows plus the new ones.
+        """
+        with self._writer_lock():
+            loaded = self._load()
+            epoch = get_collection_epoch(source.engine, source.collection_name)
+            if loaded is None:
+                self._export(source, epoch)
+                return {"added": self.manifest.get("rows", 0), "removed": 0, "kept": 0}
+            if not force and loaded["manifest"].get("epoch") == epoch:
+                return {"added": 0, "removed": 0, "kept": loaded["manifest"]["rows"]}
+
+            with source.engine.connect() as conn:
+                live_ids = {r[0] for r in conn.execute(
+                    text(f"SELECT id FROM {EMBEDDING_TABLE} WHERE {source.collection_predicate()}"))}
+            live, known, total, removed = {}, set(), 0, 0
+            for segment in loaded["segments"]:
+                ids = self._read_ids(segment)
+                mask = segment["live"] & np.fromiter((id_ in live_ids for id_ in ids), dtype=bool, count=len(ids))
+                removed += int(segment["live"].sum() - mask.sum())
+                known.update(id_ for id_, alive in zip(ids, mask) if alive)
+                live[segment["name"]] = mask
+                total += len(ids)
+            added = sorted(live_ids.difference(known))
+            kept = len(known)
+
+            def new_rows():
+                for start in range(0, len(added), 5000):
+                    yield from self._fetch_rows(source, ids=added[start:start + 5000])
+
+            manifest = {"collection": source.collection_name, "epoch": epoch}
+            dead = total - kept
+            if force or len(live) + 1 > _MAX_SEGMENTS or dead > _MAX_DEAD_FRACTION * max(1, total + len(added)):
+                def all_rows():
+                    for segment in loaded["segments"]:
+                        rows = np.flatnonzero(live[segment["name"]])
+                        for start in range(0, len(rows), _BLOCK_ROWS):
+                            part = rows[start:start + _BLOCK_ROWS]
+                            docs = self._read_docs(segment, part)
+                            yield ([d["id"] for d in docs], np.asarray(segment["float"][part]),
+                                   [d["document"] for d in docs], [d["metadata"] for d in docs])
+                    yield from new_rows()
+
+                name, rows = self._write_segment(all_rows(), source.dimensions)
+                self._publish({name: np.ones(rows, dtype=bool)}, source.dimensions, manifest)
+            else:
+                if added:
+                    name, rows = self._write_segment(new_rows(), source.dimensions)
+                    live[name] = np.ones(rows, dtype=bool)
+                self._publish(live, source.dimensions, manifest)
+            return {"added": len(added), "removed": removed, "kept": kept}
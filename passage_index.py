@@ -0,0 +1,114 @@
+"""
+Short-lived in-memory passage index for fetched web pages.
+
+Pages are reduced to visible text, split into overlapping passages and
+ranked against the query with BM25. The index lives only as long as the
+search result it was built for; nothing is embedded or written to Postgres.
+"""
+
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Dict, List, Tuple
+import math
+import re
+
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_SKIP_TAGS = {"script", "style", "noscript", "svg", "head", "nav", "footer", "form"}
+_BLOCK_TAGS = {"p", "div", "li", "br", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "section", "article"}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t.casefold() for t in _TOKEN.findall(text)]
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def split_passages(text: str, size: int = 800, overlap: int = 100) -> List[str]:
+    """
+    Character windows of about ``size``, broken on whitespace where possible.
+    """
+    passages, start = [], 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + size // 2, end)
+            end = cut if cut > 0 else end
+        passage = text[start:end].strip()
+        if passage:
+            passages.append(passage)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return passages
+
+
+class PassageIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: List[Tuple[str, str]] = []
+        self._tfs: List[Counter] = []
+        self._df: Counter = Counter()
+
+    def add(self, source: str, passages: List[str]) -> None:
+        for passage in passages:
+            tf = Counter(tokenize(passage))
+            self.passages.append((source, passage))
+            self._tfs.append(tf)
+            self._df.update(tf.keys())
+
+    def __len__(self):
+        return len(self.passages)
+
+    def search(self, query: str, k: int = 4) -> List[Dict]:
+        """
+        Top-``k`` passages as ``{"source", "text", "score"}``, best first.
+        """
+        if not self._tfs:
+            return []
+        n = len(self._tfs)
+        avg_len = sum(sum(tf.values()) for tf in self._tfs) / n
+        terms = set(tokenize(query))
+        idf = {t: math.log(1 + (n - self._df[t] + 0.5) / (self._df[t] + 0.5)) for t in terms if self._df[t]}
+        scored = []
+        for i, tf in enumerate(self._tfs):
+            length = sum(tf.values())
+            score = sum(
+                weight * tf[t] * (self.k1 + 1) / (tf[t] + self.k1 * (1 - self.b + self.b * length / avg_len))
+                for t, weight in idf.items() if tf[t]
+            )
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(reverse=True)
+        return [{"source": self.passages[i][0], "text": self.passages[i][1], "score": round(score, 4)}
+                for score, i in scored[:k]]
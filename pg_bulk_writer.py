@@ -0,0 +1,144 @@
+"""
+Bulk writer for the langchain_postgres collection tables.
+
+Streams rows into ``langchain_pg_embedding`` with ``COPY ... FROM STDIN``
+(binary when the ``pgvector`` adapter is installed, text otherwise) instead of
+the ORM's multi-row INSERT. Rows are copied into a temp staging table and
+merged with ``ON CONFLICT (id) DO UPDATE`` so content-addressed chunk ids keep
+upsert semantics; pass ``upsert=False`` on a fresh collection to copy straight
+into the table.
+
+For large loads wrap the writes in ``deferred_vector_indexes()``: the
+collection's HNSW/IVFFlat indexes are dropped first and rebuilt once at the
+end. Other collections' (and tenants') indexes on the shared table are left
+alone, so their searches are not degraded by someone else's load.
+"""
+
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence
+import json
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+try:
+    import numpy as np
+    from pgvector.psycopg import register_vector
+    from psycopg.types.json import Jsonb
+except ImportError:  # text COPY still works without the adapter
+    register_vector = None
+
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+_STAGE_TABLE = "_rag_bulk_stage"
+
+
+class PgBulkWriter:
+    def __init__(self, engine: Engine, collection_name: str, upsert: bool = True, binary: bool = True):
+        self.engine = engine
+        self.collection_name = collection_name
+        self.upsert = upsert
+        self.binary = binary and register_vector is not None
+        self.rows_written = 0
+        self._raw = engine.raw_connection()
+        self._conn = self._raw.driver_connection
+        if not hasattr(self._conn.cursor(), "copy"):
+            raise ValueError("PgBulkWriter needs a psycopg 3 engine (postgresql+psycopg://...)")
+        if self.binary:
+            register_vector(self._conn)
+        with self._conn.cursor() as cur:
+            cur.execute(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = %s", (collection_name,))
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError(f"Collection not found: {collection_name}")
+            self.collection_id = row[0]
+            if upsert:
+                cur.execute(
+                    f"CREATE TEMP TABLE IF NOT EXISTS {_STAGE_TABLE} "
+                    f"(LIKE {EMBEDDING_TABLE} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                )
+        self._conn.commit()
+
+    def _copy_rows(self, cur, table: str, ids, texts, embeddings, metadatas):
+        columns = "(id, collection_id, embedding, document, cmetadata)"
+        fmt = "(FORMAT BINARY)" if self.binary else ""
+        with cur.copy(f"COPY {table} {columns} FROM STDIN {fmt}") as copy:
+            if self.binary:
+                copy.set_types(["varchar", "uuid", "vector", "varchar", "jsonb"])
+                for id_, doc, vec, meta in zip(ids, texts, embeddings, metadatas):
+                    copy.write_row((id_, self.collection_id, np.asarray(vec, dtype=np.float32), doc,
+                                    Jsonb(meta or {})))
+            else:
+                for id_, doc, vec, meta in zip(ids, texts, embeddings, metadatas):
+                    copy.write_row((id_, str(self.collection_id), "[" + ",".join(map(repr, vec)) + "]", doc,
+                                    json.dumps(meta or {})))
+
+    def write(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[dict]] = None,
+        ids: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        ids = [i or str(uuid.uuid4()) for i in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        with self._conn.cursor() as cur:
+            if not self.upsert:
+                self._copy_rows(cur, EMBEDDING_TABLE, ids, texts, embeddings, metadatas)
+            else:
+                self._copy_rows(cur, _STAGE_TABLE, ids, texts, embeddings, metadatas)
+                cur.execute(
+                    f"INSERT INTO {EMBEDDING_TABLE} (id, collection_id, embedding, document, cmetadata) "
+                    f"SELECT id, collection_id, embedding, document, cmetadata FROM {_STAGE_TABLE} "
+                    "ON CONFLICT (id) DO UPDATE SET embedding = EXCLUDED.embedding, "
+                    "document = EXCLUDED.document, cmetadata = EXCLUDED.cmetadata"
+                )
+        self._conn.commit()
+        self.rows_written += len(ids)
+        return ids
+
+    def close(self):
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def vector_index_definitions(engine: Engine, collection_id: Optional[str] = None) -> List[tuple]:
+    """
+    ``(name, definition)`` of the HNSW/IVFFlat indexes on the embedding table,
+    only the partial indexes of ``collection_id`` when given.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = :t AND indexdef LIKE :pred "
+            "AND (indexdef ILIKE '%USING hnsw%' OR indexdef ILIKE '%USING ivfflat%')"
+        ), {"t": EMBEDDING_TABLE, "pred": f"%{collection_id or ''}%"})
+        return [(r.indexname, r.indexdef) for r in rows]
+
+
+@contextmanager
+def deferred_vector_indexes(engine: Engine, collection_id: str,
+                            maintenance_work_mem: Optional[str] = "1GB") -> Iterator[List[tuple]]:
+    """
+    Drop the collection's ANN indexes (including per-tenant ones) for the
+    duration of a bulk load and rebuild them once afterwards, even if the
+    load fails.
+    """
+    indexes = vector_index_definitions(engine, str(collection_id))
+    with engine.begin() as conn:
+        for name, _ in indexes:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    try:
+        yield indexes
+    finally:
+        with engine.begin() as conn:
+            if maintenance_work_mem:
+                conn.execute(text(f"SET LOCAL maintenance_work_mem = '{maintenance_work_mem}'"))
+            for _, definition in indexes:
+                conn.execute(text(definition))
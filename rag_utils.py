@@ -1,13 +1,17 @@
 # rag_utils.py
 import os
 import tempfile
-from langchain_openai import OpenAIEmbeddings
 from langchain_postgres.vectorstores import PGVector
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 
-def process_uploaded_files(files, connection_string, collection_name="rag_docs"):
-    """Process and upload files to PGVector"""
+from db import get_engine
+from embedding_cache import get_embeddings
+from index_manifest import bump_collection_epoch, run_collection_migration
+from vector_index import DEFAULT_TENANT, VectorIndex
+
+def process_uploaded_files(files, connection_string, collection_name="rag_docs", embeddings=None, tenant=None):
+    """Process and upload files to PGVector; chunks are tagged with ``tenant`` (default DEFAULT_TENANT)"""
     try:
         documents = []
         
@@ -41,9 +45,11 @@ def process_uploaded_files(files, connection_string, collection_name="rag_docs")
             chunk_overlap=200
         )
         splits = text_splitter.split_documents(documents)
+        for split in splits:
+            split.metadata["tenant"] = tenant or DEFAULT_TENANT
         
         # Create embeddings
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        embeddings = embeddings or get_embeddings("text-embedding-3-small")
         
         # Create vectorstore
         vectorstore = PGVector.from_documents(
@@ -52,6 +58,10 @@ def process_uploaded_files(files, connection_string, collection_name="rag_docs")
             collection_name=collection_name,
             connection=connection_string,
         )
+        engine = get_engine(connection_string)
+        run_collection_migration(engine, collection_name, "backfill_tenant",
+                                 VectorIndex(engine, collection_name).backfill_tenant)
+        bump_collection_epoch(engine, collection_name)
         
         return vectorstore
         
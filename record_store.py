@@ -0,0 +1,213 @@
+"""
+SQLite-backed record store for the reminder and to-do tools.
+
+Each tool keeps its items as rows of one ``records`` table (partitioned by
+``kind``) in a WAL-mode database, so an add or delete is a single atomic
+statement instead of rewriting a JSON file, concurrent sessions and processes
+do not lose each other's writes, and lookups by id, status or due time use
+indexes. Legacy ``reminders.json``/``todo.json`` files are imported once.
+
+``DELETE ... RETURNING`` is used on SQLite 3.35+; older libraries fall back
+to a SELECT and DELETE in one transaction.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_DB_PATH = os.getenv("ASSISTANT_DB", ".assistant.sqlite3")
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+class RecordStore:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, kind: str = "record"):
+        self.db_path = db_path
+        self.kind = kind
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'open',
+                    due_at REAL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS records_kind_status ON records (kind, status, id)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS records_kind_due ON records (kind, due_at) WHERE due_at IS NOT NULL"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS migrations (source TEXT PRIMARY KEY, migrated_at REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        return {**json.loads(row["payload"]), "id": row["id"], "status": row["status"], "due_at": row["due_at"]}
+
+    def add(self, payload: Dict[str, Any], status: str = "open", due_at: Optional[float] = None) -> int:
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO records (kind, status, due_at, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.kind, status, due_at, json.dumps(payload), now, now),
+            )
+        return cur.lastrowid
+
+    def _insert_many(self, conn: sqlite3.Connection, items: Iterable[Dict[str, Any]]) -> int:
+        now = time.time()
+        cur = conn.executemany(
+            "INSERT INTO records (kind, status, due_at, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ((self.kind, item.get("status", "open"), item.get("due_at"), json.dumps(item["payload"]), now, now)
+             for item in items),
+        )
+        return cur.rowcount
+
+    def add_many(self, items: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insert ``{"payload", "status", "due_at"}`` dicts in one transaction.
+        """
+        with self._conn() as conn:
+            return self._insert_many(conn, items)
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM records WHERE kind = ? AND id = ?", (self.kind, record_id)
+        ).fetchone()
+        return self._row(row) if row else None
+
+    def update(self, record_id: int, status: Optional[str] = None, due_at: Optional[float] = None,
+               payload: Optional[Dict[str, Any]] = None, expect_status: Optional[str] = None) -> bool:
+        """
+        With ``expect_status`` the update only applies if the record is still
+        in that status, so concurrent callers cannot both transition it.
+        """
+        sets, params = ["updated_at = ?"], [time.time()]
+        if status is not None:
+            sets.append("status = ?")
+            params.append(status)
+        if due_at is not None:
+            sets.append("due_at = ?")
+            params.append(due_at)
+        if payload is not None:
+            sets.append("payload = ?")
+            params.append(json.dumps(payload))
+        where, where_params = "kind = ? AND id = ?", [self.kind, record_id]
+        if expect_status is not None:
+            where += " AND status = ?"
+            where_params.append(expect_status)
+        with self._conn() as conn:
+            cur = conn.execute(f"UPDATE records SET {', '.join(sets)} WHERE {where}", (*params, *where_params))
+        return cur.rowcount == 1
+
+    def delete(self, record_id: int) -> Optional[Dict[str, Any]]:
+        with self._conn() as conn:
+            if _HAS_RETURNING:
+                row = conn.execute(
+                    "DELETE FROM records WHERE kind = ? AND id = ? RETURNING *", (self.kind, record_id)
+                ).fetchone()
+            else:
+                # BEGIN IMMEDIATE takes the write lock before the read
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT * FROM records WHERE kind = ? AND id = ?", (self.kind, record_id)).fetchone()
+                if row:
+                    conn.execute("DELETE FROM records WHERE id = ?", (record_id,))
+        return self._row(row) if row else None
+
+    def nth_id(self, index: int, status: Optional[str] = None) -> Optional[int]:
+        """
+        Id of the ``index``-th record (0-based, oldest first), for the tools'
+        positional delete/remove API.
+        """
+        sql, params = "SELECT id FROM records WHERE kind = ?", [self.kind]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        row = self._conn().execute(sql + " ORDER BY id LIMIT 1 OFFSET ?", (*params, index)).fetchone()
+        return row["id"] if row else None
+
+    def list(self, status: Optional[str] = None, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        sql, params = "SELECT * FROM records WHERE kind = ?", [self.kind]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY id LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        return [self._row(r) for r in self._conn().execute(sql, params)]
+
+    def due(self, before: float, status: str = "open", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT * FROM records WHERE kind = ? AND due_at IS NOT NULL AND due_at <= ? AND status = ? "
+            "ORDER BY due_at LIMIT ?",
+            (self.kind, before, status, -1 if limit is None else limit),
+        )
+        return [self._row(r) for r in rows]
+
+    def due_keys(self, after_id: int = 0, up_to_id: Optional[int] = None,
+                 status: str = "open") -> List[Tuple[float, int]]:
+        """
+        ``(due_at, id)`` of scheduled records with ``after_id < id <= up_to_id``,
+        so a scheduler can load everything once and then pick up only new rows.
+        """
+        rows = self._conn().execute(
+            "SELECT due_at, id FROM records WHERE id > ? AND id <= ? AND kind = ? AND status = ? "
+            "AND due_at IS NOT NULL",
+            (after_id, self.max_id() if up_to_id is None else up_to_id, self.kind, status),
+        )
+        return [tuple(r) for r in rows]
+
+    def max_id(self) -> int:
+        """
+        Highest id in the table across all kinds; a cheap watermark.
+        """
+        return self._conn().execute("SELECT max(id) FROM records").fetchone()[0] or 0
+
+    def count(self, status: Optional[str] = None) -> int:
+        sql, params = "SELECT count(*) FROM records WHERE kind = ?", [self.kind]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        return self._conn().execute(sql, params).fetchone()[0]
+
+    def migrate_json(self, path: str, to_item: Callable[[Any], Dict[str, Any]]) -> int:
+        """
+        Import a legacy JSON list once. The items and a ``migrations`` row
+        for the file commit together, so concurrent processes import it once
+        and a failed import leaves the file in place to retry; only then is
+        it renamed to ``<path>.migrated``.
+        """
+        try:
+            with open(path) as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            # Nothing to import, or another process already finished
+            return 0
+        imported = 0
+        with self._conn() as conn:
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO migrations (source, migrated_at) VALUES (?, ?)",
+                (f"{self.kind}:{os.path.abspath(path)}", time.time()),
+            ).rowcount
+            if claimed and items:
+                imported = self._insert_many(conn, (to_item(item) for item in items))
+        try:
+            os.replace(path, path + ".migrated")
+        except FileNotFoundError:
+            pass
+        return imported
@@ -0,0 +1,141 @@
+"""
+Due-time scheduling for reminders.
+
+Reminder times are parsed from free text ("at 5pm", "in 20 minutes",
+"tomorrow at 9:30", "2026-03-01 14:00") into timestamps stored in the
+record store's indexed ``due_at`` column. ``ReminderScheduler`` keeps a
+min-heap of ``(due_at, id)`` for the open reminders, loaded once and then
+topped up with only the rows added since, so firing is O(log n) per reminder
+and a sidebar poll costs a heap peek rather than a scan. The clock is
+injectable for deterministic tests and benchmarks.
+"""
+
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import heapq
+import re
+import threading
+import time
+
+from record_store import RecordStore
+
+
+_RELATIVE = re.compile(r"\bin\s+(\d+)\s*(second|sec|minute|min|hour|hr|day|week)s?\b", re.I)
+_ISO = re.compile(r"\b(\d{4}-\d{2}-\d{2})(?:[ T](\d{1,2}):(\d{2}))?\b")
+_CLOCK = re.compile(r"\b(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\b(?:at\s+)?(\d{1,2}):(\d{2})\b", re.I)
+_DAY = re.compile(r"\b(today|tonight|tomorrow)\b", re.I)
+_UNITS = {"second": 1, "sec": 1, "minute": 60, "min": 60, "hour": 3600, "hr": 3600, "day": 86400, "week": 604800}
+
+
+def parse_reminder_time(text: Optional[str], now: float) -> Optional[float]:
+    """
+    Timestamp for the first time expression in ``text`` (local time), or
+    ``None`` if there is none or it is not a real time ("2026-02-30",
+    "13pm"), so the reminder is kept without a due time. A bare clock time
+    that has already passed today means tomorrow.
+    """
+    if not text:
+        return None
+    match = _RELATIVE.search(text)
+    if match:
+        return now + int(match.group(1)) * _UNITS[match.group(2).lower()]
+
+    current = datetime.fromtimestamp(now)
+    match = _ISO.search(text)
+    if match:
+        try:
+            day = datetime.strptime(match.group(1), "%Y-%m-%d")
+            if match.group(2):
+                day = day.replace(hour=int(match.group(2)), minute=int(match.group(3)))
+        except ValueError:  # looks like a date but is not one, e.g. a part number
+            return None
+        return day.timestamp()
+
+    day_match = _DAY.search(text)
+    day_offset = 1 if day_match and day_match.group(1).lower() == "tomorrow" else 0
+    match = _CLOCK.search(text)
+    if match:
+        if match.group(3):
+            if not 1 <= int(match.group(1)) <= 12:
+                return None
+            hour, minute = int(match.group(1)) % 12, int(match.group(2) or 0)
+            if match.group(3).lower() == "pm":
+                hour += 12
+        else:
+            hour, minute = int(match.group(4)), int(match.group(5))
+        if hour > 23 or minute > 59:
+            return None
+    elif day_match:
+        hour, minute = (20, 0) if day_match.group(1).lower() == "tonight" else (9, 0)
+    else:
+        return None
+
+    due = (current + timedelta(days=day_offset)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if not day_match and due.timestamp() <= now:
+        due += timedelta(days=1)
+    return due.timestamp()
+
+
+class ReminderScheduler:
+    def __init__(self, store: RecordStore, clock: Callable[[], float] = time.time,
+                 recent_size: int = 20):
+        self.store = store
+        self.clock = clock
+        self._heap: List[Tuple[float, int]] = []
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._recent: Deque[Dict] = deque(maxlen=recent_size)
+        self.sync()
+
+    def sync(self) -> int:
+        """
+        Pull open reminders added since the last sync (including ones written
+        by other processes) onto the heap.
+        """
+        watermark = self.store.max_id()
+        with self._lock:
+            if watermark <= self._last_id:
+                return 0
+            keys = self.store.due_keys(after_id=self._last_id, up_to_id=watermark)
+            if self._last_id == 0:
+                self._heap = keys
+                heapq.heapify(self._heap)
+            else:
+                for key in keys:
+                    heapq.heappush(self._heap, key)
+            self._last_id = watermark
+        return len(keys)
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def fire_due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Pop and mark ``fired`` every reminder due by ``now``. Deleted or
+        already-fired entries (e.g. fired by another process) are dropped
+        lazily when they reach the top of the heap.
+        """
+        self.sync()
+        now = self.clock() if now is None else now
+        fired = []
+        while limit is None or len(fired) < limit:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, record_id = heapq.heappop(self._heap)
+            if self.store.update(record_id, status="fired", expect_status="open"):
+                record = self.store.get(record_id)
+                fired.append(record)
+                with self._lock:
+                    self._recent.appendleft(record)
+        return fired
+
+    def recent(self) -> List[Dict]:
+        with self._lock:
+            return list(self._recent)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._heap)
@@ -0,0 +1,207 @@
+"""
+Intent routing for the assistant.
+
+``keyword_route`` is the original ordered keyword chain from app.py.
+``SemanticRouter`` embeds a handful of exemplar utterances per route, keeps
+one unit-normalised centroid per route (cached on disk, keyed by model and
+exemplars), and classifies an input with a single matrix-vector product. Only
+inputs whose best similarity is below ``threshold`` go to the LLM fallback.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+
+ROUTES = ("rag", "reminder", "todo", "weather", "search", "chat")
+
+# Tool names/descriptions shared with tool_declarations, mapped to app routes.
+TOOL_DESCRIPTIONS = {
+    "RAGSearch": "Use this tool to answer questions based on uploaded documents.",
+    "Reminder": "Add a reminder for the user.",
+    "ToDo": "Manage to-do list tasks.",
+    "Weather": "Get real-time weather information for a city.",
+    "WebSearch": "Search the web for information not in uploaded documents.",
+}
+TOOL_ROUTES = {"RAGSearch": "rag", "Reminder": "reminder", "ToDo": "todo", "Weather": "weather", "WebSearch": "search"}
+
+ROUTE_EXEMPLARS = {
+    "rag": [
+        "What does the document say about the refund policy?",
+        "According to the uploaded file, who signed the contract?",
+        "Summarize the PDF I uploaded",
+        "Which part number has the highest stock in the spreadsheet?",
+        "Find the section about warranty in my files",
+        "What are the key findings in the report?",
+    ],
+    "reminder": [
+        "Remind me to call John tomorrow at 5pm",
+        "Set a reminder for the dentist appointment",
+        "Don't let me forget to pay rent on Friday",
+        "Remember to send the invoice next Monday",
+        "Ping me in 30 minutes to take a break",
+    ],
+    "todo": [
+        "Add buy groceries to my to-do list",
+        "Todo: finish the quarterly report",
+        "Put 'renew passport' on my task list",
+        "I need to add a task to clean the garage",
+        "Add to list: book flights",
+    ],
+    "weather": [
+        "What's the weather in London?",
+        "Is it going to rain in Paris today?",
+        "How hot is it in Tokyo right now?",
+        "Temperature in New York",
+        "Do I need an umbrella in Seattle?",
+    ],
+    "search": [
+        "Search for the latest AI news",
+        "Look up the population of Canada",
+        "Google the best pizza places nearby",
+        "Find information about the James Webb telescope",
+        "Who won the football match last night?",
+    ],
+    "chat": [
+        "Hi, how are you?",
+        "Tell me a joke",
+        "Can you help me write a polite email declining a meeting?",
+        "What's the difference between a list and a tuple in Python?",
+        "Thanks, that was helpful!",
+    ],
+}
+
+
+def keyword_route(user_input: str) -> str:
+    """
+    Picks the tool for the input: rag, reminder, todo, weather, search or chat.
+    """
+    user_lower = user_input.lower()
+
+    # Check for document/RAG queries
+    if any(keyword in user_lower for keyword in ["document", "file", "uploaded", "pdf", "what does", "according to"]):
+        return "rag"
+    # Check for reminder requests
+    elif any(keyword in user_lower for keyword in ["remind", "reminder", "remember"]):
+        return "reminder"
+    # Check for todo/task requests
+    elif any(keyword in user_lower for keyword in ["todo", "task", "add to list", "to-do"]):
+        return "todo"
+    # Check for weather requests
+    elif "weather" in user_lower:
+        return "weather"
+    # Check for web search requests
+    elif any(keyword in user_lower for keyword in ["search", "find", "look up", "google"]):
+        return "search"
+    # Default to LLM for general conversation
+    return "chat"
+
+
+def llm_route_fallback(llm, descriptions: Optional[Dict[str, str]] = None) -> Callable[[str], str]:
+    """
+    One-call LLM classifier used for low-confidence inputs. The reply must
+    be a route name, or name exactly one route as a whole word; anything
+    else is "chat".
+    """
+    descriptions = dict(descriptions or {TOOL_ROUTES[name]: desc for name, desc in TOOL_DESCRIPTIONS.items()})
+    descriptions.setdefault("chat", "General conversation that needs no tool.")
+    menu = "\n".join(f"- {route}: {desc}" for route, desc in descriptions.items())
+
+    def classify(user_input: str) -> str:
+        reply = llm.invoke(
+            "Choose the single best route for the user message. Answer with the route name only.\n"
+            f"Routes:\n{menu}\n\nMessage: {user_input}\nRoute:"
+        )
+        answer = getattr(reply, "content", reply).strip().strip("\"'`.").strip().lower()
+        if answer in descriptions:
+            return answer
+        # e.g. "Route: weather"; substrings ("research") and replies naming
+        # several routes do not count
+        named = {word for word in re.findall(r"[a-z_]+", answer) if word in descriptions}
+        return named.pop() if len(named) == 1 else "chat"
+
+    return classify
+
+
+class SemanticRouter:
+    def __init__(
+        self,
+        embeddings,
+        exemplars: Optional[Dict[str, Sequence[str]]] = None,
+        threshold: float = 0.4,
+        fallback: Optional[Callable[[str], str]] = None,
+        cache_dir: Optional[str] = ".router_cache",
+        model_name: str = "",
+    ):
+        self.embeddings = embeddings
+        self.exemplars = {route: list(texts) for route, texts in (exemplars or ROUTE_EXEMPLARS).items()}
+        self.threshold = threshold
+        self.fallback = fallback
+        self.cache_dir = cache_dir
+        self.model_name = model_name or getattr(embeddings, "model_name", "")
+        self.routes: List[str] = list(self.exemplars)
+        self.fallbacks = 0
+        self.centroids = self._load_centroids()
+
+    @classmethod
+    def from_tools(cls, tools, embeddings, exemplars: Optional[Dict[str, Sequence[str]]] = None, **kwargs):
+        """
+        Build from LangChain Tool objects (e.g. tool_declarations.tools): each
+        tool's description joins the exemplars of its route.
+        """
+        merged = {route: list(texts) for route, texts in (exemplars or ROUTE_EXEMPLARS).items()}
+        for tool in tools:
+            route = TOOL_ROUTES.get(tool.name, tool.name)
+            merged.setdefault(route, []).append(tool.description)
+        return cls(embeddings, exemplars=merged, **kwargs)
+
+    def _cache_path(self) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha256(json.dumps([self.model_name, self.exemplars], sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"centroids-{key[:16]}.npz")
+
+    def _load_centroids(self) -> np.ndarray:
+        path = self._cache_path()
+        if path and os.path.exists(path):
+            cached = np.load(path)
+            if list(cached["routes"]) == self.routes:
+                return cached["centroids"]
+        texts = [t for route in self.routes for t in self.exemplars[route]]
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        centroids, start = [], 0
+        for route in self.routes:
+            n = len(self.exemplars[route])
+            centroid = vectors[start:start + n].mean(axis=0)
+            centroids.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+            start += n
+        centroids = np.stack(centroids)
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.savez(path, routes=np.asarray(self.routes), centroids=centroids)
+        return centroids
+
+    def scores(self, user_input: str) -> Dict[str, float]:
+        q = np.asarray(self.embeddings.embed_query(user_input), dtype=np.float32)
+        sims = self.centroids @ (q / max(np.linalg.norm(q), 1e-12))
+        return dict(zip(self.routes, sims.tolist()))
+
+    def classify(self, user_input: str) -> Tuple[str, float]:
+        """
+        ``(route, confidence)``; below ``threshold`` the fallback decides.
+        """
+        scores = self.scores(user_input)
+        route = max(scores, key=scores.get)
+        confidence = scores[route]
+        if confidence < self.threshold and self.fallback is not None:
+            self.fallbacks += 1
+            return self.fallback(user_input), confidence
+        return route, confidence
+
+    def route(self, user_input: str) -> str:
+        return self.classify(user_input)[0]
@@ -0,0 +1,106 @@
+"""
+Speculative RAG retrieval.
+
+Starts query embedding + vector search on a thread pool as soon as input
+arrives, in parallel with routing. If the input is routed to RAG the result
+is claimed and retrieval latency is hidden; otherwise the work is cancelled
+(if it has not started) or discarded. ``max_inflight`` bounds the number of
+speculative searches running at once. Outcomes and the seconds saved or
+wasted are reported in ``stats()`` and exported as telemetry counters
+(``speculation_total{outcome=...}``, ``speculation_saved_seconds_total``,
+``speculation_wasted_seconds_total``).
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, Optional
+import threading
+import time
+
+import telemetry
+
+
+class SpeculativeRetriever:
+    def __init__(self, max_workers: int = 4, max_inflight: int = 8):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-rag")
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._lock = threading.Lock()
+        self.counts = {"started": 0, "used": 0, "cancelled": 0, "discarded": 0, "skipped": 0}
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+
+    def _count(self, key: str, saved: float = 0.0, wasted: float = 0.0):
+        with self._lock:
+            self.counts[key] += 1
+            self.saved_seconds += saved
+            self.wasted_seconds += wasted
+        telemetry.count("speculation_total", outcome=key)
+        if saved:
+            telemetry.count("speculation_saved_seconds_total", saved)
+        if wasted:
+            telemetry.count("speculation_wasted_seconds_total", wasted)
+
+    def _run(self, rag_tool, query: str, filter=None):
+        start = time.perf_counter()
+        try:
+            return rag_tool.prefetch(query, filter=filter), time.perf_counter() - start
+        finally:
+            self._slots.release()
+
+    def start(self, rag_tool, query: str, filter: Optional[Dict[str, Any]] = None) -> Optional[Future]:
+        """
+        Kick off retrieval for ``query`` (scoped by ``filter``, see
+        RAGSearchTool.retrieve); returns None when the in-flight budget is
+        exhausted.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count("skipped")
+            return None
+        future = self._pool.submit(copy_context().run, self._run, rag_tool, query, filter)
+        future.submitted = time.perf_counter()
+        self._count("started")
+        return future
+
+    def claim(self, future: Optional[Future]) -> Optional[Any]:
+        """
+        Result of a speculative retrieval the caller now needs, or None if it
+        was skipped or failed (the caller then retrieves normally).
+        """
+        if future is None:
+            return None
+        waited_from = time.perf_counter()
+        try:
+            result, took = future.result()
+        except Exception:
+            self._count("discarded")
+            return None
+        waited = time.perf_counter() - waited_from
+        self._count("used", saved=max(0.0, took - waited))
+        return result
+
+    def discard(self, future: Optional[Future]):
+        """
+        The route was not RAG: cancel the work if it is still queued,
+        otherwise let it finish and count its time as wasted.
+        """
+        if future is None:
+            return
+        if future.cancel():
+            # A cancelled task never runs _run, so its slot is returned here.
+            self._slots.release()
+            self._count("cancelled")
+            return
+
+        def account(f):
+            try:
+                _, took = f.result()
+            except Exception:
+                took = time.perf_counter() - f.submitted
+            self._count("discarded", wasted=took)
+
+        future.add_done_callback(account)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {**self.counts, "saved_seconds": round(self.saved_seconds, 3),
+                    "wasted_seconds": round(self.wasted_seconds, 3)}
@@ -0,0 +1,173 @@
+"""
+Streaming row-block chunking for CSV and Excel files.
+
+Instead of loading a whole sheet, re-serializing it to one CSV string and
+letting a character splitter cut rows in half, rows are read incrementally
+(the ``csv`` module for CSV, openpyxl's read-only row iterator for .xlsx)
+and grouped into blocks of whole rows that fit a token budget. Every chunk
+repeats the sheet name and header so it stands on its own, and records the
+sheet and source row range it covers: rows are numbered as in the file (the
+CSV line a record starts on, the sheet row), so blank rows and a header
+below row 1 do not shift them. Memory is bounded by one row plus one chunk,
+not by the size of the workbook.
+"""
+
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+import csv
+import io
+import os
+
+from langchain.docstore.document import Document
+
+from token_counting import default_token_counter
+
+
+TABULAR_EXTENSIONS = (".csv", ".xls", ".xlsx")
+
+# (source row number, cell values)
+NumberedRow = Tuple[int, Sequence]
+
+
+def _csv_line(values: Sequence) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="").writerow(["" if v is None else v for v in values])
+    return buf.getvalue()
+
+
+def _filled(values: Sequence) -> bool:
+    return any(v not in (None, "") for v in values)
+
+
+def _split_header(rows: Iterator[NumberedRow]) -> Optional[List[str]]:
+    # The header is the first non-blank row; ``rows`` continues after it
+    for _, values in rows:
+        if _filled(values):
+            return ["" if h is None else str(h) for h in values]
+    return None
+
+
+def _csv_records(reader) -> Iterator[NumberedRow]:
+    line = reader.line_num
+    for values in reader:
+        # line_num counts physical lines read, so a quoted multi-line record
+        # is numbered by the line it starts on
+        yield line + 1, values
+        line = reader.line_num
+
+
+def iter_csv_rows(path: str) -> Iterator[Tuple[Optional[str], List[str], Iterable[NumberedRow]]]:
+    """
+    Yields one ``(sheet, header, rows)`` for the file; ``rows`` streams
+    ``(line, values)`` pairs through the CSV.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = _csv_records(csv.reader(f))
+        header = _split_header(rows)
+        if header is not None:
+            yield None, header, rows
+
+
+def _xls_value(cell, datemode: int):
+    import xlrd
+
+    if cell.ctype == xlrd.XL_CELL_NUMBER and cell.value == int(cell.value):
+        return int(cell.value)
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        return xlrd.xldate.xldate_as_datetime(cell.value, datemode)
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    return cell.value
+
+
+def iter_xlsx_rows(path: str) -> Iterator[Tuple[Optional[str], List[str], Iterable[NumberedRow]]]:
+    """
+    Yields ``(sheet, header, rows)`` per sheet, ``rows`` being
+    ``(sheet row, values)`` pairs. .xlsx streams through openpyxl in
+    read-only mode; legacy .xls (which openpyxl cannot read) is read with
+    xlrd one sheet at a time.
+    """
+    if os.path.splitext(path)[1].lower() == ".xls":
+        import xlrd
+
+        book = xlrd.open_workbook(path, on_demand=True)
+        try:
+            for index in range(book.nsheets):
+                sheet = book.sheet_by_index(index)
+                rows = ((i + 1, [_xls_value(c, book.datemode) for c in sheet.row(i)]) for i in range(sheet.nrows))
+                header = _split_header(rows)
+                if header is not None:
+                    yield sheet.name, header, rows
+                book.unload_sheet(index)
+        finally:
+            book.release_resources()
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            # Read-only sheets yield an empty row for each missing one, so
+            # counting from min_row gives the sheet row
+            rows = enumerate(sheet.iter_rows(min_row=1, values_only=True), start=1)
+            header = _split_header(rows)
+            if header is not None:
+                yield sheet.title, header, rows
+    finally:
+        workbook.close()
+
+
+def row_block_documents(
+    source: str,
+    sheet: Optional[str],
+    header: Sequence[str],
+    rows: Iterable[NumberedRow],
+    token_budget: int = 250,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> Iterator[Document]:
+    """
+    Group ``rows`` into Documents of whole rows, each starting with the
+    sheet name and header and holding as many rows as fit ``token_budget``
+    (a single oversized row still gets its own chunk). ``rows`` are
+    ``(row number, values)`` pairs; ``row_start`` and ``row_end`` carry the
+    numbers of the first and last row in the chunk. Blank rows are skipped.
+    """
+    count_tokens = count_tokens or default_token_counter()
+    prefix = (f"Sheet: {sheet}\n" if sheet else "") + _csv_line(header)
+    prefix_tokens = count_tokens(prefix)
+    lines: List[str] = []
+    used = prefix_tokens
+    start = end = 0
+
+    def flush():
+        metadata = {"source": source, "row_start": start, "row_end": end}
+        if sheet:
+            metadata["sheet"] = sheet
+        return Document(page_content=prefix + "\n" + "\n".join(lines), metadata=metadata)
+
+    for row, values in rows:
+        if not _filled(values):
+            continue
+        line = _csv_line(values)
+        tokens = count_tokens(line) + 1
+        if lines and used + tokens > token_budget:
+            yield flush()
+            lines, used = [], prefix_tokens
+        if not lines:
+            start = row
+        lines.append(line)
+        used += tokens
+        end = row
+    if lines:
+        yield flush()
+
+
+def iter_tabular_documents(path: str, token_budget: int = 250,
+                           count_tokens: Optional[Callable[[str], int]] = None) -> Iterator[Document]:
+    """
+    Lazily chunk every sheet of a CSV/Excel file into row-block Documents.
+    """
+    count_tokens = count_tokens or default_token_counter()
+    sheets = iter_csv_rows(path) if path.lower().endswith(".csv") else iter_xlsx_rows(path)
+    for sheet, header, rows in sheets:
+        yield from row_block_documents(path, sheet, header, rows, token_budget, count_tokens)
@@ -0,0 +1,280 @@
+"""
+Lightweight spans, histograms and counters for the ingestion and query paths.
+
+``span("stage")`` times a block into the ``stage_seconds`` histogram and, when
+a per-turn ``trace()`` is active in the current context, into that trace's
+breakdown. ``count("tokens_total", n, kind="prompt")`` bumps a counter.
+Metrics are exported in Prometheus text format over HTTP (``METRICS_PORT``,
+bound to ``METRICS_HOST``, loopback by default) or to a file
+(``METRICS_FILE``, rewritten every ``METRICS_INTERVAL`` seconds).
+``EXPORTING`` is true once an exporter runs; metrics that are costly to
+compute can be skipped while nothing reads them.
+
+``TELEMETRY=0`` disables everything: ``span`` then returns a shared no-op
+context manager and ``count`` returns immediately, so instrumented code pays
+one global lookup and a branch.
+"""
+
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import bisect
+import functools
+import os
+import threading
+import time
+
+
+ENABLED = os.getenv("TELEMETRY", "1") != "0"
+EXPORTING = False
+
+# Seconds; covers cache hits (sub-ms) through long LLM calls and ingestion steps
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_NOOP = nullcontext()
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Tuple], List] = {}
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("telemetry_trace", default=None)
+
+
+def set_enabled(enabled: bool) -> None:
+    global ENABLED
+    ENABLED = enabled
+
+
+def observe(name: str, value: float, **labels) -> None:
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        hist[0][bisect.bisect_left(BUCKETS, value)] += 1
+        hist[1] += value
+        hist[2] += 1
+
+
+def count(name: str, amount: float = 1, **labels) -> None:
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+class Trace:
+    """
+    Per-turn breakdown: total seconds and call count per stage, in first-seen
+    order. Spans from threads started with the turn's context (see
+    ``contextvars.copy_context``) are included.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.stages: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def breakdown(self) -> List[Dict]:
+        with self._lock:
+            return [{"stage": s, "ms": round(v[0] * 1000, 1), "calls": v[1]} for s, v in self.stages.items()]
+
+
+class _Span:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage: str, labels: Dict):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def span(stage: str, **labels):
+    """
+    ``with span("embed"):`` times the block; a no-op when disabled.
+    """
+    if not ENABLED:
+        return _NOOP
+    return _Span(stage, labels)
+
+
+def timed(stage: str, **labels):
+    """
+    Decorator form of ``span``.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(stage, labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_stream(stage: str, chunks: Iterable, **labels) -> Iterator:
+    """
+    Pass ``chunks`` through, recording ``<stage>_first_token`` (time to the
+    first chunk) and ``<stage>`` (until exhausted) from the first ``next``.
+    """
+    if not ENABLED:
+        yield from chunks
+        return
+    start = time.perf_counter()
+    first = True
+    for chunk in chunks:
+        if first:
+            record(f"{stage}_first_token", time.perf_counter() - start, **labels)
+            first = False
+        yield chunk
+    record(stage, time.perf_counter() - start, **labels)
+
+
+def record(stage: str, seconds: float, **labels) -> None:
+    """
+    Record an already measured duration as if it were a span (for work
+    whose start and end are not in one block, e.g. streamed LLM output).
+    """
+    if not ENABLED:
+        return
+    observe("stage_seconds", seconds, stage=stage, **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """
+    Collect a per-turn breakdown of every span in this context.
+    """
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - current.started
+        _current_trace.reset(token)
+        observe("turn_seconds", current.seconds)
+
+
+def _format_labels(labels: Tuple, extra: str = "") -> str:
+    parts = [f'{k}="{str(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render_prometheus() -> str:
+    with _lock:
+        histograms = {k: (list(v[0]), v[1], v[2]) for k, v in _histograms.items()}
+        counters = dict(_counters)
+    lines = []
+    for name in sorted({k[0] for k in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    for name in sorted({k[0] for k in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (n, labels), (buckets, total, samples) in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, hits in zip(BUCKETS + (float("inf"),), buckets):
+                cumulative += hits
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {samples}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def start_http_exporter(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve ``GET /metrics`` from a daemon thread. Only local scrapers can
+    reach the default host; bind a wider address deliberately.
+    """
+    global EXPORTING
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    EXPORTING = True
+    return server
+
+
+def write_metrics_file(path: str) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+def start_file_exporter(path: str, interval: float = 15.0) -> threading.Thread:
+    """
+    Rewrite ``path`` every ``interval`` seconds (e.g. for node_exporter's
+    textfile collector).
+    """
+    global EXPORTING
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            write_metrics_file(path)
+
+    thread = threading.Thread(target=loop, name="metrics-file", daemon=True)
+    thread.start()
+    EXPORTING = True
+    return thread
+
+
+def start_exporters_from_env():
+    """
+    Start whichever exporters ``METRICS_PORT`` / ``METRICS_FILE`` ask for.
+    """
+    started = {}
+    if ENABLED and os.getenv("METRICS_PORT"):
+        started["http"] = start_http_exporter(int(os.environ["METRICS_PORT"]),
+                                              os.getenv("METRICS_HOST", "127.0.0.1"))
+    if ENABLED and os.getenv("METRICS_FILE"):
+        started["file"] = start_file_exporter(os.environ["METRICS_FILE"],
+                                              float(os.getenv("METRICS_INTERVAL", "15")))
+    return started
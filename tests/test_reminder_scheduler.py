@@ -0,0 +1,25 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from reminder_scheduler import parse_reminder_time
+
+NOW = datetime(2026, 3, 1, 10, 0).timestamp()
+
+
+def test_parses_supported_expressions():
+    assert parse_reminder_time("call mum in 20 minutes", NOW) == NOW + 1200
+    assert parse_reminder_time("standup at 5pm", NOW) == datetime(2026, 3, 1, 17, 0).timestamp()
+    assert parse_reminder_time("tomorrow at 9:30", NOW) == datetime(2026, 3, 2, 9, 30).timestamp()
+    assert parse_reminder_time("review on 2026-03-04 14:00", NOW) == datetime(2026, 3, 4, 14, 0).timestamp()
+
+
+def test_invalid_times_have_no_due_time():
+    assert parse_reminder_time("Remind me to reorder part 2024-13-01", NOW) is None
+    assert parse_reminder_time("pay on 2026-02-30", NOW) is None
+    assert parse_reminder_time("meeting 2026-03-04 25:00", NOW) is None
+    assert parse_reminder_time("call at 13pm", NOW) is None
+    assert parse_reminder_time("call at 0am", NOW) is None
+    assert parse_reminder_time("buy milk", NOW) is None
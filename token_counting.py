@@ -0,0 +1,21 @@
+"""
+Shared token counting for embedding batches, table chunks, context packing
+and chat memory.
+
+Uses tiktoken's ``cl100k_base`` encoding (the OpenAI chat and embedding
+models') when it is installed and a chars/4 estimate otherwise.
+"""
+
+from typing import Callable
+
+try:
+    import tiktoken
+except ImportError:  # fall back to a chars/4 estimate
+    tiktoken = None
+
+
+def default_token_counter() -> Callable[[str], int]:
+    if tiktoken is not None:
+        enc = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    return lambda text: len(text) // 4 + 1
@@ -1,38 +1,43 @@
 from langchain.agents import Tool
-from tools.rag_search_tool import RAGSearchTool
-from tools.remainder_tool import ReminderTool
-from tools.to_do_list_tool import ToDoTool
-from tools.weather_tool import WeatherTool
-from tools.search_tool import SearchTool
+from routing import TOOL_DESCRIPTIONS
+from tool_registry import get_registry
 
 from dotenv import load_dotenv
 load_dotenv()
-import os 
+
+
+def _registry_call(name, method):
+    # Resolved on first use, so importing the declarations (e.g. to build the
+    # router) builds no tools and shares the process-wide instances.
+    def call(*args, **kwargs):
+        return getattr(get_registry().get(name), method)(*args, **kwargs)
+    return call
+
 
 tools = [
     Tool(
         name="RAGSearch",
-        func=RAGSearchTool().run,
-        description="Use this tool to answer questions based on uploaded documents."
+        func=_registry_call("rag", "run"),
+        description=TOOL_DESCRIPTIONS["RAGSearch"]
     ),
     Tool(
         name="Reminder",
-        func=ReminderTool().add,
-        description="Add a reminder for the user."
+        func=_registry_call("reminder", "add"),
+        description=TOOL_DESCRIPTIONS["Reminder"]
     ),
     Tool(
         name="ToDo",
-        func=ToDoTool().add,
-        description="Manage to-do list tasks."
+        func=_registry_call("todo", "add"),
+        description=TOOL_DESCRIPTIONS["ToDo"]
     ),
     Tool(
         name="Weather",
-        func=WeatherTool(os.getenv("OPEN_WEATHER_API_KEY")).get_weather,
-        description="Get real-time weather information for a city."
+        func=_registry_call("weather", "get_weather"),
+        description=TOOL_DESCRIPTIONS["Weather"]
     ),
     Tool(
         name="WebSearch",
-        func=SearchTool(os.getenv("SERP_API_KEY")).run,
-        description="Search the web for information not in uploaded documents."
+        func=_registry_call("search", "run"),
+        description=TOOL_DESCRIPTIONS["WebSearch"]
     )
 ]
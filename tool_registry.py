@@ -0,0 +1,136 @@
+"""
+Process-wide registry of tools and other warm resources.
+
+Streamlit re-executes app.py on every interaction, but imported modules stay
+in ``sys.modules``, so a registry held here is built once per process and
+shared by every session. Each resource is constructed lazily, exactly once,
+under its own lock; ``warm_up`` builds everything ahead of the first request
+and ``health`` reports build time and the result of each resource's optional
+``health_check()``.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+import os
+import threading
+import time
+
+
+class ToolRegistry:
+    def __init__(self, factories: Dict[str, Callable[["ToolRegistry"], Any]]):
+        self._factories = dict(factories)
+        self._instances: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._build_seconds: Dict[str, float] = {}
+        self._locks = {name: threading.Lock() for name in self._factories}
+
+    def names(self):
+        return list(self._factories)
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                try:
+                    # Factories get the registry so they can depend on other resources.
+                    instance = self._factories[name](self)
+                    warm_up = getattr(instance, "warm_up", None)
+                    if callable(warm_up):
+                        warm_up()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._build_seconds[name] = time.perf_counter() - start
+                self._errors.pop(name, None)
+                self._instances[name] = instance
+            return self._instances[name]
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, parallel: bool = True) -> Dict[str, Optional[str]]:
+        """
+        Build the given (default: all) resources; returns name -> error or None.
+        """
+        names = list(names or self._factories)
+
+        def build(name):
+            try:
+                self.get(name)
+                return name, None
+            except Exception as e:
+                return name, str(e)
+
+        if parallel and len(names) > 1:
+            with ThreadPoolExecutor(max_workers=len(names)) as pool:
+                return dict(pool.map(build, names))
+        return dict(build(name) for name in names)
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for name in self._factories:
+            instance = self._instances.get(name)
+            entry = {"built": instance is not None, "build_seconds": round(self._build_seconds.get(name, 0.0), 3)}
+            if name in self._errors:
+                entry.update(ok=False, error=self._errors[name])
+            elif instance is not None:
+                check = getattr(instance, "health_check", None)
+                try:
+                    entry["ok"] = bool(check()) if callable(check) else True
+                except Exception as e:
+                    entry.update(ok=False, error=str(e))
+            report[name] = entry
+        return report
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_factories() -> Dict[str, Callable[[ToolRegistry], Any]]:
+    from langchain_openai import ChatOpenAI
+
+    import tool_declarations
+    from agent_memory import ChatMemory, llm_summarizer
+    from embedding_cache import get_embeddings
+    from ingest_jobs import IngestJobQueue, IngestWorker
+    from routing import SemanticRouter, llm_route_fallback
+    from speculative_retrieval import SpeculativeRetriever
+    from telemetry import start_exporters_from_env
+    from tools.rag_search_tool import RAGSearchTool
+    from tools.remainder_tool import ReminderTool
+    from tools.search_tool import SearchTool
+    from tools.to_do_list_tool import ToDoListTool
+    from tools.weather_tool import WeatherTool
+
+    return {
+        "llm": lambda r: ChatOpenAI(temperature=0, model_name="gpt-3.5-turbo"),
+        "rag": lambda r: RAGSearchTool(connection_string=os.getenv("POSTGRES_CONNECTION_STRING"),
+                                       backend=os.getenv("RAG_BACKEND", "pgvector")),
+        "reminder": lambda r: ReminderTool(),
+        "todo": lambda r: ToDoListTool(),
+        "weather": lambda r: WeatherTool(api_key=os.getenv("OPENWEATHER_API_KEY")),
+        "search": lambda r: SearchTool(),
+        "speculator": lambda r: SpeculativeRetriever(),
+        "chat_memory": lambda r: ChatMemory(summarizer=llm_summarizer(r.get("llm"))),
+        # Exemplars plus the agent's tool declarations, so both route alike
+        "router": lambda r: SemanticRouter.from_tools(tool_declarations.tools, get_embeddings(),
+                                                      fallback=llm_route_fallback(r.get("llm"))),
+        "ingest_queue": lambda r: IngestJobQueue(),
+        "ingest_worker": lambda r: IngestWorker(
+            r.get("ingest_queue"), connection_string=os.getenv("POSTGRES_CONNECTION_STRING")
+        ).start(),
+        "metrics_exporter": lambda r: start_exporters_from_env(),
+    }
+
+
+def get_registry() -> ToolRegistry:
+    """
+    The registry shared by every session in this process.
+    """
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = ToolRegistry(default_factories())
+    return _default
@@ -1,24 +1,261 @@
-from langchain.chains import RetrievalQA
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from langchain.chains.question_answering import load_qa_chain
 from langchain_openai import ChatOpenAI
-from langchain_postgres import PGVector
+
+from answer_cache import shared_answer_cache
+from context_packing import ContextPacker
+from db import get_engine
+from embedding_cache import get_embeddings
+from hybrid_search import HybridSearcher
+from mmap_index import MmapVectorIndex
+from token_counting import default_token_counter
+from vector_index import VectorIndex
+import telemetry
 
 class RAGSearchTool:
-    def __init__(self, connection_string, collection_name="rag_docs", model_name="gpt-3.5-turbo"):
-        self.vectorstore = PGVector(
-            connection=connection_string,
-            embedding_function=ChatOpenAI(model_name="text-embedding-3-small").embeddings,
-            collection_name=collection_name
-        )
-        # Retriever for RAG queries
-        self.retriever = self.vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=ChatOpenAI(temperature=0, model_name=model_name),
-            retriever=self.retriever
+    def __init__(self, connection_string, collection_name="rag_docs", model_name="gpt-3.5-turbo",
+                 embedding_model="text-embedding-3-small", k=3,
+                 cache_threshold=0.95, cache_ttl=3600.0, use_answer_cache=True,
+                 search_mode="vector", hybrid_options=None, backend="pgvector", mmap_path=None,
+                 mmap_refresh_interval=30.0,
+                 context_packing=True, fetch_k=20, context_k=6, context_budget=None, mmr_lambda=0.5,
+                 embeddings=None, llm=None):
+        # embeddings/llm default to the shared OpenAI clients; benchmarks pass fakes
+        self.embeddings = embeddings or get_embeddings(embedding_model)
+        # ANN index management + search with per-query ef_search/probes
+        self.index = VectorIndex(get_engine(connection_string), collection_name)
+        self.k = k
+        # "hybrid" adds a full-text leg fused with reciprocal rank fusion
+        self.search_mode = search_mode
+        self.hybrid = HybridSearcher(self.index, **(hybrid_options or {}))
+        if search_mode == "hybrid":
+            self.hybrid.ensure_fulltext_index()
+        # "mmap" serves vector search from a local int8 matrix exported from pgvector
+        self.backend = backend
+        self.local_index = None
+        self.mmap_refresh_interval = mmap_refresh_interval
+        self._refresh_lock = threading.Lock()
+        self._refresh_checked = time.monotonic()
+        if backend == "mmap":
+            self.local_index = MmapVectorIndex(mmap_path or os.path.join(".vector_index", collection_name))
+            if not self.local_index.exists():
+                try:
+                    self.refresh_local_index()
+                except ValueError:  # nothing ingested yet; retrieve falls back to pgvector
+                    pass
+        # Over-fetch fetch_k candidates, then MMR + merge + pack to a token budget
+        self.fetch_k = fetch_k
+        self.packer = ContextPacker(context_k, context_budget, mmr_lambda) if context_packing else None
+        self.context_totals = {"answers": 0, "baseline_tokens": 0, "packed_tokens": 0}
+        self.last_context_stats = None
+        self._stats_lock = threading.Lock()
+        self._count_tokens = default_token_counter()
+        # stream_usage: the last streamed chunk carries token counts for telemetry
+        self.llm = llm or ChatOpenAI(temperature=0, model_name=model_name, stream_usage=True)
+        # Near-duplicate questions from any session reuse a cached answer
+        self.answer_cache = (
+            shared_answer_cache(connection_string, collection_name, cache_threshold, cache_ttl,
+                                model_name=getattr(self.llm, "model_name", model_name), k=k)
+            if use_answer_cache else None
         )
+        # The "stuff" QA chain RetrievalQA uses; retrieval is done by retrieve()
+        self.qa_chain = load_qa_chain(self.llm, chain_type="stuff")
+
+    def _embed_query(self, query: str):
+        with telemetry.span("embed_query"):
+            return self.embeddings.embed_query(query)
+
+    def retrieve(self, query: str, k=None, ef_search=None, probes=None, query_vector=None, search_mode=None,
+                 filter=None):
+        """
+        Returns the documents to answer from: the top-k, or with context
+        packing an MMR-diversified, merged selection of the top fetch_k that
+        fits the context budget (by default, what the plain top-k would cost).
+
+        filter limits retrieval to chunks with matching metadata, e.g.
+        {"tenant": "acme", "source": [...], "sheet": "Q3", "page": 2}; it is
+        applied inside the SQL query, or as a row mask by the mmap backend.
+        """
+        if query_vector is None:
+            query_vector = self._embed_query(query)
+        fetch = max(self.fetch_k, k or self.k) if self.packer else k or self.k
+        # Packing needs the candidates' vectors; every backend returns them with the hits
+        with_vectors = self.packer is not None
+        if (search_mode or self.search_mode) == "hybrid":
+            hits = self.hybrid.search(query, query_vector, k=fetch, ef_search=ef_search, probes=probes,
+                                      filter=filter, with_vectors=with_vectors)
+        elif self.local_index is not None and self._local_index_ready():
+            hits = self.local_index.search(query_vector, k=fetch, with_vectors=with_vectors, filter=filter)
+        else:
+            hits = self.index.search(query_vector, k=fetch, ef_search=ef_search, probes=probes, filter=filter,
+                                     with_vectors=with_vectors)
+        docs = [hit[0] for hit in hits]
+        if self.packer is None or not docs:
+            return docs
+        return self.pack_context(query_vector, docs, np.stack([hit[2] for hit in hits]), baseline_k=k or self.k)
+
+    def pack_context(self, query_vector, docs, vectors=None, baseline_k=None):
+        """
+        MMR-select, merge and budget ``docs``; ``vectors`` are their
+        embeddings, read from pgvector when not given.
+        """
+        if vectors is None:
+            vectors = self.index.fetch_vectors([doc.metadata["id"] for doc in docs])
+        packed, stats = self.packer.pack(query_vector, docs, vectors, baseline_k=baseline_k or self.k)
+        with self._stats_lock:
+            self.last_context_stats = stats
+            self.context_totals["answers"] += 1
+            self.context_totals["baseline_tokens"] += stats["baseline_tokens"]
+            self.context_totals["packed_tokens"] += stats["packed_tokens"]
+        return packed
+
+    def stream_answer(self, query: str, docs):
+        """
+        Streams the "stuff" QA prompt over already retrieved documents token by token.
+        """
+        combine = self.qa_chain
+        context = combine.document_separator.join(doc.page_content for doc in docs)
+        # format_messages keeps the system/human split RetrievalQA sends
+        messages = combine.llm_chain.prompt.format_messages(
+            **{combine.document_variable_name: context, "question": query})
+        parts, usage = [], None
+        for chunk in telemetry.timed_stream("llm_generate", self.llm.stream(messages), chain="retrieval_qa"):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        if usage:
+            telemetry.count("tokens_total", usage["input_tokens"], kind="prompt")
+            telemetry.count("tokens_total", usage["output_tokens"], kind="completion")
+        elif telemetry.EXPORTING:
+            # No usage from the model: tokenize ourselves, but only if anyone reads the counters
+            prompt = "\n".join(message.content for message in messages)
+            telemetry.count("tokens_total", self._count_tokens(prompt), kind="prompt")
+            telemetry.count("tokens_total", self._count_tokens("".join(parts)), kind="completion")
+
+    def answer(self, query: str, docs):
+        return "".join(self.stream_answer(query, docs))
+
+    def prefetch(self, query: str, filter=None):
+        """
+        Embeds and retrieves with default settings; the result can be passed
+        back to stream() as ``prefetched`` (used for speculative retrieval).
+        """
+        query_vector = self._embed_query(query)
+        return query_vector, self.retrieve(query, query_vector=query_vector, filter=filter)
+
+    def stream(self, query: str, k=None, ef_search=None, probes=None, search_mode=None, prefetched=None,
+               filter=None):
+        """
+        Retrieves first and returns (sources, token iterator), so callers can
+        show sources before generation starts. A semantic cache hit returns no
+        sources and the cached answer as a single chunk.
+
+        ef_search (HNSW) and probes (IVFFlat) trade recall for latency per query;
+        search_mode overrides the tool's "vector"/"hybrid" default. prefetched
+        is a prefetch() result for the same query and filter with default
+        settings. Cached answers are only shared between identical filters.
+        """
+        defaults = k is None and ef_search is None and probes is None and search_mode is None
+        if prefetched is not None and defaults:
+            query_vector, docs = prefetched
+        else:
+            query_vector, docs = self._embed_query(query), None
+        # Only default-knob answers are shared through the cache.
+        cacheable = self.answer_cache is not None and defaults
+        scope = json.dumps(filter, sort_keys=True, default=list) if filter else ""
+        if cacheable:
+            with telemetry.span("answer_cache_lookup"):
+                cached = self.answer_cache.lookup(query_vector, scope)
+            telemetry.count("answer_cache_lookups_total", hit=cached is not None)
+            if cached is not None:
+                return [], iter([cached])
+        start = time.perf_counter()
+        if docs is None:
+            docs = self.retrieve(query, k=k, ef_search=ef_search, probes=probes, query_vector=query_vector,
+                                 search_mode=search_mode, filter=filter)
+
+        def tokens():
+            parts = []
+            for token in self.stream_answer(query, docs):
+                parts.append(token)
+                yield token
+            if cacheable:
+                self.answer_cache.store(query, query_vector, "".join(parts), time.perf_counter() - start, scope)
+
+        return docs, tokens()
 
-    def run(self, query: str):
+    def run(self, query: str, k=None, ef_search=None, probes=None, search_mode=None, filter=None):
         """
         Executes RAG search and returns summarized answer.
+        A semantic cache hit skips both retrieval and the LLM call.
+        filter scopes retrieval by metadata (tenant, source, sheet, page).
+        """
+        _, tokens = self.stream(query, k=k, ef_search=ef_search, probes=probes, search_mode=search_mode,
+                                filter=filter)
+        return "".join(tokens)
+
+    def refresh_local_index(self, force=False):
+        """
+        Incrementally syncs the mmap backend with the pgvector collection.
+        """
+        return self.local_index.refresh_from_pgvector(self.index, force=force)
+
+    def _local_index_ready(self):
+        self._maybe_refresh_local_index()
+        return self.local_index.exists()
+
+    def _maybe_refresh_local_index(self):
+        # At most every mmap_refresh_interval seconds, sync in the background
+        # (a no-op unless the collection epoch moved); queries keep using the
+        # current snapshot until the new version is swapped in.
+        now = time.monotonic()
+        if now - self._refresh_checked < self.mmap_refresh_interval or not self._refresh_lock.acquire(False):
+            return
+        self._refresh_checked = now
+
+        def refresh():
+            try:
+                self.refresh_local_index()
+            except Exception:
+                telemetry.count("mmap_refresh_errors_total")
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=refresh, name="mmap-refresh", daemon=True).start()
+
+    def warm_up(self):
+        """
+        Opens a pooled connection. The embedding path is left cold: priming it
+        would be a paid API call on every process start.
         """
-        result = self.qa_chain.run(query)
-        return result
+        self.health_check()
+
+    def health_check(self):
+        with self.index.engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+        return True
+
+    def context_stats(self):
+        """
+        Mean prompt context tokens per answer: plain top-k stuffing vs packed.
+        """
+        with self._stats_lock:
+            n = self.context_totals["answers"]
+            if not n:
+                return {}
+            return {
+                "answers": n,
+                "baseline_tokens": self.context_totals["baseline_tokens"] / n,
+                "packed_tokens": self.context_totals["packed_tokens"] / n,
+                "last": self.last_context_stats,
+            }
+
+    def cache_stats(self):
+        return self.answer_cache.stats() if self.answer_cache else {}
@@ -1,31 +1,42 @@
-import json
-from datetime import datetime
+import time
+
+from record_store import DEFAULT_DB_PATH, RecordStore
+from reminder_scheduler import ReminderScheduler, parse_reminder_time
 
 class ReminderTool:
-    def __init__(self, storage_file="reminders.json"):
+    def __init__(self, storage_file="reminders.json", db_path=DEFAULT_DB_PATH, clock=time.time):
         self.storage_file = storage_file
-        try:
-            with open(self.storage_file) as f:
-                self.reminders = json.load(f)
-        except FileNotFoundError:
-            self.reminders = []
+        self.clock = clock
+        self.store = RecordStore(db_path, kind="reminder")
+        now = clock()
+        self.store.migrate_json(
+            storage_file, lambda r: {"payload": r, "due_at": parse_reminder_time(r.get("time"), now)}
+        )
+        self.scheduler = ReminderScheduler(self.store, clock=clock)
 
-    def add(self, message, time_str):
-        reminder = {"message": message, "time": time_str}
-        self.reminders.append(reminder)
-        self._save()
-        return f"Reminder added: {message} at {time_str}"
+    def add(self, message, time_str=None):
+        # Without an explicit time, look for one in the message itself
+        due_at = parse_reminder_time(time_str or message, self.clock())
+        self.store.add({"message": message, "time": time_str}, due_at=due_at)
+        if due_at is not None:
+            return f"Reminder added: {message} (due {time.strftime('%a %H:%M', time.localtime(due_at))})"
+        return f"Reminder added: {message}"
 
-    def list(self):
-        return self.reminders
+    def list(self, limit=None):
+        return [{"message": r["message"], "time": r["time"]} for r in self.store.list(status="open", limit=limit)]
 
-    def delete(self, index):
-        if 0 <= index < len(self.reminders):
-            removed = self.reminders.pop(index)
-            self._save()
-            return f"Deleted reminder: {removed['message']}"
-        return "Invalid index"
+    def get_all(self, limit=None):
+        return [f"{r['message']} ({r['time']})" if r["time"] else r["message"] for r in self.list(limit)]
 
-    def _save(self):
-        with open(self.storage_file, "w") as f:
-            json.dump(self.reminders, f, indent=2)
+    def due(self):
+        """
+        Reminders that became due since the last call (marked fired).
+        """
+        return self.scheduler.fire_due()
+
+    def delete(self, index):
+        record_id = self.store.nth_id(index, status="open") if index >= 0 else None
+        removed = self.store.delete(record_id) if record_id is not None else None
+        if removed is None:
+            return "Invalid index"
+        return f"Deleted reminder: {removed['message']}"
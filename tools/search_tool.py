@@ -1,8 +1,164 @@
-from googlesearch import search
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from passage_index import PassageIndex, html_to_text, split_passages
+
+# A JSON endpoint returning a list of URLs for ``?q=`` (e.g. a local fixture
+# server) replaces Google when set
+SEARCH_BACKEND_URL = os.getenv("SEARCH_BACKEND_URL")
+
+
+def normalize_query(query):
+    return " ".join(query.split()).casefold()
+
+
+def google_backend(query, num_results):
+    from googlesearch import search
+
+    return list(search(query, num_results=num_results))
+
+
+class HttpSearchBackend:
+    def __init__(self, url, session=None, timeout=5):
+        self.url = url
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def __call__(self, query, num_results):
+        response = self.session.get(self.url, params={"q": query, "n": num_results}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()[:num_results]
+
+
+class _TTLCache:
+    def __init__(self, ttl, max_entries, clock):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or hit[0] <= self.clock():
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
 
 class SearchTool:
+    """
+    Web search that returns relevant passages in one call: result URLs are
+    cached per normalized query, pages are fetched concurrently with
+    timeouts and a size cap, and their text is ranked in a throwaway
+    in-memory ``PassageIndex``. ``backend(query, num_results) -> [url]`` is
+    pluggable.
+    """
+
+    def __init__(self, backend=None, fetch_pages=True, ttl=3600, page_ttl=3600, max_workers=8,
+                 timeout=(3.05, 5), max_page_bytes=2_000_000, passage_size=800, passage_overlap=100,
+                 top_k=4, max_cache_entries=256, clock=time.monotonic):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if backend is None:
+            backend = HttpSearchBackend(SEARCH_BACKEND_URL, self.session) if SEARCH_BACKEND_URL else google_backend
+        self.backend = backend
+        self.fetch_pages = fetch_pages
+        self.timeout = timeout
+        self.max_page_bytes = max_page_bytes
+        self.passage_size = passage_size
+        self.passage_overlap = passage_overlap
+        self.top_k = top_k
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="web-fetch")
+        self._results = _TTLCache(ttl, max_cache_entries, clock)
+        self._pages = _TTLCache(page_ttl, max_cache_entries * 4, clock)
+        self._lock = threading.Lock()
+        self._stats = {"searches": 0, "result_cache_hits": 0, "fetches": 0, "page_cache_hits": 0,
+                       "fetch_errors": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def search(self, query, num_results=3):
+        """
+        Result URLs for ``query``, cached per normalized query.
+        """
+        key = (normalize_query(query), num_results)
+        urls = self._results.get(key)
+        if urls is not None:
+            self._count("result_cache_hits")
+            return urls
+        self._count("searches")
+        urls = list(self.backend(query, num_results))
+        self._results.put(key, urls)
+        return urls
+
+    def fetch_text(self, url):
+        """
+        Visible text of ``url`` ("" on error, non-text content or timeout).
+        """
+        text = self._pages.get(url)
+        if text is not None:
+            self._count("page_cache_hits")
+            return text
+        self._count("fetches")
+        try:
+            with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if "html" not in content_type and "text" not in content_type:
+                    raise ValueError(f"unsupported content type {content_type!r}")
+                body = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) >= self.max_page_bytes:
+                        break
+                raw = bytes(body[:self.max_page_bytes]).decode(response.encoding or "utf-8", errors="replace")
+        except (requests.RequestException, ValueError):
+            self._count("fetch_errors")
+            return ""
+        text = html_to_text(raw) if "html" in content_type else raw
+        self._pages.put(url, text)
+        return text
+
+    def passages(self, query, num_results=3, k=None):
+        """
+        Top passages across the result pages as ``{"source", "text", "score"}``.
+        """
+        urls = self.search(query, num_results)
+        index = PassageIndex()
+        for url, text in zip(urls, self._pool.map(self.fetch_text, urls)):
+            index.add(url, split_passages(text, self.passage_size, self.passage_overlap))
+        return index.search(query, k or self.top_k)
+
     def run(self, query, num_results=3):
-        results = []
-        for url in search(query, num_results=num_results):
-            results.append(url)
-        return results
+        if not self.fetch_pages:
+            return self.search(query, num_results)
+        hits = self.passages(query, num_results)
+        if not hits:
+            return "\n".join(self.search(query, num_results)) or f"No results for {query}"
+        return "\n\n".join(f"{hit['text']}\n(source: {hit['source']})" for hit in hits)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def health_check(self):
+        return self.stats()
@@ -1,27 +1,30 @@
+from record_store import DEFAULT_DB_PATH, RecordStore
+
 class ToDoListTool:
-    def __init__(self, storage_file="todo.json"):
+    def __init__(self, storage_file="todo.json", db_path=DEFAULT_DB_PATH):
         self.storage_file = storage_file
-        try:
-            with open(self.storage_file) as f:
-                self.todos = json.load(f)
-        except FileNotFoundError:
-            self.todos = []
+        self.store = RecordStore(db_path, kind="todo")
+        self.store.migrate_json(storage_file, lambda task: {"payload": {"task": task}})
 
     def add(self, task):
-        self.todos.append(task)
-        self._save()
+        self.store.add({"task": task})
         return f"Task added: {task}"
 
-    def list(self):
-        return self.todos
+    def list(self, limit=None):
+        return [r["task"] for r in self.store.list(status="open", limit=limit)]
 
-    def remove(self, index):
-        if 0 <= index < len(self.todos):
-            task = self.todos.pop(index)
-            self._save()
-            return f"Removed task: {task}"
-        return "Invalid index"
+    def get_all(self, limit=None):
+        return self.list(limit)
 
-    def _save(self):
-        with open(self.storage_file, "w") as f:
-            json.dump(self.todos, f, indent=2)
+    def complete(self, index):
+        record_id = self.store.nth_id(index, status="open") if index >= 0 else None
+        if record_id is None or not self.store.update(record_id, status="done"):
+            return "Invalid index"
+        return f"Completed task: {self.store.get(record_id)['task']}"
+
+    def remove(self, index):
+        record_id = self.store.nth_id(index, status="open") if index >= 0 else None
+        removed = self.store.delete(record_id) if record_id is not None else None
+        if removed is None:
+            return "Invalid index"
+        return f"Removed task: {removed['task']}"
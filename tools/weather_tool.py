@@ -1,15 +1,112 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "http://api.openweathermap.org/data/2.5/weather")
+
+
+def normalize_city(city):
+    return " ".join(city.strip().strip("?.!").split()).casefold()
+
 
 class WeatherTool:
-    def __init__(self, api_key):
+    """
+    OpenWeather client shared by all sessions: one pooled keep-alive session,
+    a TTL cache keyed by normalized city, and single-flight fetches so
+    concurrent callers asking for the same city share one request.
+    """
+
+    def __init__(self, api_key, base_url=OPENWEATHER_URL, ttl=600, timeout=(3.05, 10),
+                 pool_size=16, max_workers=8, clock=time.monotonic):
         self.api_key = api_key
+        self.base_url = base_url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.clock = clock
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504)),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="weather")
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._inflight = {}
+        self._stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "errors": 0}
+
+    def _request(self, city):
+        with self._lock:
+            self._stats["requests"] += 1
+        try:
+            response = self.session.get(
+                self.base_url,
+                params={"q": city, "appid": self.api_key, "units": "metric"},
+                timeout=self.timeout,
+            )
+        except requests.RequestException:
+            response = None
+        if response is None or response.status_code != 200:
+            with self._lock:
+                self._stats["errors"] += 1
+            return None
+        return response.json()
+
+    def fetch(self, city):
+        """
+        Raw OpenWeather payload for ``city`` or ``None`` on failure. Only
+        successful responses are cached.
+        """
+        key = normalize_city(city)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and hit[0] > self.clock():
+                self._stats["cache_hits"] += 1
+                return hit[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+        data = None
+        try:
+            data = self._request(city)
+        finally:
+            with self._lock:
+                if data is not None:
+                    self._cache[key] = (self.clock() + self.ttl, data)
+                del self._inflight[key]
+            future.set_result(data)
+        return data
 
     def get_weather(self, city):
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={self.api_key}&units=metric"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            desc = data["weather"][0]["description"]
-            temp = data["main"]["temp"]
-            return f"Weather in {city}: {desc}, temperature: {temp}°C"
-        return f"Could not fetch weather for {city}"
+        data = self.fetch(city)
+        if data is None:
+            return f"Could not fetch weather for {city}"
+        desc = data["weather"][0]["description"]
+        temp = data["main"]["temp"]
+        return f"Weather in {data.get('name') or city}: {desc}, temperature: {temp}°C"
+
+    def get_weather_batch(self, cities):
+        """
+        Weather for many cities, fetched concurrently; returns ``{city: text}``.
+        """
+        cities = list(dict.fromkeys(cities))
+        return dict(zip(cities, self._pool.map(self.get_weather, cities)))
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "cached_cities": len(self._cache)}
+
+    def health_check(self):
+        return {"api_key": bool(self.api_key), **self.stats()}
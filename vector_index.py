@@ -0,0 +1,426 @@
+"""
+ANN index management and tunable search for a pgvector collection.
+
+langchain_postgres stores every collection in one ``langchain_pg_embedding``
+table with an untyped ``vector`` column, so an index has to cast to the
+collection's dimension and be partial on its ``collection_id``. Queries in
+``VectorIndex.search`` use the same expression so the planner can pick the
+index, and take per-query ``ef_search`` (HNSW) / ``probes`` (IVFFlat).
+
+Metadata filters (tenant, source, sheet, page, ...) are pushed into the same
+query. A ``tenant`` filter is served by a per-tenant partial ANN index once
+that tenant is large enough to have one (``ensure_tenant_index``); any other
+filtered search is an exact scan of the rows the collection's JSONB GIN
+index matches, so its cost follows the filtered data, not the collection.
+
+Tenants scope retrieval; they are not access control. Whoever picks the
+tenant id (the app takes it from the URL) can read that tenant's chunks.
+Chunks written without a tenant belong to ``DEFAULT_TENANT``; ingestion
+runs ``backfill_tenant`` once per collection for data indexed before tenants
+existed.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+from langchain.docstore.document import Document
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+import telemetry
+from pg_bulk_writer import COLLECTION_TABLE, EMBEDDING_TABLE
+
+
+# Cosine matches PGVector's default DistanceStrategy.
+_OPS = {"cosine": ("vector_cosine_ops", "<=>"), "l2": ("vector_l2_ops", "<->"), "ip": ("vector_ip_ops", "<#>")}
+
+
+TENANT_KEY = "tenant"
+DEFAULT_TENANT = os.getenv("RAG_TENANT", "public")
+# Tenants below this many chunks are searched exactly through the GIN index
+TENANT_INDEX_MIN_ROWS = int(os.getenv("TENANT_INDEX_MIN_ROWS", "20000"))
+
+_TENANT_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.@-]{0,127}")
+_TENANT_IN_INDEXDEF = re.compile(r"\(cmetadata ->> '%s'::text\) = '((?:[^']|'')*)'::text" % TENANT_KEY)
+
+
+def _vector_literal(vector: Sequence[float]) -> str:
+    return "[" + ",".join(repr(float(v)) for v in vector) + "]"
+
+
+def _parse_vector_text(value: str) -> np.ndarray:
+    return np.array(value[1:-1].split(","), dtype=np.float32)
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def valid_tenant(tenant: str) -> bool:
+    return isinstance(tenant, str) and _TENANT_ID.fullmatch(tenant) is not None
+
+
+def tenant_predicate(tenant: str) -> str:
+    # Inlined, not bound, so the planner can match per-tenant partial indexes;
+    # hence the restricted id alphabet.
+    if not valid_tenant(tenant):
+        raise ValueError(f"Invalid tenant id: {tenant!r}")
+    return f"(cmetadata->>'{TENANT_KEY}') = {_sql_literal(tenant)}"
+
+
+def metadata_filter_sql(filter: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, str]]:
+    """
+    ``" AND ..."`` clause and bind parameters for an equality filter on chunk
+    metadata. Scalar values are combined into one ``cmetadata @> ...``
+    containment test (GIN-indexable); a list value matches any of its items.
+    Values compare as JSON, so ``{"page": 3}`` does not match ``"3"``.
+    """
+    if not filter:
+        return "", {}
+    clauses, params, contained = [], {}, {}
+    for i, (key, value) in enumerate(sorted(filter.items())):
+        if isinstance(value, (list, tuple, set)):
+            if not value:
+                return " AND false", {}
+            options = []
+            for j, item in enumerate(value):
+                params[f"meta_{i}_{j}"] = json.dumps({key: item})
+                options.append(f"cmetadata @> CAST(:meta_{i}_{j} AS jsonb)")
+            clauses.append("(" + " OR ".join(options) + ")")
+        else:
+            contained[key] = value
+    if contained:
+        params["meta"] = json.dumps(contained)
+        clauses.insert(0, "cmetadata @> CAST(:meta AS jsonb)")
+    if isinstance(filter.get(TENANT_KEY), str):
+        clauses.append(tenant_predicate(filter[TENANT_KEY]))
+    return " AND " + " AND ".join(clauses), params
+
+
+_MISSING = object()
+
+
+def _json_equal(a, b) -> bool:
+    # JSON has no bool/number coercion: true != 1
+    return a == b and isinstance(a, bool) == isinstance(b, bool)
+
+
+def metadata_matches(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    In-process counterpart of ``metadata_filter_sql`` for backends that keep
+    chunk metadata outside Postgres.
+    """
+    for key, value in (filter or {}).items():
+        options = value if isinstance(value, (list, tuple, set)) else (value,)
+        if not any(_json_equal(metadata.get(key, _MISSING), option) for option in options):
+            return False
+    return True
+
+
+class VectorIndex:
+    def __init__(self, engine: Engine, collection_name: str, metric: str = "cosine"):
+        if metric not in _OPS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        self.engine = engine
+        self.collection_name = collection_name
+        self.metric = metric
+        self._collection_id = None
+        self._dimensions = None
+        self._tenant_indexes = None
+        self._tenant_indexes_checked = 0.0
+
+    def invalidate(self):
+        """
+        Forget the cached collection id, dimensions and tenant indexes, e.g.
+        after the collection was deleted and re-created.
+        """
+        self._collection_id = None
+        self._dimensions = None
+        self._tenant_indexes = None
+        self._tenant_indexes_checked = 0.0
+
+    @property
+    def collection_id(self) -> str:
+        if self._collection_id is None:
+            with self.engine.connect() as conn:
+                row = conn.execute(
+                    text(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :n"), {"n": self.collection_name}
+                ).fetchone()
+            if row is None:
+                raise ValueError(f"Collection not found: {self.collection_name}")
+            self._collection_id = str(row[0])
+        return self._collection_id
+
+    @property
+    def dimensions(self) -> int:
+        if self._dimensions is None:
+            with self.engine.connect() as conn:
+                row = conn.execute(text(
+                    f"SELECT vector_dims(embedding) FROM {EMBEDDING_TABLE} "
+                    f"WHERE collection_id = '{self.collection_id}' LIMIT 1"
+                )).fetchone()
+            if row is None:
+                raise ValueError(f"Collection is empty: {self.collection_name}")
+            self._dimensions = row[0]
+        return self._dimensions
+
+    def _slug(self) -> str:
+        return re.sub(r"[^a-z0-9]+", "_", self.collection_name.lower()).strip("_")
+
+    def index_name(self, kind: str, tenant: Optional[str] = None) -> str:
+        slug = self._slug()
+        if tenant is not None:
+            digest = hashlib.sha1(tenant.encode("utf-8")).hexdigest()[:12]
+            return f"ix_{slug[:32]}_t{digest}_{kind}_{self.metric}"
+        return f"ix_{slug}_{kind}_{self.metric}"[:63]
+
+    def _expression(self) -> str:
+        return f"(embedding::vector({self.dimensions}))"
+
+    def collection_predicate(self) -> str:
+        # Inlined so the planner can match the partial-index predicate.
+        return f"collection_id = '{self.collection_id}'"
+
+    def backfill_tenant(self, tenant: str = DEFAULT_TENANT) -> int:
+        """
+        Tag chunks that have no tenant (indexed before tenants existed, or by
+        a writer that does not set one) with ``tenant``; returns the number
+        of rows updated.
+        """
+        tenant_predicate(tenant)
+        with self.engine.begin() as conn:
+            return conn.execute(
+                text(
+                    f"UPDATE {EMBEDDING_TABLE} SET cmetadata = COALESCE(cmetadata, '{{}}'::jsonb) "
+                    f"|| jsonb_build_object('{TENANT_KEY}', CAST(:t AS text)) "
+                    f"WHERE {self.collection_predicate()} AND cmetadata->>'{TENANT_KEY}' IS NULL"
+                ),
+                {"t": tenant},
+            ).rowcount
+
+    def row_count(self, filter: Optional[Dict[str, Any]] = None) -> int:
+        clause, params = metadata_filter_sql(filter)
+        with self.engine.connect() as conn:
+            return conn.execute(
+                text(f"SELECT count(*) FROM {EMBEDDING_TABLE} WHERE {self.collection_predicate()}{clause}"),
+                params,
+            ).scalar()
+
+    def metadata_index_name(self) -> str:
+        return f"ix_{self._slug()}_meta"[:63]
+
+    def ensure_metadata_index(self, concurrently: bool = False) -> str:
+        """
+        GIN (jsonb_path_ops) index on this collection's metadata, used by
+        filtered searches that have no per-tenant ANN index.
+        """
+        name = self.metadata_index_name()
+        sql = (f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+               f"ON {EMBEDDING_TABLE} USING gin (cmetadata jsonb_path_ops) WHERE {self.collection_predicate()}")
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(sql))
+        return name
+
+    def create_index(
+        self,
+        kind: str = "hnsw",
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: Optional[int] = None,
+        concurrently: bool = False,
+        replace: bool = False,
+        tenant: Optional[str] = None,
+    ) -> str:
+        """
+        Create an HNSW (``m``, ``ef_construction``) or IVFFlat (``lists``,
+        default rows/1000 up to 1M rows and sqrt(rows) beyond) index. With
+        ``tenant`` the index is also partial on that tenant's rows.
+        """
+        ops, _ = _OPS[self.metric]
+        scope = {TENANT_KEY: tenant} if tenant is not None else None
+        if kind == "hnsw":
+            params = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+        elif kind == "ivfflat":
+            if lists is None:
+                rows = self.row_count(scope)
+                lists = max(1, rows // 1000 if rows <= 1_000_000 else int(rows ** 0.5))
+            params = f"lists = {int(lists)}"
+        else:
+            raise ValueError(f"Unsupported index kind: {kind}")
+        name = self.index_name(kind, tenant)
+        if replace:
+            self.drop_index(kind, tenant)
+        predicate = self.collection_predicate()
+        if tenant is not None:
+            predicate += f" AND {tenant_predicate(tenant)}"
+        sql = (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+            f"ON {EMBEDDING_TABLE} USING {kind} ({self._expression()} {ops}) WITH ({params}) "
+            f"WHERE {predicate}"
+        )
+        if concurrently:
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(sql))
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(text(sql))
+        if tenant is not None and self._tenant_indexes is not None:
+            self._tenant_indexes.add(tenant)
+        return name
+
+    def rebuild_index(self, kind: str = "hnsw", concurrently: bool = False, tenant: Optional[str] = None):
+        sql = f"REINDEX INDEX {'CONCURRENTLY ' if concurrently else ''}{self.index_name(kind, tenant)}"
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(sql))
+
+    def drop_index(self, kind: str = "hnsw", tenant: Optional[str] = None):
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {self.index_name(kind, tenant)}"))
+        self._tenant_indexes = None
+
+    def ensure_tenant_index(self, tenant: str, min_rows: int = TENANT_INDEX_MIN_ROWS, kind: str = "hnsw",
+                            concurrently: bool = True) -> Optional[str]:
+        """
+        Build ``tenant``'s partial ANN index once it has ``min_rows`` chunks;
+        smaller tenants are cheaper to scan exactly. Returns the index name,
+        or None while the tenant is below the threshold.
+        """
+        if tenant in self.indexed_tenants():
+            return self.index_name(kind, tenant)
+        if self.row_count({TENANT_KEY: tenant}) < min_rows:
+            return None
+        return self.create_index(kind, concurrently=concurrently, tenant=tenant)
+
+    def indexed_tenants(self, max_age: float = 60.0) -> set:
+        """
+        Tenants with a valid partial ANN index, re-read at most every
+        ``max_age`` seconds (indexes may be built by another process).
+        """
+        now = time.monotonic()
+        if self._tenant_indexes is None or now - self._tenant_indexes_checked > max_age:
+            self._tenant_indexes = {i["tenant"] for i in self.inspect() if i["tenant"] is not None and i["valid"]}
+            self._tenant_indexes_checked = now
+        return self._tenant_indexes
+
+    def inspect(self) -> List[Dict]:
+        """
+        Describe the ANN indexes on this collection: kind, build parameters,
+        on-disk size and validity.
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT i.indexname, i.indexdef, pg_relation_size(c.oid) AS size_bytes, x.indisvalid "
+                "FROM pg_indexes i JOIN pg_class c ON c.relname = i.indexname "
+                "JOIN pg_index x ON x.indexrelid = c.oid "
+                "WHERE i.tablename = :t AND i.indexdef LIKE :pred "
+                "AND (i.indexdef ILIKE '%USING hnsw%' OR i.indexdef ILIKE '%USING ivfflat%')"
+            ), {"t": EMBEDDING_TABLE, "pred": f"%{self.collection_id}%"}).fetchall()
+        out = []
+        for r in rows:
+            kind = "hnsw" if "USING hnsw" in r.indexdef else "ivfflat"
+            params = dict(re.findall(r"(\w+)='?(\d+)'?", r.indexdef.split("WITH", 1)[-1]))
+            tenant = _TENANT_IN_INDEXDEF.search(r.indexdef)
+            out.append({"name": r.indexname, "kind": kind, "params": {k: int(v) for k, v in params.items()},
+                        "tenant": tenant.group(1).replace("''", "'") if tenant else None,
+                        "size_bytes": r.size_bytes, "valid": r.indisvalid, "definition": r.indexdef})
+        return out
+
+    @telemetry.timed("vector_search")
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int = 3,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        exact: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False,
+    ) -> List[Tuple]:
+        """
+        Top-``k`` ``(Document, distance)`` pairs, or ``(Document, distance,
+        vector)`` with ``with_vectors``. ``exact`` disables index scans to get
+        ground truth for recall measurements.
+
+        A missing or empty collection has no results.
+
+        ``filter`` restricts results to chunks whose metadata equals the
+        given values (see ``metadata_filter_sql``). Only a filter on exactly
+        one tenant that has its own partial index runs as an ANN search;
+        other filters are exact over the GIN-matched rows, because an ANN
+        scan over the whole collection would drop matches after the fact
+        and return fewer than ``k``.
+        """
+        _, op = _OPS[self.metric]
+        try:
+            dims = self.dimensions
+        except ValueError:  # collection missing or empty
+            self.invalidate()
+            return []
+        clause, params = metadata_filter_sql(filter)
+        if filter and not exact:
+            tenant = filter.get(TENANT_KEY)
+            exact = not (set(filter) == {TENANT_KEY} and isinstance(tenant, str)
+                         and tenant in self.indexed_tenants())
+        with self.engine.begin() as conn:
+            if ef_search is not None:
+                conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+            if probes is not None:
+                conn.execute(text(f"SET LOCAL ivfflat.probes = {int(probes)}"))
+            if exact:
+                # Plain index scans only; GIN bitmap scans on the filter remain
+                conn.execute(text("SET LOCAL enable_indexscan = off"))
+            rows = conn.execute(
+                text(
+                    f"SELECT id, document, cmetadata, {self._expression()} {op} CAST(:q AS vector({dims})) "
+                    f"AS distance{', CAST(embedding AS text) AS embedding' if with_vectors else ''} "
+                    f"FROM {EMBEDDING_TABLE} WHERE {self.collection_predicate()}{clause} "
+                    "ORDER BY distance LIMIT :k"
+                ),
+                {"q": _vector_literal(query_vector), "k": int(k), **params},
+            ).fetchall()
+        if not rows:
+            # Re-resolve next time in case the collection was re-created
+            self.invalidate()
+        docs = [Document(page_content=r.document, metadata=dict(r.cmetadata or {}, id=r.id)) for r in rows]
+        if with_vectors:
+            return [(doc, r.distance, _parse_vector_text(r.embedding)) for doc, r in zip(docs, rows)]
+        return [(doc, r.distance) for doc, r in zip(docs, rows)]
+
+    @telemetry.timed("fetch_vectors")
+    def fetch_vectors(self, ids: Sequence[str]) -> np.ndarray:
+        """
+        Stored embeddings for ``ids`` as a float32 matrix in the same order.
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    f"SELECT id, CAST(embedding AS text) AS embedding FROM {EMBEDDING_TABLE} "
+                    f"WHERE {self.collection_predicate()} AND id = ANY(:ids)"
+                ),
+                {"ids": list(ids)},
+            ).fetchall()
+        found = {r.id: r.embedding for r in rows}
+        missing = [i for i in ids if i not in found]
+        if missing:
+            raise KeyError(f"No embeddings for ids: {missing[:5]}")
+        return np.stack([_parse_vector_text(found[i]) for i in ids]) if ids else np.zeros((0, 0), np.float32)
+
+    def list_sources(self, filter: Optional[Dict[str, Any]] = None, limit: int = 500) -> List[str]:
+        """
+        Distinct ``source`` values among the chunks matching ``filter``.
+        """
+        clause, params = metadata_filter_sql(filter)
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    f"SELECT DISTINCT cmetadata->>'source' AS source FROM {EMBEDDING_TABLE} "
+                    f"WHERE {self.collection_predicate()}{clause} ORDER BY 1 LIMIT :limit"
+                ),
+                {"limit": int(limit), **params},
+            ).fetchall()
+        return [r.source for r in rows if r.source is not None]